@@ -14,7 +14,7 @@ router.post('/', async (req, res) => {
     // Forward request to VM API with extended timeout
     const vmResponse = await apiClient.post('http://20.9.234.187:3000/generate_video', req.body);
 
-    // Rewrite video URL to use our proxy
+    // Rewrite video and job status URLs to use our proxy
     const originalUrl = new URL(vmResponse.data.video_url);
     const proxyPath = `${originalUrl.pathname}`;
     
@@ -23,6 +23,10 @@ router.post('/', async (req, res) => {
       video_url: `${req.protocol}://${req.get('host')}${proxyPath}`
     };
 
+    if (vmResponse.data.job_id) {
+      proxiedResponse.status_url = `${req.protocol}://${req.get('host')}${req.baseUrl}/jobs/${vmResponse.data.job_id}`;
+    }
+
     res.status(vmResponse.status).json(proxiedResponse);
 
   } catch (error) {
@@ -68,4 +72,38 @@ router.post('/', async (req, res) => {
   }
 });
 
+router.get('/jobs/:jobId', async (req, res) => {
+  try {
+    const vmResponse = await axios.get(`http://20.9.234.187:3000/jobs/${encodeURIComponent(req.params.jobId)}`, {
+      timeout: 30000
+    });
+
+    const proxiedResponse = { ...vmResponse.data };
+
+    // Rewrite video URL to use our proxy once the job is done
+    if (vmResponse.data.video_url) {
+      const originalUrl = new URL(vmResponse.data.video_url);
+      proxiedResponse.video_url = `${req.protocol}://${req.get('host')}${originalUrl.pathname}`;
+    }
+
+    res.status(vmResponse.status).json(proxiedResponse);
+
+  } catch (error) {
+    console.error('[Video Job Proxy Error]', {
+      message: error.message,
+      code: error.code,
+      response: error.response?.data
+    });
+
+    if (error.response) {
+      return res.status(error.response.status).json(error.response.data);
+    }
+
+    res.status(503).json({
+      status: 'service_unavailable',
+      message: 'No response received from video generation service',
+    });
+  }
+});
+
 module.exports = router;
\ No newline at end of file
@@ -0,0 +1,229 @@
+import math
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+
+DEFAULT_NPROBE = 16
+# Below this many vectors brute force is fast enough and exact
+DEFAULT_MIN_ROWS = 20000
+KMEANS_ITERATIONS = 10
+BLOCK_ROWS = 8192
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-flat) approximate nearest-neighbor index.
+
+    Spherical k-means splits the unit-normalized vectors into nlist
+    cells. A query scores the centroids, scans only the rows of the
+    nprobe closest cells and ranks them exactly, so latency and recall
+    both grow with nprobe. The index does not copy vectors: it holds
+    row numbers into the caller's matrix (the memory-mapped store), and
+    new rows are appended to their nearest cell as they arrive.
+
+    Centroids are retrained once the row count has grown 4x since the
+    last training, and are saved to centroids_path so a restart only
+    has to reassign rows.
+    """
+
+    def __init__(self, centroids_path: Optional[str] = None, nlist: Optional[int] = None,
+                 nprobe: Optional[int] = None, min_rows: Optional[int] = None):
+        self.centroids_path = centroids_path
+        self.nlist = nlist or (int(os.getenv("ANN_NLIST")) if os.getenv("ANN_NLIST") else None)
+        self.nprobe = nprobe or int(os.getenv("ANN_NPROBE", DEFAULT_NPROBE))
+        self.min_rows = min_rows or int(os.getenv("ANN_MIN_ROWS", DEFAULT_MIN_ROWS))
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_rows = 0
+        self._lists: List[List[int]] = []
+        self._arrays: List[Optional[np.ndarray]] = []
+        self._assignment = np.full(0, -1, dtype=np.int32)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _nearest(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid of each (normalized) vector, in blocks to bound memory"""
+        out = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = vectors[start:start + BLOCK_ROWS] @ self.centroids.T
+            out[start:start + BLOCK_ROWS] = np.argmax(block, axis=1)
+        return out
+
+    def train(self, vectors: np.ndarray, count: int, seed: int = 0):
+        """Fit centroids on a sample of vectors[:count] and assign every row"""
+        # k-means needs at least one row per cell
+        nlist = min(self.nlist or max(16, int(2 * math.sqrt(count))), count)
+        rng = np.random.default_rng(seed)
+        sample_size = min(count, nlist * 32)
+        sample = np.asarray(vectors[np.sort(rng.choice(count, sample_size, replace=False))], dtype=np.float32)
+
+        start = time.perf_counter()
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            self.centroids = centroids
+            labels = self._nearest(sample)
+            # Sum each cell's members with one reduceat over the label-sorted sample
+            order = np.argsort(labels, kind='stable')
+            counts = np.bincount(labels, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            filled = counts > 0
+            sums[filled] = np.add.reduceat(sample[order], (np.cumsum(counts) - counts)[filled])
+            empty = ~filled
+            # Re-seed empty cells with random sample points
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+            centroids = _normalize(sums)
+        self.centroids = centroids.astype(np.float32)
+        self.trained_rows = count
+        self._save()
+        self._assign_all(vectors, count)
+        print(f"Trained IVF index: {nlist} lists over {count} rows in {time.perf_counter() - start:.1f}s")
+
+    def _save(self):
+        if not self.centroids_path:
+            return
+        tmp_path = f"{self.centroids_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self.centroids)
+            np.save(f, np.array([self.trained_rows]))
+        os.replace(tmp_path, self.centroids_path)
+
+    def load(self, vectors: np.ndarray, count: int) -> bool:
+        """Reuse saved centroids for vectors[:count]; False if none fit"""
+        if not self.centroids_path or not os.path.exists(self.centroids_path):
+            return False
+        with open(self.centroids_path, 'rb') as f:
+            centroids = np.load(f)
+            trained_rows = int(np.load(f)[0])
+        if centroids.shape[1] != vectors.shape[1]:
+            return False
+        self.centroids, self.trained_rows = centroids, trained_rows
+        self._assign_all(vectors, count)
+        return True
+
+    def _assign_all(self, vectors: np.ndarray, count: int):
+        self._lists = [[] for _ in range(len(self.centroids))]
+        self._arrays = [None] * len(self.centroids)
+        self._assignment = np.full(count, -1, dtype=np.int32)
+        self.add(vectors, range(count))
+
+    def add(self, vectors: np.ndarray, rows):
+        """Assign new or re-written rows to their nearest cell"""
+        if not self.trained:
+            return
+        rows = np.fromiter(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        if rows.max() >= len(self._assignment):
+            grown = np.full(max(int(rows.max()) + 1, 2 * len(self._assignment)), -1, dtype=np.int32)
+            grown[:len(self._assignment)] = self._assignment
+            self._assignment = grown
+
+        labels = self._nearest(np.asarray(vectors[rows], dtype=np.float32))
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            previous = self._assignment[row]
+            if previous == label:
+                continue
+            if previous >= 0:
+                self._lists[previous].remove(row)
+                self._arrays[previous] = None
+            self._lists[label].append(row)
+            self._arrays[label] = None
+            self._assignment[row] = label
+
+    def needs_training(self, count: int) -> bool:
+        """True once the store is big enough, and again after it quadruples"""
+        return count >= self.min_rows and (not self.trained or count >= 4 * self.trained_rows)
+
+    def build(self, vectors: np.ndarray, count: int):
+        """Load saved centroids if they still fit, otherwise train new ones"""
+        if self.load(vectors, count) and not self.needs_training(count):
+            return
+        self.train(vectors, count)
+
+    def _cell(self, label: int) -> np.ndarray:
+        if self._arrays[label] is None:
+            self._arrays[label] = np.array(self._lists[label], dtype=np.int64)
+        return self._arrays[label]
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int,
+               nprobe: Optional[int] = None) -> List[int]:
+        """Rows of the (approximately) k most similar vectors to a normalized query"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        rows = np.concatenate([self._cell(label) for label in probe])
+        if not len(rows):
+            return []
+        # Sorted rows read the memory-mapped matrix front to back
+        rows = np.sort(rows)
+        scores = vectors[rows] @ query
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+            best = best[np.argsort(-scores[best])]
+        else:
+            best = np.argsort(-scores)
+        return rows[best].tolist()
+
+
+def exact_search(vectors: np.ndarray, query: np.ndarray, k: int) -> List[int]:
+    scores = vectors @ query
+    best = np.argpartition(-scores, k)[:k]
+    return best[np.argsort(-scores[best])].tolist()
+
+
+def synthetic_embeddings(counts: List[int], dims: int, topics: int, seed: int = 0,
+                         latent_dims: int = 64) -> List[np.ndarray]:
+    """
+    Unit vectors with embedding-like structure: topic clusters in a low
+    dimensional latent space, projected up to dims. Isotropic noise in
+    3072-d would make every point equidistant, which no real corpus is.
+    Returns one matrix per count, all drawn from the same distribution.
+    """
+    rng = np.random.default_rng(seed)
+    projection = rng.standard_normal((latent_dims, dims), dtype=np.float32)
+    topic_centers = rng.standard_normal((topics, latent_dims), dtype=np.float32)
+    matrices = []
+    for rows in counts:
+        out = np.empty((rows, dims), dtype=np.float32)
+        for start in range(0, rows, BLOCK_ROWS):
+            n = min(BLOCK_ROWS, rows - start)
+            latent = topic_centers[rng.integers(0, topics, n)] \
+                + rng.standard_normal((n, latent_dims), dtype=np.float32)
+            out[start:start + n] = _normalize(latent @ projection
+                                              + 0.5 * rng.standard_normal((n, dims), dtype=np.float32))
+        matrices.append(out)
+    return matrices
+
+
+def benchmark(rows: int = 50000, dims: int = 3072, topics: int = 200,
+              queries: int = 100, k: int = 10):
+    """Recall@k and latency of IVF search against exact search"""
+    vectors, query_vectors = synthetic_embeddings([rows, queries], dims, topics)
+
+    start = time.perf_counter()
+    truth = [exact_search(vectors, q, k) for q in query_vectors]
+    exact_ms = (time.perf_counter() - start) / queries * 1000
+    print(f"{rows} x {dims}: exact search {exact_ms:.2f} ms/query")
+
+    index = IVFIndex(min_rows=1)
+    index.train(vectors, rows)
+    for nprobe in (1, 2, 4, 8, 16, 32, 64):
+        start = time.perf_counter()
+        found = [index.search(vectors, q, k, nprobe=nprobe) for q in query_vectors]
+        elapsed_ms = (time.perf_counter() - start) / queries * 1000
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        print(f"nprobe={nprobe:3d}: recall@{k} {recall:.3f}, {elapsed_ms:.2f} ms/query "
+              f"({exact_ms / elapsed_ms:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from ttl_cache import TTLCache
+
+ANSWER_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'answers.db')
+DEFAULT_TTL = 24 * 3600
+DEFAULT_THRESHOLD = 0.95
+DEFAULT_MAX_ENTRIES = 20000
+# Every cached question of a paper is compared on a semantic lookup
+DEFAULT_MAX_PER_DOC = 200
+# Papers whose question embeddings are held in memory for semantic lookups
+DEFAULT_MATRIX_DOCS = 64
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", (question or "").lower()).split())
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha256(normalize_question(question).encode('utf-8')).hexdigest()
+
+
+def _unit(vector: List[float]) -> array:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return array('f', (x / norm for x in vector) if norm else vector)
+
+
+def _numpy():
+    """NumPy for semantic lookups, or None when it is not installed"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class AnswerCache:
+    """
+    Per-paper cache of generated answers.
+
+    A question hits when its normalized text matches a cached question
+    of the same doc_id, or else when its embedding has cosine similarity
+    of at least threshold with one, so "What is the main contribution?"
+    and "what's the paper's main contribution" share an answer. Entries
+    expire after ttl seconds; past max_entries overall, or
+    max_per_doc for one paper, the least recently used are evicted.
+    Stored in SQLite (WAL) so every worker process shares it.
+
+    Entries are keyed by the paper's ingestion version as well, so
+    answers given against an older chunking of a paper stop matching
+    once it is re-ingested. A paper's question embeddings are kept in
+    memory as one matrix and compared with a single product; the
+    matrix is reloaded when the paper's entries change in any process.
+    Only semantic lookups need NumPy; without it they count as misses
+    and exact matches keep working.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl: Optional[int] = None,
+                 threshold: Optional[float] = None, max_entries: Optional[int] = None,
+                 max_per_doc: Optional[int] = None):
+        self.db_path = db_path or os.getenv("ANSWER_CACHE_PATH", ANSWER_CACHE_PATH)
+        self.ttl = ttl or int(os.getenv("ANSWER_CACHE_TTL", DEFAULT_TTL))
+        self.threshold = threshold or float(os.getenv("ANSWER_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.max_per_doc = max_per_doc or int(os.getenv("ANSWER_CACHE_MAX_PER_DOC", DEFAULT_MAX_PER_DOC))
+        # (doc_id, version) -> (signature, ids, created_at, unit vectors)
+        self._matrices = TTLCache(
+            ttl=self.ttl, max_entries=int(os.getenv("ANSWER_CACHE_MATRIX_DOCS", DEFAULT_MATRIX_DOCS)))
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    doc_id TEXT NOT NULL,
+                    question_hash TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    vector BLOB,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    UNIQUE (doc_id, question_hash)
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(answers)")}
+            if "version" not in columns:
+                conn.execute("ALTER TABLE answers ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def lookup(self, doc_id: str, question: str,
+               embed: Callable[[], Optional[List[float]]], version: int = 0) -> Optional[Dict]:
+        """
+        Cached answer data for a question, or None.
+
+        embed() is only called when no normalized match exists. Hits
+        carry "match" ("exact" or "semantic") and "similarity".
+        """
+        hit = self.lookup_exact(doc_id, question, version)
+        if hit is not None:
+            return hit
+        return self.lookup_similar(doc_id, embed(), version)
+
+    def lookup_exact(self, doc_id: str, question: str, version: int = 0) -> Optional[Dict]:
+        """Cached answer to the same normalized question; a miss is counted by lookup_similar"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, data FROM answers WHERE doc_id = ? AND version = ? AND question_hash = ? "
+                "AND created_at > ?",
+                (doc_id, version, question_hash(question), time.time() - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), row['id']))
+        self._count("exact_hits")
+        return {**json.loads(row['data']), "match": "exact", "similarity": 1.0}
+
+    def lookup_similar(self, doc_id: str, vector: Optional[List[float]], version: int = 0) -> Optional[Dict]:
+        """Cached answer to the question most similar to vector, if within threshold"""
+        np = _numpy()
+        if vector is not None and np is not None:
+            query = np.frombuffer(_unit(vector), dtype=np.float32)
+            with self._connect() as conn:
+                ids, created_at, matrix = self._matrix(np, conn, doc_id, version, len(query))
+                scores = matrix @ query
+                # Expired rows stay in the matrix until the next put purges them
+                scores[created_at <= time.time() - self.ttl] = -1.0
+                best = int(np.argmax(scores)) if len(scores) else -1
+                if best >= 0 and scores[best] >= self.threshold:
+                    row = conn.execute("SELECT data FROM answers WHERE id = ?", (int(ids[best]),)).fetchone()
+                    if row is not None:
+                        conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), int(ids[best])))
+                        self._count("semantic_hits")
+                        return {**json.loads(row['data']), "match": "semantic",
+                                "similarity": round(float(scores[best]), 4)}
+
+        self._count("misses")
+        return None
+
+    def _matrix(self, np, conn, doc_id: str, version: int, dims: int):
+        """(ids, created_at, unit vectors) of a paper's cached questions, reloaded when they change"""
+        # Every insert gets a new id and every removal lowers the count
+        signature = tuple(conn.execute(
+            "SELECT COUNT(*), MAX(id) FROM answers WHERE doc_id = ? AND version = ? AND vector IS NOT NULL",
+            (doc_id, version)
+        ).fetchone())
+        found, cached = self._matrices.get((doc_id, version))
+        if found and cached[0] == signature and cached[3].shape[1] == dims:
+            return cached[1:]
+
+        rows = [row for row in conn.execute(
+            "SELECT id, created_at, vector FROM answers WHERE doc_id = ? AND version = ? AND vector IS NOT NULL",
+            (doc_id, version)
+        ) if len(row['vector']) == dims * 4]
+        ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        created_at = np.array([row['created_at'] for row in rows], dtype=np.float64)
+        matrix = np.frombuffer(b"".join(row['vector'] for row in rows), dtype=np.float32).reshape(len(rows), dims)
+        self._matrices.set((doc_id, version), (signature, ids, created_at, matrix), ttl=self.ttl)
+        return ids, created_at, matrix
+
+    def put(self, doc_id: str, question: str, vector: Optional[List[float]], data: Dict, version: int = 0):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl,))
+            # Answers from an earlier ingestion of the paper no longer apply
+            conn.execute("DELETE FROM answers WHERE doc_id = ? AND version != ?", (doc_id, version))
+            conn.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(doc_id, question_hash, question, vector, version, data, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, question_hash(question), question,
+                 _unit(vector).tobytes() if vector else None, version, json.dumps(data), now, now)
+            )
+            # Semantic lookups scan a paper's entries, so each paper keeps its most used ones
+            conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers WHERE doc_id = ? "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (doc_id, self.max_per_doc)
+            )
+            conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "entries": count
+        }
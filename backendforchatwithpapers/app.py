@@ -1,7 +1,9 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from chat_with_paper import ChatWithPaper
-import json
+from http_client import get_session
+from request_fields import flag
+from sse import format_sse
 import logging
 from datetime import datetime
 
@@ -46,7 +48,9 @@ def log_response_info(response):
     """Log details of outgoing responses"""
     if request.path.startswith('/api/'):
         logging.info(f"Outgoing Response: {response.status}")
-        logging.info(f"Response Data: {response.get_data(as_text=True)}")
+        # Reading a streamed body here would drain it before the client sees it
+        if not response.is_streamed:
+            logging.info(f"Response Data: {response.get_data(as_text=True)}")
         response.headers['X-Request-Time'] = datetime.utcnow().isoformat()
     return response
 
@@ -67,7 +71,8 @@ def chat():
         result = chat_service.chat_with_paper(
             pdf_url=data['pdf_url'],
             title=data['title'],
-            question=data['question']
+            question=data['question'],
+            use_cache=flag(data, 'use_cache')
         )
         
         status_code = 400 if "error" in result else 200
@@ -77,6 +82,43 @@ def chat():
         logging.error(f"Chat error: {str(e)}", exc_info=True)
         return _corsify_actual_response(jsonify({"error": "Internal server error"})), 500
 
+@app.route('/api/chat/stream', methods=['POST', 'OPTIONS'])
+def chat_stream():
+    """Stream chat answers as Server-Sent Events"""
+    if request.method == 'OPTIONS':
+        return _build_cors_preflight_response()
+
+    data = request.get_json(silent=True)
+    logging.info(f"Streaming chat request data: {data}")
+
+    if not data or not all(k in data for k in ['pdf_url', 'title', 'question']):
+        logging.error("Missing required fields in streaming chat request")
+        return _corsify_actual_response(
+            jsonify({"error": "Missing required fields (pdf_url, title, question)"})), 400
+
+    def generate():
+        try:
+            for event in chat_service.stream_chat_with_paper(
+                pdf_url=data['pdf_url'],
+                title=data['title'],
+                question=data['question'],
+                use_cache=flag(data, 'use_cache')
+            ):
+                if event["event"] == "done":
+                    logging.info(f"Streamed answer for {event['data']['doc_id']}: "
+                                 f"first token {event['data']['first_token_seconds']}s, "
+                                 f"total {event['data']['total_seconds']}s")
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            logging.error(f"Streaming chat error: {str(e)}", exc_info=True)
+            yield format_sse("error", {"error": "Internal server error"})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep nginx and similar proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return _corsify_actual_response(response)
+
 @app.route('/api/generate-questions', methods=['POST', 'OPTIONS'])
 def generate_questions():
     """Generate practice questions from paper content"""
@@ -114,7 +156,15 @@ def generate_questions():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint to verify API status"""
-    return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()}), 200
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "http": get_session().metrics.snapshot(),
+        "embeddings": chat_service.embedder.store.stats(),
+        "pdf_validation": chat_service.validation_cache.stats(),
+        "ingestion": chat_service.ingestion.stats(),
+        "answers": chat_service.answer_cache.stats()
+    }), 200
 
 def _build_cors_preflight_response():
     """Handle CORS preflight requests"""
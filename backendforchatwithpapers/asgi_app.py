@@ -0,0 +1,150 @@
+"""
+ASGI entry point for the chat service.
+
+Serves the same /api routes as app.py on AsyncChatWithPaper, so each
+process can hold many concurrent chats. Run with an ASGI server:
+
+    hypercorn asgi_app:app --bind 0.0.0.0:8000
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
+
+from async_chat_with_paper import AsyncChatWithPaper
+from http_client import get_session
+from request_fields import flag
+from sse import format_sse
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(),
+        logging.FileHandler('api.log')
+    ]
+)
+
+app = cors(
+    Quart(__name__),
+    allow_origin="*",
+    allow_methods=["OPTIONS", "POST", "GET"],
+    allow_headers=["*"],
+    expose_headers=["*"]
+)
+
+chat_service = None
+
+
+@app.before_serving
+async def startup():
+    # Async clients bind to the running loop, so create them once it exists
+    global chat_service
+    chat_service = AsyncChatWithPaper()
+
+
+@app.after_serving
+async def shutdown():
+    await chat_service.close()
+
+
+@app.after_request
+async def log_response_info(response):
+    if request.path.startswith('/api/'):
+        logging.info(f"{request.method} {request.path} -> {response.status}")
+        response.headers['X-Request-Time'] = datetime.utcnow().isoformat()
+        response.headers['X-API-Version'] = "1.0"
+    return response
+
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
+    """Handle chat requests with paper content"""
+    try:
+        data = await request.get_json()
+        if not data or not all(k in data for k in ['pdf_url', 'title', 'question']):
+            return jsonify({"error": "Missing required fields (pdf_url, title, question)"}), 400
+
+        result = await chat_service.chat_with_paper(
+            pdf_url=data['pdf_url'],
+            title=data['title'],
+            question=data['question'],
+            use_cache=flag(data, 'use_cache')
+        )
+        return jsonify(result), 400 if "error" in result else 200
+    except Exception as e:
+        logging.error(f"Chat error: {str(e)}", exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Stream chat answers as Server-Sent Events"""
+    data = await request.get_json(silent=True)
+    if not data or not all(k in data for k in ['pdf_url', 'title', 'question']):
+        return jsonify({"error": "Missing required fields (pdf_url, title, question)"}), 400
+
+    async def generate():
+        try:
+            async for event in chat_service.stream_chat_with_paper(
+                pdf_url=data['pdf_url'],
+                title=data['title'],
+                question=data['question'],
+                use_cache=flag(data, 'use_cache')
+            ):
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            logging.error(f"Streaming chat error: {str(e)}", exc_info=True)
+            yield format_sse("error", {"error": "Internal server error"})
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.timeout = None
+    return response
+
+
+@app.route('/api/generate-questions', methods=['POST'])
+async def generate_questions():
+    """Generate practice questions from paper content"""
+    try:
+        data = await request.get_json()
+        if not data:
+            return jsonify({"error": "No data received"}), 400
+        if 'pdf_url' not in data or 'title' not in data:
+            return jsonify({"error": "Missing required fields (pdf_url, title)"}), 400
+
+        # One long completion over the paper text; keep it off the event loop
+        questions = await asyncio.to_thread(
+            chat_service.sync.generate_practice_questions,
+            pdf_url=data['pdf_url'],
+            title=data['title'],
+            num_questions=data.get('num_questions', 5),
+            difficulty=data.get('difficulty', 'medium'),
+            question_type=data.get('question_type', 'mixed'),
+            description=data.get('description', '')
+        )
+        return jsonify(questions)
+    except Exception as e:
+        logging.error(f"Question generation error: {str(e)}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint to verify API status"""
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "http": get_session().metrics.snapshot(),
+        "embeddings": await asyncio.to_thread(chat_service.sync.embedder.store.stats),
+        "pdf_validation": chat_service.sync.validation_cache.stats(),
+        "ingestion": await asyncio.to_thread(chat_service.sync.ingestion.stats),
+        "answers": await asyncio.to_thread(chat_service.sync.answer_cache.stats)
+    }), 200
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=8000)
@@ -0,0 +1,298 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents.aio import SearchClient
+from openai import AsyncAzureOpenAI
+
+from chat_with_paper import ChatWithPaper
+from vector_store import INDEX_NAME, AzureSearchBackend
+
+
+class AsyncChatWithPaper:
+    """
+    asyncio version of the ChatWithPaper chat surface.
+
+    Question answering runs on async clients (Azure Search aio, Azure
+    OpenAI, httpx), so one process can hold hundreds of chats in flight
+    while they wait on the network. Requests go in the same order as
+    the synchronous service: an exact cached answer first, then the
+    index lookup and the question embedding together, a semantic cache
+    match, and the PDF HEAD check only for papers that turn out to be
+    new. The question is embedded on the async client against the
+    synchronous service's embedding store, so both paths share cached
+    vectors. Ingestion (Document Intelligence, batched embedding,
+    upload) is rare and heavy, so it stays on the synchronous
+    ChatWithPaper in a worker thread, keeping its single-flight and
+    lock-file coalescing.
+    """
+
+    def __init__(self, sync_service: Optional[ChatWithPaper] = None):
+        self.sync = sync_service or ChatWithPaper()
+        # The local index is in-process, so it is queried from a worker thread instead
+        self.search_client = SearchClient(
+            endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
+            index_name=INDEX_NAME,
+            credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_KEY"))
+        ) if isinstance(self.sync.index, AzureSearchBackend) else None
+
+        self.openai_client = AsyncAzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_KEY"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_version="2024-05-01-preview")
+
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(10, connect=5),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("HTTP_POOL_SIZE", "100")),
+                max_keepalive_connections=20),
+            follow_redirects=True)
+
+        self.CHAT_MODEL = self.sync.CHAT_MODEL
+
+    async def close(self):
+        if self.search_client is not None:
+            await self.search_client.close()
+        await asyncio.gather(self.openai_client.close(), self.http.aclose())
+
+    async def _prepare(self, pdf_url: str, title: str, question: str, use_cache: bool = True) -> Dict:
+        """
+        Cached answer, or what answering needs: whether the paper is
+        indexed and the question vector. The lookup and the embedding
+        run concurrently; an exact cache hit needs neither.
+        """
+        doc_id = self.sync._generate_doc_id(pdf_url, title)
+        version = 0
+        if use_cache:
+            version = await asyncio.to_thread(self.sync._answer_version, doc_id)
+            cached = await self._cache_lookup(self.sync.answer_cache.lookup_exact, doc_id, question, version)
+            if cached:
+                return {"doc_id": doc_id, "cached": cached}
+
+        exists, question_vector = await asyncio.gather(
+            self._paper_exists(doc_id),
+            self._get_embedding(question))
+        if use_cache:
+            cached = await self._cache_lookup(
+                self.sync.answer_cache.lookup_similar, doc_id, question_vector, version)
+            if cached:
+                return {"doc_id": doc_id, "cached": cached}
+
+        # Indexed papers were validated already; only new ones get the HEAD request
+        if not exists and not await self._validate_pdf(pdf_url):
+            return {"error": "Invalid PDF URL"}
+        if question_vector is None:
+            return {"error": "Failed to generate embedding"}
+        return {"doc_id": doc_id, "exists": exists, "vector": question_vector}
+
+    async def _ensure_indexed(self, pdf_url: str, title: str, doc_id: str) -> Dict:
+        return await asyncio.to_thread(self.sync._ensure_indexed, pdf_url, title, doc_id)
+
+    @staticmethod
+    async def _cache_lookup(lookup, doc_id: str, key, version: int) -> Optional[Dict]:
+        try:
+            return await asyncio.to_thread(lookup, doc_id, key, version)
+        except Exception as e:
+            print(f"Answer cache lookup failed: {str(e)}")
+            return None
+
+    async def chat_with_paper(self, pdf_url: str, title: str, question: str, use_cache: bool = True) -> Dict:
+        """Async counterpart of ChatWithPaper.chat_with_paper"""
+        if not all([pdf_url, title, question]):
+            return {"error": "Missing pdf_url, title, or question"}
+
+        prepared = await self._prepare(pdf_url, title, question, use_cache)
+        if "error" in prepared:
+            return prepared
+
+        doc_id = prepared["doc_id"]
+        cached = prepared.get("cached")
+        if cached:
+            return {"answer": cached["answer"], "sources": [title], "doc_id": doc_id,
+                    "cached": cached["match"]}
+
+        if not prepared["exists"]:
+            process_result = await self._ensure_indexed(pdf_url, title, doc_id)
+            if "error" in process_result:
+                return process_result
+        else:
+            await asyncio.to_thread(self.sync._resume_ingestion, doc_id)
+
+        try:
+            hits = await self._retrieve(doc_id, question, prepared["vector"])
+            hits = await asyncio.to_thread(self.sync._annotate_hits, pdf_url, hits)
+            response = await self.openai_client.chat.completions.create(
+                model=self.CHAT_MODEL,
+                messages=self.sync._answer_messages(title, question, hits),
+                temperature=0.3,
+                max_tokens=self.sync.MAX_ANSWER_TOKENS
+            )
+            answer = response.choices[0].message.content
+            if use_cache:
+                await asyncio.to_thread(
+                    self.sync._cache_answer, doc_id, question, answer, hits, prepared["vector"])
+            return {
+                "answer": answer,
+                "sources": [title],
+                "doc_id": doc_id
+            }
+        except Exception as e:
+            return {"error": f"Failed to answer question: {str(e)}"}
+
+    async def stream_chat_with_paper(self, pdf_url: str, title: str, question: str,
+                                     use_cache: bool = True) -> AsyncIterator[Dict]:
+        """Async counterpart of ChatWithPaper.stream_chat_with_paper, same events"""
+        start = time.perf_counter()
+        if not all([pdf_url, title, question]):
+            yield {"event": "error", "data": {"error": "Missing pdf_url, title, or question"}}
+            return
+
+        prepared = await self._prepare(pdf_url, title, question, use_cache)
+        if "error" in prepared:
+            yield {"event": "error", "data": prepared}
+            return
+
+        doc_id = prepared["doc_id"]
+        cached = prepared.get("cached")
+        if cached:
+            for event in self.sync._cached_events(doc_id, title, cached, start):
+                yield event
+            return
+
+        if not prepared["exists"]:
+            yield {"event": "status", "data": {"status": "indexing", "doc_id": doc_id}}
+            process_result = await self._ensure_indexed(pdf_url, title, doc_id)
+            if "error" in process_result:
+                yield {"event": "error", "data": process_result}
+                return
+        else:
+            await asyncio.to_thread(self.sync._resume_ingestion, doc_id)
+
+        try:
+            hits = await self._retrieve(doc_id, question, prepared["vector"])
+            hits = await asyncio.to_thread(self.sync._annotate_hits, pdf_url, hits)
+            yield {"event": "sources", "data": {
+                "doc_id": doc_id,
+                "title": title,
+                "sources": self.sync._source_excerpts(hits)
+            }}
+
+            stream = await self.openai_client.chat.completions.create(
+                model=self.CHAT_MODEL,
+                messages=self.sync._answer_messages(title, question, hits),
+                temperature=0.3,
+                max_tokens=self.sync.MAX_ANSWER_TOKENS,
+                stream=True
+            )
+            parts = []
+            first_token = None
+            async for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(chunk.choices[0].delta.content)
+                yield {"event": "token", "data": {"text": parts[-1]}}
+
+            if use_cache:
+                await asyncio.to_thread(
+                    self.sync._cache_answer, doc_id, question, "".join(parts), hits, prepared["vector"])
+            yield {"event": "done", "data": {
+                "answer": "".join(parts),
+                "sources": [title],
+                "doc_id": doc_id,
+                "first_token_seconds": round(first_token, 3) if first_token is not None else None,
+                "total_seconds": round(time.perf_counter() - start, 3)
+            }}
+        except Exception as e:
+            yield {"event": "error", "data": {"error": f"Failed to answer question: {str(e)}"}}
+
+    async def _retrieve(self, doc_id: str, question: str, vector: List[float],
+                        top: Optional[int] = None) -> List[Dict]:
+        """Hybrid search over this paper's chunks"""
+        top = top or self.sync.RETRIEVAL_TOP
+        if self.search_client is None:
+            results = await asyncio.to_thread(
+                self.sync.index.search, question, vector, doc_id=doc_id, top=top,
+                select=["content", "chunk_index", "chunk_offset"])
+            return [self.sync._hit(result) for result in results]
+
+        results = await self.search_client.search(
+            search_text=question,
+            vector_queries=[{
+                "fields": "content_vector",
+                "kind": "vector",
+                "vector": vector,
+                "k": top
+            }],
+            filter=f"doc_id eq '{doc_id}'",
+            select=["content", "chunk_index", "chunk_offset"],
+            top=top
+        )
+        return [self.sync._hit(result) async for result in results]
+
+    async def _get_embedding(self, text: str) -> Optional[List[float]]:
+        """
+        Embed one text on the async client, through the same embedding
+        store, model and truncation as the sync BatchEmbedder. Only the
+        quick SQLite lookups use worker threads, so uncached questions
+        do not queue on the default executor.
+        """
+        embedder = self.sync.embedder
+        text = text[:embedder.max_chars]
+        if embedder.store:
+            cached = await asyncio.to_thread(embedder.store.get_many, embedder.model, [text])
+            if text in cached:
+                return cached[text]
+        try:
+            response = await self.openai_client.embeddings.create(input=[text], model=embedder.model)
+            vector = response.data[0].embedding
+        except Exception as e:
+            print(f"Embedding generation failed: {str(e)}")
+            return None
+        if embedder.store:
+            await asyncio.to_thread(embedder.store.put_many, embedder.model, {text: vector})
+        return vector
+
+    async def _validate_pdf(self, url: str) -> bool:
+        """Same checks and shared cache as ChatWithPaper._validate_pdf, without blocking the loop"""
+        cache = self.sync.validation_cache
+        found, valid = cache.get(url)
+        if found:
+            return valid
+        try:
+            valid = await self._check_pdf(url)
+        except Exception as e:
+            print(f"URL validation error: {str(e)}")
+            return False
+        cache.set(url, valid)
+        return valid
+
+    async def _check_pdf(self, url: str) -> bool:
+        parsed = urlparse(url)
+        if not all([parsed.scheme, parsed.netloc]):
+            return False
+        if not (url.lower().endswith('.pdf') or 'pdf' in parsed.path.lower()):
+            return False
+
+        response = await self.http.head(url, headers={
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'
+        })
+        content_type = response.headers.get('Content-Type', '').lower()
+        return (
+            response.status_code == 200 and
+            ('application/pdf' in content_type or 'octet-stream' in content_type)
+        )
+
+    async def _paper_exists(self, doc_id: str) -> bool:
+        if self.search_client is None:
+            return await asyncio.to_thread(self.sync._paper_exists, doc_id)
+        try:
+            document = await self.search_client.get_document(key=doc_id)
+            return bool(document.get("doc_id"))
+        except Exception:
+            return False
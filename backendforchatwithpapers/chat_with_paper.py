@@ -2,26 +2,35 @@ import os
 import hashlib
 import re
 import time
-from typing import Dict, Optional, List  # Added this import
+from typing import Dict, Iterator, Optional, List  # Added this import
 from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
 from azure.ai.formrecognizer import DocumentAnalysisClient
 from openai import AzureOpenAI
 from dotenv import load_dotenv
-import requests
-from functools import lru_cache
+from http_client import get_session
+from vector_store import get_vector_backend
+from embeddings import BatchEmbedder
+from embedding_store import EmbeddingStore
+from text_store import BOILERPLATE_ROLES, ExtractedTextStore, StructuredDocument, document_text
+from chunker import iter_chunks
+from single_flight import SingleFlight, file_lock
+from ttl_cache import TTLCache
+from question_cache import QuestionCache
+from answer_cache import AnswerCache
+from context_builder import ContextBuilder
+from ingestion_store import IngestionStore, STAGE_COMPLETE, STAGE_EMPTY, STAGE_EXTRACT
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 import json
+import threading
 
 load_dotenv()
 
 class ChatWithPaper:
     def __init__(self):
         """Initialize with Azure services"""
-        self.search_client = SearchClient(
-            endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
-            index_name="paper-videos",
-            credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_KEY")))
+        # Azure Search by default, or the in-process index with VECTOR_BACKEND=local
+        self.index = get_vector_backend()
         
         self.document_analysis_client = DocumentAnalysisClient(
             endpoint=os.getenv("AZURE_DOC_INTEL_ENDPOINT"),
@@ -34,61 +43,292 @@ class ChatWithPaper:
 
         # Configuration
         self.MAX_CONTENT_LENGTH = 4000
+        self.CHUNK_SIZE = 4000          # characters per indexed chunk
+        self.CHUNK_OVERLAP = 200        # characters shared by neighbouring chunks
+        self.UPLOAD_BATCH_SIZE = 100    # documents per upload call
         self.CHAT_MODEL = "gpt-4"
         self.EMBEDDING_MODEL = "text-embedding-3-large"
+        self.POLLING_INTERVAL = 2       # seconds for Document Intelligence
+        # The layout model reports paragraph roles (headings, page furniture) and tables
+        self.DOC_INTEL_MODEL = os.getenv("DOC_INTEL_MODEL", "prebuilt-layout")
+        self.RETRIEVAL_TOP = 8          # chunks retrieved per question, packed by score
+        self.MAX_ANSWER_TOKENS = 300
+        # Token budgets for paper content, capped by what the deployment's window leaves
+        self.ANSWER_CONTEXT_TOKENS = int(os.getenv("ANSWER_CONTEXT_TOKENS", "3000"))
+        self.QUESTION_CONTEXT_TOKENS = int(os.getenv("QUESTION_CONTEXT_TOKENS", "5000"))
+        self.SUMMARY_CONTEXT_TOKENS = int(os.getenv("SUMMARY_CONTEXT_TOKENS", "6000"))
+        self.context = ContextBuilder(self.CHAT_MODEL)
 
-    def chat_with_paper(self, pdf_url: str, title: str, question: str) -> Dict:
+        self.LOCK_DIR = os.getenv("INDEX_LOCK_DIR", os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'locks'))
+
+        self.text_store = ExtractedTextStore()
+        # Recently used documents, to map retrieved chunks to pages and sections
+        self._documents = TTLCache(ttl=600, max_entries=32)
+        self.ingestion = IngestionStore()
+        self._indexing = SingleFlight()
+        self._summaries = SingleFlight()
+        self._resuming = set()
+        self._resuming_lock = threading.Lock()
+        self.INGESTION_RETRY_SECONDS = int(os.getenv("INGESTION_RETRY_SECONDS", "60"))
+        self.question_cache = QuestionCache()
+        self.answer_cache = AnswerCache()
+        self._question_top_ups = SingleFlight()
+        self._background = ThreadPoolExecutor(
+            max_workers=int(os.getenv("BACKGROUND_WORKERS", "2")),
+            thread_name_prefix="chat-background")
+        # Failed validations are retried after a minute, a URL can come back
+        self.validation_cache = TTLCache(
+            ttl=int(os.getenv("PDF_VALIDATION_TTL", "3600")),
+            negative_ttl=int(os.getenv("PDF_VALIDATION_NEGATIVE_TTL", "60")))
+
+        self.embedder = BatchEmbedder(
+            self.openai_client, self.EMBEDDING_MODEL, max_chars=self.MAX_CONTENT_LENGTH,
+            store=EmbeddingStore())
+
+    def chat_with_paper(self, pdf_url: str, title: str, question: str, use_cache: bool = True) -> Dict:
         """
         One-stop method to:
-        1. Check if paper exists
-        2. Index if needed
-        3. Answer question
+        1. Return a cached answer to the same or a similar question
+        2. Check if paper exists
+        3. Index if needed
+        4. Answer question
+
+        use_cache=False neither reads nor stores a cached answer.
         """
         # Validate inputs
         if not all([pdf_url, title, question]):
             return {"error": "Missing pdf_url, title, or question"}
         
-        if not self._validate_pdf(pdf_url):
-            return {"error": "Invalid PDF URL"}
-
         # Generate document ID
         doc_id = self._generate_doc_id(pdf_url, title)
 
-        # Check if paper exists, process if not
+        cached = self._cached_answer(doc_id, question) if use_cache else None
+        if cached:
+            return {"answer": cached["answer"], "sources": [title], "doc_id": doc_id,
+                    "cached": cached["match"]}
+
+        # Check if paper exists, process if not; indexed papers were validated already
         if not self._paper_exists(doc_id):
-            process_result = self._process_paper(pdf_url, title, doc_id)
+            if not self._validate_pdf(pdf_url):
+                return {"error": "Invalid PDF URL"}
+            process_result = self._ensure_indexed(pdf_url, title, doc_id)
             if "error" in process_result:
                 return process_result
+        else:
+            self._resume_ingestion(doc_id)
 
         # Answer the question
-        return self._answer_question(doc_id, question, title)
+        return self._answer_question(doc_id, question, title, use_cache, pdf_url)
+
+    def _ensure_indexed(self, pdf_url: str, title: str, doc_id: str) -> Dict:
+        """
+        Index a paper once no matter how many requests ask for it at once.
+
+        Threads in this process share one call through SingleFlight, and
+        worker processes queue on a per-doc_id lock file. Whoever gets the
+        lock second finds the paper indexed and skips the work. Only the
+        first upload batch is waited for; the rest of a long paper is
+        uploaded in the background.
+        """
+        state = self.ingestion.get(doc_id)
+        if state is not None and state["stage"] == STAGE_EMPTY:
+            return {"error": state["error"]}
+
+        def index():
+            with file_lock(self._lock_path(doc_id)):
+                if self._paper_exists(doc_id):
+                    return {"status": "already_indexed"}
+                # The checkpoint outlived the index (recreated, or VECTOR_BACKEND switched)
+                if self.ingestion.reset_uploads(doc_id):
+                    print(f"Paper {doc_id[:12]} is missing from the index, uploading it again")
+                return self._process_paper(pdf_url, title, doc_id, max_batches=1)
+
+        result = self._indexing.do(doc_id, index)
+        if "error" not in result:
+            self._resume_ingestion(doc_id)
+        return result
+
+    def _lock_path(self, doc_id: str) -> str:
+        return os.path.join(self.LOCK_DIR, f"{doc_id}.lock")
+
+    def _resume_ingestion(self, doc_id: str):
+        """Finish a partly ingested paper in the background, once at a time per paper"""
+        state = self.ingestion.get(doc_id)
+        if state is None or state["stage"] in (STAGE_COMPLETE, STAGE_EMPTY):
+            return
+        # Back off from papers whose last attempt failed
+        if state["error"] and time.time() - state["updated_at"] < self.INGESTION_RETRY_SECONDS:
+            return
+        with self._resuming_lock:
+            if doc_id in self._resuming:
+                return
+            self._resuming.add(doc_id)
+
+        def resume():
+            try:
+                with file_lock(self._lock_path(doc_id)):
+                    result = self._process_paper(state["pdf_url"], state["title"], doc_id)
+                print(f"Background ingestion of {doc_id[:12]}: {result}")
+            finally:
+                with self._resuming_lock:
+                    self._resuming.discard(doc_id)
+
+        self._background.submit(resume)
+
+    def _process_paper(self, pdf_url: str, title: str, doc_id: str,
+                       max_batches: Optional[int] = None) -> Dict:
+        """
+        Index a paper as overlapping chunks, resuming from its checkpoint.
 
-    def _process_paper(self, pdf_url: str, title: str, doc_id: str) -> Dict:
-        """Process and index a paper"""
+        Stages are extract, chunk, embed and upload. Extracted text and
+        embeddings are already kept in their stores; the IngestionStore
+        records the chunking and which chunks have been uploaded, so a
+        retry only embeds and uploads what is missing. Chunks go up in
+        index order, chunk 0 (keyed doc_id, which _paper_exists checks)
+        with the first batch, so the paper answers questions as soon as
+        that batch lands. max_batches stops early, leaving the rest
+        pending. A paper with nothing to index is recorded as empty and
+        not processed again.
+        """
         try:
+            state = self.ingestion.start(doc_id, pdf_url, title)
+            if state["stage"] == STAGE_EMPTY:
+                return {"error": state["error"]}
+
             # Extract text
-            text = self._extract_text(pdf_url)
+            document = self._extract_document(pdf_url)
+            text = document_text(document)
             if not text:
+                self.ingestion.mark_empty(doc_id, "No text extracted from PDF")
                 return {"error": "No text extracted from PDF"}
 
-            # Create embedding
-            embedding = self._get_embedding(text[:self.MAX_CONTENT_LENGTH])
-            if not embedding:
-                return {"error": "Failed to generate embedding"}
+            # Split the whole paper by section, leaving out page headers, footers and numbers
+            if state["stage"] == STAGE_EXTRACT:
+                state["chunks"] = self.ingestion.set_chunks(doc_id, iter_chunks(
+                    document.paragraphs(BOILERPLATE_ROLES), self.CHUNK_SIZE, self.CHUNK_OVERLAP))
+                if not state["chunks"]:
+                    return {"error": self.ingestion.get(doc_id)["error"]}
 
-            # Index document
-            self.search_client.upload_documents(documents=[{
-                "id": doc_id,
-                "title": title,
-                "content": text[:self.MAX_CONTENT_LENGTH],
-                "content_vector": embedding,
-                "url": pdf_url
-            }])
-            
-            return {"status": "processed"}
+            pending = self.ingestion.pending_chunks(doc_id)
+            for batch_number, start in enumerate(range(0, len(pending), self.UPLOAD_BATCH_SIZE)):
+                if max_batches is not None and batch_number >= max_batches:
+                    return {"status": "partial", "chunks": state["chunks"], "pending": len(pending) - start}
+                error = self._upload_chunks(pdf_url, title, doc_id, document,
+                                            pending[start:start + self.UPLOAD_BATCH_SIZE])
+                if error:
+                    self.ingestion.fail(doc_id, error)
+                    return {"error": error}
+
+            self._schedule_summary(pdf_url, title, doc_id)
+            return {"status": "processed", "chunks": state["chunks"]}
         except Exception as e:
+            self.ingestion.fail(doc_id, str(e))
             return {"error": f"Processing failed: {str(e)}"}
-    
+
+    def _upload_chunks(self, pdf_url: str, title: str, doc_id: str, document: StructuredDocument,
+                       chunks: List[Dict]) -> Optional[str]:
+        """Embed and upload one batch of checkpointed chunks; returns an error or None"""
+        contents = [document.excerpt(chunk["chunk_offset"], chunk["length"], BOILERPLATE_ROLES)[0]
+                    for chunk in chunks]
+
+        # Create embeddings in batches; ones that succeeded are kept in the store for a retry
+        embeddings = self._get_embeddings(contents)
+        documents = [{
+            "id": doc_id if chunk["chunk_index"] == 0 else f"{doc_id}-chunk-{chunk['chunk_index']}",
+            "doc_id": doc_id,
+            "chunk_index": chunk["chunk_index"],
+            "chunk_offset": chunk["chunk_offset"],
+            "title": title,
+            "content": content,
+            "content_vector": embedding,
+            "url": pdf_url
+        } for chunk, content, embedding in zip(chunks, contents, embeddings) if embedding is not None]
+        if not documents:
+            return "Failed to generate embedding"
+
+        # Chunk 0 goes last, so _paper_exists only sees papers whose first batch is in
+        documents.sort(key=lambda document: document["chunk_index"] == 0)
+        failed = set(self.index.upload(documents))
+        self.ingestion.mark_uploaded(
+            doc_id, [document["chunk_index"] for document in documents if document["id"] not in failed])
+
+        missing = len(chunks) - len(documents) + len(failed)
+        return f"Failed to index {missing} chunks" if missing else None
+
+    def get_paper_summary(self, pdf_url: str, title: str) -> Dict:
+        """
+        Summary of a paper's key points, written once per chunking of a paper.
+
+        Summaries are produced in the background when ingestion finishes
+        and kept in the IngestionStore, so callers that need paper
+        context (the video generator) get a primary-key read instead of
+        a retrieval and a GPT-4 call. A paper without one is indexed
+        and summarized on the spot.
+        """
+        if not all([pdf_url, title]):
+            return {"error": "Missing pdf_url or title"}
+
+        doc_id = self._generate_doc_id(pdf_url, title)
+        summary = self.ingestion.get_summary(doc_id)
+        if summary:
+            return {"summary": summary, "doc_id": doc_id, "title": title}
+
+        if not self._paper_exists(doc_id):
+            if not self._validate_pdf(pdf_url):
+                return {"error": "Invalid PDF URL"}
+            process_result = self._ensure_indexed(pdf_url, title, doc_id)
+            if "error" in process_result:
+                return process_result
+        return self._summaries.do(doc_id, lambda: self._build_summary(pdf_url, title, doc_id))
+
+    def _schedule_summary(self, pdf_url: str, title: str, doc_id: str):
+        if self.ingestion.get_summary(doc_id) is None:
+            self._background.submit(
+                self._summaries.do, doc_id, lambda: self._build_summary(pdf_url, title, doc_id))
+
+    def _build_summary(self, pdf_url: str, title: str, doc_id: str) -> Dict:
+        """Run the summary completion over the paper text and store the result"""
+        summary = self.ingestion.get_summary(doc_id)
+        if summary:
+            return {"summary": summary, "doc_id": doc_id, "title": title}
+        # Read before the text, so a re-chunking that lands mid-build leaves this summary stale
+        version = self._answer_version(doc_id)
+        try:
+            text = self._extract_text(pdf_url)
+            if not text:
+                return {"error": "No text content extracted from PDF"}
+            system = f"You are a research assistant analyzing: {title}"
+            instructions = ("Provide a comprehensive summary of the key points in this paper: "
+                            "the problem, the main contributions, the method, the results "
+                            "and any limitations.\n\nPaper content:\n")
+            budget = self.context.budget(self.SUMMARY_CONTEXT_TOKENS, 800, system, instructions)
+
+            response = self.openai_client.chat.completions.create(
+                model=self.CHAT_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": system
+                    },
+                    {
+                        "role": "user",
+                        "content": instructions + self.context.pack_text(text, budget)
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=800
+            )
+            summary = response.choices[0].message.content
+            if not summary:
+                return {"error": "Empty summary generated"}
+            self.ingestion.put_summary(doc_id, summary, version)
+            print(f"Stored summary for {doc_id[:12]}")
+            return {"summary": summary, "doc_id": doc_id, "title": title}
+        except Exception as e:
+            print(f"Summary generation for {doc_id[:12]} failed: {str(e)}")
+            return {"error": f"Failed to summarize paper: {str(e)}"}
+
     def generate_practice_questions(
         self, 
         pdf_url: str, 
@@ -113,18 +353,40 @@ class ChatWithPaper:
         if not all([pdf_url, title]):
             return {"error": "Missing pdf_url or title"}
         
-        if not self._validate_pdf(pdf_url):
+        doc_id = self._generate_doc_id(pdf_url, title)
+        params = {
+            "num_questions": num_questions,
+            "difficulty": difficulty,
+            "question_type": question_type,
+            "description": description
+        }
+        cache_key = self.question_cache.make_key(doc_id, **params)
+
+        # Serve a pre-generated set when one is fresh, before any network call
+        cached = self.question_cache.get(cache_key)
+        if cached is not None:
+            cached.setdefault("metadata", {})["cached"] = True
+            self._top_up_questions(cache_key, pdf_url, title, doc_id, params)
+            return cached
+
+        if not self._paper_exists(doc_id) and not self._validate_pdf(pdf_url):
             return {"error": "Invalid PDF URL"}
 
+        questions_data = self._generate_questions(pdf_url, title, **params)
+        if "error" not in questions_data:
+            self._cache_questions(cache_key, doc_id, params, questions_data, served=1)
+            self._top_up_questions(cache_key, pdf_url, title, doc_id, params)
+        return questions_data
+
+    def _generate_questions(self, pdf_url: str, title: str, num_questions: int,
+                            difficulty: str, question_type: str, description: str) -> Dict:
+        """Run one question-generation completion over the paper text"""
         try:
             # Extract text from PDF
             text = self._extract_text(pdf_url)
             if not text:
                 return {"error": "No text content extracted from PDF"}
 
-            # Generate document ID (for caching)
-            doc_id = self._generate_doc_id(pdf_url, title)
-            
             # Create prompt based on user preferences
             type_instructions = {
                 'conceptual': "Focus on theoretical concepts and definitions.",
@@ -148,8 +410,8 @@ class ChatWithPaper:
             * Why each incorrect option is wrong
             * Any relevant context from the paper that helps understand the answer
             
-            Paper content (first 8000 characters):
-            {text[:8000]}
+            Paper content (evenly spaced excerpts if the paper is too long):
+            <<PAPER_CONTENT>>
             
             Return the questions in JSON format with this exact structure:
             {{
@@ -184,6 +446,10 @@ class ChatWithPaper:
             }}
             """
 
+            # Fill what the prompt and the 2000-token completion leave of the window
+            budget = self.context.budget(self.QUESTION_CONTEXT_TOKENS, 2000, prompt)
+            prompt = prompt.replace("<<PAPER_CONTENT>>", self.context.pack_text(text, budget))
+
             # Call OpenAI API
             response = self.openai_client.chat.completions.create(
                 model=self.CHAT_MODEL,
@@ -197,143 +463,337 @@ class ChatWithPaper:
             
             if not isinstance(questions_data.get("questions"), list):
                 return {"error": "Invalid question format generated"}
-                
-            self._cache_questions(doc_id, questions_data)
             
             return questions_data
             
         except Exception as e:
             return {"error": f"Failed to generate questions: {str(e)}"}
     
-    def _cache_questions(self, doc_id: str, questions_data: Dict):
-        """Optional: Cache generated questions in Azure Search"""
+    def _cache_questions(self, cache_key: str, doc_id: str, params: Dict,
+                         questions_data: Dict, served: int = 0):
+        """Store a generated question set in the local question cache"""
         try:
-            # Add document ID to the metadata
-            questions_data["metadata"]["doc_id"] = doc_id
-            
-            # Index the questions
-            self.search_client.upload_documents(documents=[{
-                "id": f"{doc_id}-questions",
-                "type": "practice_questions",
-                "content": json.dumps(questions_data),
-                "content_vector": self._get_embedding(
-                    f"Practice questions for document {doc_id}"
-                )
-            }])
+            questions_data.setdefault("metadata", {})["doc_id"] = doc_id
+            self.question_cache.put(cache_key, doc_id, params, questions_data, served=served)
         except Exception as e:
             print(f"Warning: Failed to cache questions: {str(e)}")
 
+    def _top_up_questions(self, cache_key: str, pdf_url: str, title: str,
+                          doc_id: str, params: Dict):
+        """Fill the variant pool for cache_key in the background"""
+        def top_up():
+            while self.question_cache.count(cache_key) < self.question_cache.variants:
+                questions_data = self._generate_questions(pdf_url, title, **params)
+                if "error" in questions_data:
+                    print(f"Question top-up for {doc_id} failed: {questions_data['error']}")
+                    return
+                self._cache_questions(cache_key, doc_id, params, questions_data)
+
+        if self.question_cache.count(cache_key) < self.question_cache.variants:
+            # Requests arriving while a top-up runs join it instead of starting another
+            self._background.submit(self._question_top_ups.do, cache_key, top_up)
+
     def get_cached_questions(self, doc_id: str) -> Optional[Dict]:
         """Retrieve cached questions if available"""
+        return self.question_cache.latest_for_doc(doc_id)
+
+    def _retrieve(self, doc_id: str, question: str, top: Optional[int] = None,
+                  pdf_url: Optional[str] = None) -> List[Dict]:
+        """Hybrid search over this paper's chunks, with their pages and sections when pdf_url is given"""
+        results = self.index.search(
+            question,
+            self._get_embedding(question),
+            doc_id=doc_id,
+            top=top or self.RETRIEVAL_TOP,
+            select=["content", "chunk_index", "chunk_offset"]
+        )
+        hits = [self._hit(result) for result in results]
+        return self._annotate_hits(pdf_url, hits) if pdf_url else hits
+
+    @staticmethod
+    def _hit(result: Dict) -> Dict:
+        """One search result as the hit dict prompts and sources are built from"""
+        return {
+            "content": result["content"],
+            "chunk_index": result.get("chunk_index"),
+            "offset": result.get("chunk_offset"),
+            "score": result.get("@search.score")
+        }
+
+    def _document(self, pdf_url: str) -> Optional[StructuredDocument]:
+        found, document = self._documents.get(pdf_url)
+        if not found:
+            document = self.text_store.get(pdf_url)
+            self._documents.set(pdf_url, document)
+        return document
+
+    def _annotate_hits(self, pdf_url: str, hits: List[Dict]) -> List[Dict]:
+        """Add the pages and section each hit came from, read from the stored document"""
+        try:
+            document = self._document(pdf_url)
+        except Exception as e:
+            print(f"Warning: Failed to load document structure: {str(e)}")
+            return hits
+        if document is None:
+            return hits
+        for hit in hits:
+            if hit["offset"] is not None:
+                # Skipped page headers and footers make the span longer than the content
+                _, end = document.excerpt(hit["offset"], len(hit["content"]), BOILERPLATE_ROLES)
+                hit["pages"] = document.pages_for(hit["offset"], end - hit["offset"])
+                hit["section"] = document.section_at(hit["offset"])
+        return hits
+
+    @staticmethod
+    def _excerpt_label(i: int, hit: Dict) -> str:
+        label = f"Excerpt {i+1}"
+        if hit.get("section"):
+            label += f", section \"{hit['section']}\""
+        if hit.get("pages"):
+            pages = hit["pages"]
+            label += f", p. {pages[0]}" if len(pages) == 1 else f", pp. {pages[0]}-{pages[-1]}"
+        return label
+
+    def _answer_messages(self, title: str, question: str, hits: List[Dict]) -> List[Dict]:
+        """Prompt with the best-scoring hits packed into ANSWER_CONTEXT_TOKENS"""
+        system = (f"You are a research assistant analyzing: {title}\n"
+                  "Answer concisely and reference the paper content, "
+                  "citing page numbers where excerpts give them.")
+        frame = (f"Question: {question}\nPaper Content:\n\n\n"
+                 "Provide a brief answer citing relevant passages.")
+        budget = self.context.budget(self.ANSWER_CONTEXT_TOKENS, self.MAX_ANSWER_TOKENS, system, frame)
+        context = "\n".join(
+            f"[{self._excerpt_label(i, hit)}]: {hit['content']}"
+            for i, hit in enumerate(self.context.pack(hits, budget))
+        )
+        return [
+            {
+                "role": "system",
+                "content": system
+            },
+            {
+                "role": "user",
+                "content": f"Question: {question}\nPaper Content:\n{context}\n\n"
+                          "Provide a brief answer citing relevant passages."
+            }
+        ]
+
+    def _source_excerpts(self, hits: List[Dict]) -> List[Dict]:
+        return [{
+            "chunk_index": hit["chunk_index"],
+            "offset": hit["offset"],
+            "score": hit["score"],
+            "pages": hit.get("pages"),
+            "section": hit.get("section"),
+            "excerpt": hit["content"][:200]
+        } for hit in hits]
+
+    def _answer_version(self, doc_id: str) -> int:
+        """Ingestion version cached answers and summaries are keyed on, so re-ingesting a paper retires them"""
+        state = self.ingestion.get(doc_id)
+        return state["version"] if state else 0
+
+    def _cached_answer(self, doc_id: str, question: str) -> Optional[Dict]:
+        """Answer already given for this or a near-identical question, or None"""
         try:
-            doc = self.search_client.get_document(key=f"{doc_id}-questions")
-            return json.loads(doc["content"])
-        except:
+            return self.answer_cache.lookup(doc_id, question, lambda: self._get_embedding(question),
+                                            self._answer_version(doc_id))
+        except Exception as e:
+            print(f"Answer cache lookup failed: {str(e)}")
             return None
-        
 
-    def _answer_question(self, doc_id: str, question: str, title: str) -> Dict:
+    def _cache_answer(self, doc_id: str, question: str, answer: str, hits: List[Dict],
+                      vector: Optional[List[float]] = None):
+        """Remember an answer, unless the paper was still being ingested when it was given"""
+        state = self.ingestion.get(doc_id)
+        if not answer or (state is not None and state["stage"] != STAGE_COMPLETE):
+            return
+        try:
+            self.answer_cache.put(doc_id, question, vector or self._get_embedding(question), {
+                "answer": answer,
+                "sources": self._source_excerpts(hits)
+            }, version=state["version"] if state else 0)
+        except Exception as e:
+            print(f"Answer cache write failed: {str(e)}")
+
+    def _answer_question(self, doc_id: str, question: str, title: str, use_cache: bool = True,
+                         pdf_url: Optional[str] = None) -> Dict:
         """Answer question about the paper"""
         try:
-            # Get relevant content
-            results = self.search_client.search(
-                search_text=question,
-                vector_queries=[{
-                    "fields": "content_vector",
-                    "kind": "vector",
-                    "vector": self._get_embedding(question),
-                    "k": 3
-                }],
-                select=["content"],
-                top=3
-            )
-            
-            context = "\n".join(
-                f"[Excerpt {i+1}]: {hit['content'][:500]}..."
-                for i, hit in enumerate(results)
-            )
+            # Get relevant content, only from this paper's chunks
+            hits = self._retrieve(doc_id, question, pdf_url=pdf_url)
 
             # Generate answer
             response = self.openai_client.chat.completions.create(
                 model=self.CHAT_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are a research assistant analyzing: {title}\n"
-                                  "Answer concisely and reference the paper content."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Question: {question}\nPaper Content:\n{context}\n\n"
-                                  "Provide a brief answer citing relevant passages."
-                    }
-                ],
+                messages=self._answer_messages(title, question, hits),
                 temperature=0.3,
-                max_tokens=300
+                max_tokens=self.MAX_ANSWER_TOKENS
             )
+            answer = response.choices[0].message.content
+            if use_cache:
+                self._cache_answer(doc_id, question, answer, hits)
             
             return {
-                "answer": response.choices[0].message.content,
+                "answer": answer,
                 "sources": [title],
                 "doc_id": doc_id
             }
         except Exception as e:
             return {"error": f"Failed to answer question: {str(e)}"}
 
+    def stream_chat_with_paper(self, pdf_url: str, title: str, question: str,
+                               use_cache: bool = True) -> Iterator[Dict]:
+        """
+        Streaming variant of chat_with_paper.
+
+        Yields events as {"event": name, "data": dict}: "status" while a
+        new paper is indexed, "sources" with the retrieved excerpts,
+        one "token" per completion delta, then "done" with the full
+        answer and timings. Failures end the stream with "error". A
+        cached answer arrives as a single "token".
+        """
+        start = time.perf_counter()
+        if not all([pdf_url, title, question]):
+            yield {"event": "error", "data": {"error": "Missing pdf_url, title, or question"}}
+            return
+
+        doc_id = self._generate_doc_id(pdf_url, title)
+        cached = self._cached_answer(doc_id, question) if use_cache else None
+        if cached:
+            yield from self._cached_events(doc_id, title, cached, start)
+            return
+
+        if not self._paper_exists(doc_id):
+            if not self._validate_pdf(pdf_url):
+                yield {"event": "error", "data": {"error": "Invalid PDF URL"}}
+                return
+            yield {"event": "status", "data": {"status": "indexing", "doc_id": doc_id}}
+            process_result = self._ensure_indexed(pdf_url, title, doc_id)
+            if "error" in process_result:
+                yield {"event": "error", "data": process_result}
+                return
+        else:
+            self._resume_ingestion(doc_id)
+
+        try:
+            hits = self._retrieve(doc_id, question, pdf_url=pdf_url)
+            yield {"event": "sources", "data": {
+                "doc_id": doc_id,
+                "title": title,
+                "sources": self._source_excerpts(hits)
+            }}
+
+            stream = self.openai_client.chat.completions.create(
+                model=self.CHAT_MODEL,
+                messages=self._answer_messages(title, question, hits),
+                temperature=0.3,
+                max_tokens=self.MAX_ANSWER_TOKENS,
+                stream=True
+            )
+            parts = []
+            first_token = None
+            for chunk in stream:
+                # Azure sends content-filter results as chunks without choices
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                parts.append(chunk.choices[0].delta.content)
+                yield {"event": "token", "data": {"text": parts[-1]}}
+
+            if use_cache:
+                self._cache_answer(doc_id, question, "".join(parts), hits)
+            yield {"event": "done", "data": {
+                "answer": "".join(parts),
+                "sources": [title],
+                "doc_id": doc_id,
+                "first_token_seconds": round(first_token, 3) if first_token is not None else None,
+                "total_seconds": round(time.perf_counter() - start, 3)
+            }}
+        except Exception as e:
+            yield {"event": "error", "data": {"error": f"Failed to answer question: {str(e)}"}}
+
+    def _cached_events(self, doc_id: str, title: str, cached: Dict, start: float) -> Iterator[Dict]:
+        """Replay a cached answer as the events stream_chat_with_paper sends"""
+        yield {"event": "sources", "data": {"doc_id": doc_id, "title": title, "sources": cached["sources"]}}
+        yield {"event": "token", "data": {"text": cached["answer"]}}
+        elapsed = round(time.perf_counter() - start, 3)
+        yield {"event": "done", "data": {
+            "answer": cached["answer"],
+            "sources": [title],
+            "doc_id": doc_id,
+            "cached": cached["match"],
+            "first_token_seconds": elapsed,
+            "total_seconds": elapsed
+        }}
+
     # Helper methods
     def _validate_pdf(self, url: str) -> bool:
-        """Improved PDF URL validation"""
+        """PDF URL validation, remembered for PDF_VALIDATION_TTL seconds or PDF_VALIDATION_NEGATIVE_TTL when rejected"""
+        found, valid = self.validation_cache.get(url)
+        if found:
+            return valid
         try:
-            # Check basic URL format
-            parsed = urlparse(url)
-            if not all([parsed.scheme, parsed.netloc]):
-                return False
-            
-            # Check for PDF extension
-            if not (url.lower().endswith('.pdf') or 'pdf' in parsed.path.lower()):
-                return False
-                
-            # Check content type
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'
-            }
-            response = requests.head(url, headers=headers, timeout=10, allow_redirects=True)
-            
-            # Check both content type and status code
-            content_type = response.headers.get('Content-Type', '').lower()
-            return (
-                response.status_code == 200 and 
-                ('application/pdf' in content_type or 'octet-stream' in content_type)
-            )
+            valid = self._check_pdf(url)
         except Exception as e:
+            # Timeouts and connection errors are not cached
             print(f"URL validation error: {str(e)}")
             return False
+        self.validation_cache.set(url, valid)
+        return valid
+
+    def _check_pdf(self, url: str) -> bool:
+        """Improved PDF URL validation"""
+        # Check basic URL format
+        parsed = urlparse(url)
+        if not all([parsed.scheme, parsed.netloc]):
+            return False
+        
+        # Check for PDF extension
+        if not (url.lower().endswith('.pdf') or 'pdf' in parsed.path.lower()):
+            return False
+            
+        # Check content type
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)'
+        }
+        response = get_session().head(url, headers=headers, timeout=10, allow_redirects=True)
+        
+        # Check both content type and status code
+        content_type = response.headers.get('Content-Type', '').lower()
+        return (
+            response.status_code == 200 and 
+            ('application/pdf' in content_type or 'octet-stream' in content_type)
+        )
 
     def _generate_doc_id(self, pdf_url: str, title: str) -> str:
         """Generate consistent document ID"""
         return hashlib.sha256(f"{pdf_url}-{title}".encode()).hexdigest()
 
     def _paper_exists(self, doc_id: str) -> bool:
-        """Check if paper is already indexed"""
-        try:
-            self.search_client.get_document(key=doc_id)
-            return True
-        except:
-            return False
+        """Check if paper is already indexed as chunks"""
+        document = self.index.get(doc_id)
+        # Papers indexed before chunking have no doc_id and get re-indexed
+        return bool(document and document.get("doc_id"))
+
+    def _extract_document(self, pdf_url: str) -> StructuredDocument:
+        """Extract the PDF's paragraphs and structure, analyzing it only the first time it is seen"""
+        return self.text_store.get_or_extract(pdf_url, self._analyze_pdf)
 
     def _extract_text(self, pdf_url: str) -> Optional[str]:
-        """Extract text from PDF"""
+        """Extract text from PDF, analyzing it only the first time it is seen"""
+        return document_text(self._extract_document(pdf_url))
+
+    def _analyze_pdf(self, pdf_url: str):
         poller = self.document_analysis_client.begin_analyze_document_from_url(
-            "prebuilt-read", pdf_url)
-        return " ".join(p.content for p in poller.result().paragraphs)
+            self.DOC_INTEL_MODEL, pdf_url, polling_interval=self.POLLING_INTERVAL)
+        return poller.result()
+
+    def _get_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed many texts in as few batched API calls as possible"""
+        return self.embedder.embed(texts)
 
-    @lru_cache(maxsize=100)
     def _get_embedding(self, text: str) -> Optional[List[float]]:
-        """Get cached text embedding"""
-        try:
-            response = self.openai_client.embeddings.create(
-                input=text[:self.MAX_CONTENT_LENGTH],
-                model=self.EMBEDDING_MODEL)
-            return response.data[0].embedding
-        except:
-            return None
\ No newline at end of file
+        """Get text embedding, served from the shared embedding store when known"""
+        return self.embedder.embed_one(text)
\ No newline at end of file
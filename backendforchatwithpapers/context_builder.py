@@ -0,0 +1,202 @@
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from embeddings import CHARS_PER_TOKEN, estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # fall back to the character estimate
+    tiktoken = None
+
+# Context windows of the chat deployments in use, in tokens
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4o": 128000,
+    "gpt-35-turbo": 16385,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+# Role markers and separators the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 8
+# Passages that would be cut below this are left out instead
+MIN_PASSAGE_TOKENS = 64
+
+
+def context_window(model: str) -> int:
+    """Context window of a deployment; CONTEXT_TOKENS_<DEPLOYMENT> overrides the table"""
+    override = os.getenv("CONTEXT_TOKENS_" + re.sub(r"[^A-Z0-9]", "_", model.upper()))
+    if override:
+        return int(override)
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+
+
+class TokenCounter:
+    """Counts tokens with the model's tiktoken encoding, or estimates them without tiktoken"""
+
+    def __init__(self, model: str):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                try:
+                    self.encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    self.encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # The BPE file is downloaded on first use, which fails on offline hosts
+                print(f"Warning: tiktoken encoding unavailable, estimating tokens: {str(e)}")
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return estimate_tokens(text)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text within max_tokens, cut at a word boundary"""
+        if self.encoding is None:
+            cut = max_tokens * CHARS_PER_TOKEN
+            if len(text) <= cut:
+                return text
+        else:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            cut = len(self.encoding.decode(tokens[:max_tokens]))
+        space = text.rfind(" ", 0, cut)
+        return text[:space if space > cut // 2 else cut]
+
+
+class ContextBuilder:
+    """
+    Packs paper text into a prompt's token budget.
+
+    The budget for a prompt is the smaller of the caller's cap and what
+    the deployment's context window leaves after the fixed prompt text
+    and the tokens reserved for the completion. pack() fills it with
+    the highest-scoring passages whole, cutting the last one to fit;
+    pack_spread() picks evenly spaced chunks when a whole paper does
+    not fit, so the model sees all of it rather than its opening.
+    Only passages that are considered get tokenized.
+    """
+
+    def __init__(self, model: str, context_tokens: Optional[int] = None):
+        self.model = model
+        self.context_tokens = context_tokens or context_window(model)
+        self.counter = TokenCounter(model)
+
+    def budget(self, cap: int, reserved_tokens: int, *fixed_texts: str) -> int:
+        """Tokens left for paper content in a prompt built around fixed_texts"""
+        fixed = sum(self.counter.count(text) + MESSAGE_OVERHEAD_TOKENS for text in fixed_texts)
+        return max(0, min(cap, self.context_tokens - reserved_tokens - fixed))
+
+    def pack(self, passages: List[Dict], budget: int, separator_tokens: int = 8) -> List[Dict]:
+        """
+        Highest-"score" passages that fit in budget, best first.
+
+        Returns copies with "content" possibly cut and their "tokens";
+        passages without a score keep their given order.
+        """
+        ranked = sorted(enumerate(passages),
+                        key=lambda item: (-(item[1].get("score") or 0), item[0]))
+        packed = []
+        remaining = budget
+        for _, passage in ranked:
+            available = remaining - separator_tokens
+            if available < MIN_PASSAGE_TOKENS:
+                break
+            content = passage["content"]
+            tokens = self.counter.count(content)
+            if tokens > available:
+                content = self.counter.truncate(content, available)
+                tokens = self.counter.count(content)
+            packed.append({**passage, "content": content, "tokens": tokens})
+            remaining -= tokens + separator_tokens
+        return packed
+
+    def pack_spread(self, chunks: List[str], budget: int, separator_tokens: int = 1) -> List[str]:
+        """Chunks of one document within budget, evenly spaced and in document order"""
+        estimated = sum(estimate_tokens(chunk) + separator_tokens for chunk in chunks)
+        if estimated <= budget:
+            indexes = range(len(chunks))
+        else:
+            keep = max(1, int(len(chunks) * budget / estimated))
+            indexes = sorted({int(i * len(chunks) / keep) for i in range(keep)})
+
+        packed = []
+        remaining = budget
+        for i in indexes:
+            available = remaining - separator_tokens
+            if available < MIN_PASSAGE_TOKENS:
+                break
+            tokens = self.counter.count(chunks[i])
+            chunk = chunks[i] if tokens <= available else self.counter.truncate(chunks[i], available)
+            packed.append(chunk)
+            remaining -= min(tokens, available) + separator_tokens
+        return packed
+
+    def pack_text(self, text: str, budget: int) -> str:
+        """A whole document if it fits, otherwise evenly spaced excerpts of it"""
+        pieces = split_text(text)
+        packed = self.pack_spread(pieces, budget, separator_tokens=3)
+        # Every piece can be kept with the last one cut when exact counts run above the estimate
+        if len(packed) == len(pieces) and (not packed or packed[-1] is pieces[-1]):
+            return text
+        return "\n[...]\n".join(packed)
+
+
+def split_text(text: str, chunk_chars: int = 2000) -> List[str]:
+    """Non-overlapping pieces of about chunk_chars, cut at whitespace"""
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            split = text.rfind(" ", start + chunk_chars // 2, end)
+            if split != -1:
+                end = split
+        pieces.append(text[start:end])
+        start = end
+    return pieces
+
+
+def benchmark(paper_chars: int = 2_000_000, chunk_chars: int = 4000, runs: int = 20):
+    """Packing time on a large synthetic paper for answer-sized and whole-paper budgets"""
+    import random
+
+    rng = random.Random(0)
+    words = ["transformer", "attention", "gradient", "the", "of", "model", "layer", "we",
+             "results", "dataset", "training", "loss", "figure", "table", "baseline", "a"]
+    text = " ".join(rng.choice(words) for _ in range(paper_chars // 7))
+    chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+    passages = [{"content": chunk, "score": rng.random()} for chunk in chunks]
+
+    builder = ContextBuilder("gpt-4")
+    print(f"{len(text) / 1e6:.1f}M chars in {len(chunks)} chunks, "
+          f"tokenizer: {'tiktoken' if builder.counter.exact else 'estimate'}")
+    for name, pack in (("pack 3000", lambda: builder.pack(passages, 3000)),
+                       ("pack 6000", lambda: builder.pack(passages, 6000)),
+                       ("pack_spread 6000", lambda: builder.pack_spread(chunks, 6000)),
+                       ("pack_text 6000", lambda: [builder.pack_text(text, 6000)])):
+        start = time.perf_counter()
+        for _ in range(runs):
+            packed = pack()
+        elapsed = (time.perf_counter() - start) / runs * 1000
+        used = sum(builder.counter.count(p["content"] if isinstance(p, dict) else p) for p in packed)
+        print(f"{name}: {len(packed)} passages, {used} tokens, {elapsed:.2f} ms")
+
+    if builder.counter.exact:
+        # What packing avoids: tokenizing the whole paper
+        start = time.perf_counter()
+        total = builder.counter.count(text)
+        elapsed = time.perf_counter() - start
+        print(f"Counting the whole paper: {total} tokens in {elapsed * 1000:.1f} ms "
+              f"({len(text) / elapsed / 1e6:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+EMBEDDING_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'embeddings.db')
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+# Eviction frees space down to this fraction of max_bytes, so a full store
+# does not evict again on every write
+EVICT_TO = 0.9
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding cache keyed by (model, sha256(text)).
+
+    Vectors are stored as packed float32 BLOBs (12 KB for a 3072-d
+    vector instead of ~100 KB as a Python list) in a SQLite database in
+    WAL mode, so every Flask worker process reads and fills the same
+    cache and it survives restarts. Only successful embeddings are
+    stored. Rows are evicted least recently used first once the database
+    grows past max_bytes, measured from SQLite's page counts so a write
+    never scans the table.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.db_path = db_path or os.getenv("EMBEDDING_STORE_PATH", EMBEDDING_STORE_PATH)
+        self.max_bytes = max_bytes or int(os.getenv("EMBEDDING_STORE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dims INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """Return {text: vector} for the texts already stored"""
+        hashes = {text_hash(text): text for text in texts}
+        found = {}
+        keys = list(hashes)
+        with self._connect() as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchall()
+                for digest, blob in rows:
+                    vector = array('f')
+                    vector.frombytes(blob)
+                    found[hashes[digest]] = vector.tolist()
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash(text)) for text in found]
+                )
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, Optional[List[float]]]):
+        """Store successful embeddings; None (failed) entries are skipped"""
+        now = time.time()
+        rows = [
+            (model, text_hash(text), len(vector), array('f', vector).tobytes(), now)
+            for text, vector in vectors.items() if vector
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dims, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+        self.evict()
+
+    @staticmethod
+    def _used_bytes(conn) -> int:
+        """Bytes of the pages in use, read from the header rather than the rows"""
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * page_size
+
+    def evict(self) -> int:
+        """Delete least recently used vectors once the store outgrows max_bytes"""
+        with self._connect() as conn:
+            size = self._used_bytes(conn)
+            if size <= self.max_bytes:
+                return 0
+            count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if not count:
+                return 0
+            # Rows of one model share a size, so the average is a close per-row estimate
+            excess = min(count, int((size - self.max_bytes * EVICT_TO) / (size / count)) + 1)
+            conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+        print(f"Embedding store evicted {excess} vector(s)")
+        return excess
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            size, count = conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0), COUNT(*) FROM embeddings").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": count,
+            "bytes": size,
+            "max_bytes": self.max_bytes
+        }
@@ -0,0 +1,99 @@
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+# Azure OpenAI accepts at most 2048 inputs per embeddings request
+MAX_INPUTS_PER_REQUEST = 2048
+CHARS_PER_TOKEN = 4  # rough average for English prose
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-side token estimate used to pack batches"""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+class BatchEmbedder:
+    """
+    Embeds many texts in as few API calls as the token limits allow.
+
+    Texts are packed greedily into batches of at most max_batch_tokens
+    (estimated) and max_batch_size inputs. Batches run concurrently on
+    up to max_workers threads and the vectors come back in input order.
+    A batch that fails yields None for each of its texts, so callers
+    can tell exactly which inputs are missing. With a store, only texts
+    it does not already hold are sent to the API.
+    """
+
+    def __init__(self, client, model: str, max_chars: int = 4000,
+                 max_batch_tokens: Optional[int] = None,
+                 max_batch_size: int = MAX_INPUTS_PER_REQUEST,
+                 max_workers: Optional[int] = None, store=None):
+        self.client = client
+        self.model = model
+        self.store = store
+        self.max_chars = max_chars
+        self.max_batch_tokens = max_batch_tokens or int(os.getenv("EMBEDDING_BATCH_TOKENS", "64000"))
+        self.max_batch_size = min(max_batch_size, MAX_INPUTS_PER_REQUEST)
+        self.max_workers = max_workers or int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+
+    def _batches(self, texts: List[str]) -> List[List[int]]:
+        """Group input positions into batches that fit the request limits"""
+        batches, current, current_tokens = [], [], 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        try:
+            response = self.client.embeddings.create(input=texts, model=self.model)
+            # The API tags each vector with its input position
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+        except Exception as e:
+            print(f"Embedding batch of {len(texts)} failed: {str(e)}")
+            return [None] * len(texts)
+
+    def embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed texts and return one vector (or None) per input, in order"""
+        if not texts:
+            return []
+
+        texts = [text[:self.max_chars] for text in texts]
+        # Identical texts (repeated headers, boilerplate) are embedded once
+        unique = list(dict.fromkeys(texts))
+        vectors = self.store.get_many(self.model, unique) if self.store else {}
+        missing = [text for text in unique if text not in vectors]
+        if not missing:
+            return [vectors[text] for text in texts]
+
+        batches = self._batches(missing)
+        start = time.perf_counter()
+        if len(batches) == 1:
+            results = [self._embed_batch(missing)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                results = list(pool.map(
+                    lambda batch: self._embed_batch([missing[i] for i in batch]), batches))
+
+        fresh = {}
+        for batch, embeddings in zip(batches, results):
+            for i, embedding in zip(batch, embeddings):
+                fresh[missing[i]] = embedding
+        print(f"Embedded {len(missing)} of {len(texts)} texts in {len(batches)} call(s), "
+              f"{time.perf_counter() - start:.2f}s")
+        if self.store:
+            self.store.put_many(self.model, fresh)
+        vectors.update(fresh)
+        return [vectors[text] for text in texts]
+
+    def embed_one(self, text: str) -> Optional[List[float]]:
+        return self.embed([text])[0]
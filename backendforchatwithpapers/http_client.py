@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT: Tuple[float, float] = (5, 30)  # (connect, read) seconds
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HttpMetrics:
+    """Thread-safe per-host request counters and latency totals"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict] = {}
+
+    def record(self, host: str, elapsed: float, status: Optional[int] = None,
+               retries: int = 0, error: Optional[str] = None):
+        with self._lock:
+            stats = self._hosts.setdefault(host, {
+                "requests": 0, "errors": 0, "retries": 0,
+                "total_seconds": 0.0, "max_seconds": 0.0, "statuses": {}
+            })
+            stats["requests"] += 1
+            stats["retries"] += retries
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            if error or (status is not None and status >= 400):
+                stats["errors"] += 1
+            key = str(status) if status is not None else error
+            stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                host: {
+                    **{k: v for k, v in stats.items() if k != "statuses"},
+                    "statuses": dict(stats["statuses"]),
+                    "avg_seconds": round(stats["total_seconds"] / stats["requests"], 4),
+                }
+                for host, stats in self._hosts.items()
+            }
+
+
+class PooledSession(requests.Session):
+    """
+    requests.Session with keep-alive connection pools, default timeouts,
+    exponential backoff on 429/5xx and per-host metrics.
+
+    pool_maxsize caps the open connections per host; with pool_block the
+    extra callers wait for a free connection instead of opening more.
+    Only idempotent methods (GET, HEAD) are retried.
+    """
+
+    def __init__(self, pool_connections: int = 20, pool_maxsize: int = 10,
+                 max_retries: int = 3, backoff_factor: float = 0.5,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT):
+        super().__init__()
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+            max_retries=retry
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.timeout = timeout
+        self.metrics = HttpMetrics()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException as e:
+            self.metrics.record(host, time.perf_counter() - start, error=type(e).__name__)
+            raise
+
+        retry_state = getattr(response.raw, "retries", None)
+        retries = len(retry_state.history) if retry_state is not None else 0
+        self.metrics.record(host, time.perf_counter() - start,
+                            status=response.status_code, retries=retries)
+        return response
+
+
+_session: Optional[PooledSession] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> PooledSession:
+    """Process-wide pooled session shared by every outbound HTTP call"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = PooledSession(
+                    pool_maxsize=int(os.getenv("HTTP_POOL_SIZE", "10")),
+                    max_retries=int(os.getenv("HTTP_MAX_RETRIES", "3"))
+                )
+    return _session
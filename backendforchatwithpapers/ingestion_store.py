@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+INGESTION_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ingestion.db')
+
+# Stages a paper moves through; a retry resumes at the recorded one
+STAGE_EXTRACT = "extract"
+STAGE_UPLOAD = "upload"
+STAGE_COMPLETE = "complete"
+# Terminal: the PDF had no text left to index, so it is never retried
+STAGE_EMPTY = "empty"
+EMPTY_ERROR = "No indexable text in PDF"
+
+
+class IngestionStore:
+    """
+    Checkpoints of paper ingestion (extract -> chunk -> embed -> upload).
+
+    A paper row records its stage, its last error and a version that
+    each chunking bumps, which cached answers and summaries are keyed on; chunk rows
+    record the span of the extracted text each chunk covers and whether
+    it has been uploaded. The text itself lives in the ExtractedTextStore and
+    vectors in the EmbeddingStore, so resuming a paper only repeats the
+    uploads that never succeeded. Artifacts derived from a finished
+    paper, like its summary, are kept alongside. SQLite WAL, shared by
+    every worker.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("INGESTION_STORE_PATH", INGESTION_STORE_PATH)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS papers (
+                    doc_id TEXT PRIMARY KEY,
+                    pdf_url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    chunks INTEGER,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(papers)")}
+            if "version" not in columns:
+                conn.execute("ALTER TABLE papers ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    doc_id TEXT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    chunk_offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    uploaded INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (doc_id, chunk_index)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    doc_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(summaries)")}
+            if "version" not in columns:
+                conn.execute("ALTER TABLE summaries ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM papers WHERE doc_id = ?", (doc_id,)).fetchone()
+        return dict(row) if row else None
+
+    def start(self, doc_id: str, pdf_url: str, title: str) -> Dict:
+        """Record a paper on its first attempt; later attempts get the existing checkpoint"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO papers (doc_id, pdf_url, title, stage, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (doc_id, pdf_url, title, STAGE_EXTRACT, time.time())
+            )
+            return dict(conn.execute("SELECT * FROM papers WHERE doc_id = ?", (doc_id,)).fetchone())
+
+    def set_chunks(self, doc_id: str, chunks: Iterable[Dict]) -> int:
+        """
+        Checkpoint the chunking of a paper and move it to the upload stage;
+        returns the chunk count. A paper without chunks is marked empty.
+        """
+        # Only spans are kept, so a chunk generator is consumed without holding its text
+        rows = [(doc_id, i, chunk["offset"], len(chunk["content"])) for i, chunk in enumerate(chunks)]
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            conn.executemany(
+                "INSERT INTO chunks (doc_id, chunk_index, chunk_offset, length) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.execute(
+                "UPDATE papers SET stage = ?, chunks = ?, version = version + 1, error = ?, updated_at = ? "
+                "WHERE doc_id = ?",
+                (STAGE_UPLOAD if rows else STAGE_EMPTY, len(rows), None if rows else EMPTY_ERROR,
+                 time.time(), doc_id)
+            )
+        return len(rows)
+
+    def mark_empty(self, doc_id: str, error: str = EMPTY_ERROR):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE papers SET stage = ?, chunks = 0, error = ?, updated_at = ? WHERE doc_id = ?",
+                (STAGE_EMPTY, error, time.time(), doc_id)
+            )
+
+    def pending_chunks(self, doc_id: str) -> List[Dict]:
+        """Chunks not uploaded yet, chunk 0 first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT chunk_index, chunk_offset, length FROM chunks "
+                "WHERE doc_id = ? AND uploaded = 0 ORDER BY chunk_index",
+                (doc_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_uploaded(self, doc_id: str, chunk_indexes: List[int]):
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE chunks SET uploaded = 1 WHERE doc_id = ? AND chunk_index = ?",
+                [(doc_id, i) for i in chunk_indexes]
+            )
+            remaining = conn.execute(
+                "SELECT COUNT(*) FROM chunks WHERE doc_id = ? AND uploaded = 0", (doc_id,)
+            ).fetchone()[0]
+            if not remaining:
+                conn.execute(
+                    "UPDATE papers SET stage = ?, error = NULL, updated_at = ? WHERE doc_id = ?",
+                    (STAGE_COMPLETE, time.time(), doc_id)
+                )
+
+    def reset_uploads(self, doc_id: str) -> bool:
+        """
+        Mark every chunk of a paper as not uploaded, for an index that lost
+        it; returns whether there was anything to reset. The chunking and
+        version stay, so only the uploads are repeated.
+        """
+        with self._connect() as conn:
+            reset = conn.execute(
+                "UPDATE papers SET stage = ?, updated_at = ? WHERE doc_id = ? AND stage IN (?, ?)",
+                (STAGE_UPLOAD, time.time(), doc_id, STAGE_UPLOAD, STAGE_COMPLETE)
+            ).rowcount
+            if reset:
+                conn.execute("UPDATE chunks SET uploaded = 0 WHERE doc_id = ?", (doc_id,))
+        return bool(reset)
+
+    def fail(self, doc_id: str, error: str):
+        """Keep the stage so the next attempt resumes there"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE papers SET error = ?, updated_at = ? WHERE doc_id = ?",
+                (error, time.time(), doc_id)
+            )
+
+    def get_summary(self, doc_id: str) -> Optional[str]:
+        """The paper's summary, unless it was written for an older chunking"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT s.summary FROM summaries s LEFT JOIN papers p ON p.doc_id = s.doc_id "
+                "WHERE s.doc_id = ? AND s.version = COALESCE(p.version, 0)",
+                (doc_id,)
+            ).fetchone()
+        return row['summary'] if row else None
+
+    def put_summary(self, doc_id: str, summary: str, version: int = 0):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (doc_id, summary, version, created_at) VALUES (?, ?, ?, ?)",
+                (doc_id, summary, version, time.time())
+            )
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            stages = dict(conn.execute("SELECT stage, COUNT(*) FROM papers GROUP BY stage").fetchall())
+            failed = conn.execute(
+                "SELECT COUNT(*) FROM papers WHERE error IS NOT NULL AND stage NOT IN (?, ?)",
+                (STAGE_COMPLETE, STAGE_EMPTY)
+            ).fetchone()[0]
+            summaries = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {"stages": stages, "failed": failed, "summaries": summaries}
@@ -0,0 +1,449 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ann_index import IVFIndex
+from quantization import CompactVectors
+from vector_store import VectorBackend
+
+LOCAL_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local_index')
+VECTOR_FIELD = "content_vector"
+TOKEN_PATTERN = re.compile(r"\w+")
+# Reciprocal rank fusion constant, the value Azure AI Search uses for hybrid queries
+RRF_K = 60
+MIN_CANDIDATES = 50
+DEFAULT_RERANK_FACTOR = 4
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Merge ranked row lists into one list of (row, fused score), best first"""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            scores[row] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self._terms: Dict[int, List[str]] = {}
+
+    def add(self, row: int, text: str):
+        self.remove(row)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self.postings[term][row] = tf
+        self._terms[row] = list(counts)
+        self.lengths[row] = sum(counts.values())
+        self.total_length += self.lengths[row]
+
+    def remove(self, row: int):
+        for term in self._terms.pop(row, []):
+            postings = self.postings[term]
+            postings.pop(row, None)
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(row, 0)
+
+    def top(self, query: str, k: int, candidates: Optional[Set[int]] = None) -> List[int]:
+        """Rows with the k best BM25 scores, optionally restricted to candidates"""
+        if not self.lengths:
+            return []
+        n = len(self.lengths)
+        avg_length = self.total_length / n
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            if candidates is not None and len(candidates) < len(postings):
+                items = ((row, postings[row]) for row in candidates if row in postings)
+            else:
+                items = postings.items()
+            for row, tf in items:
+                if candidates is not None and row not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[row] / avg_length)
+                scores[row] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+class LocalVectorStore(VectorBackend):
+    """
+    In-process replacement for the Azure Search index.
+
+    Embeddings live in a float32 matrix memory-mapped from vectors.f32,
+    L2-normalized so cosine similarity is a dot product. Documents and
+    their fields live in SQLite next to it, and a BM25 inverted index
+    over "content" is rebuilt from SQLite on start. Hybrid search fuses
+    the vector and keyword rankings with reciprocal rank fusion.
+
+    Writes are serialized through a SQLite write transaction and every
+    row carries a sequence number, so worker processes sharing the
+    directory pick up each other's uploads on their next search.
+
+    Queries filtered to one paper, which is every chat question, only
+    touch that paper's rows and stay exact. With ANN_INDEX=1,
+    unfiltered vector queries go through an IVF index (see ann_index)
+    once the store passes ANN_MIN_ROWS; it is built in a background
+    thread and exact search serves until it is ready. It is off by
+    default because no request path searches across papers.
+
+    With VECTOR_STORAGE=int8 and/or VECTOR_COMPACT_DIMS (Matryoshka
+    truncation, e.g. 256 or 512), scans and the IVF index run over a
+    reduced copy of the matrix instead, and the best
+    VECTOR_RERANK_FACTOR * k candidates are re-ranked against the
+    full-precision vectors, which are then only read for those rows.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None):
+        self.index_dir = index_dir or os.getenv("LOCAL_INDEX_DIR", LOCAL_INDEX_DIR)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.db_path = os.path.join(self.index_dir, 'documents.db')
+        self.vector_path = os.path.join(self.index_dir, 'vectors.f32')
+
+        self._lock = threading.RLock()
+        self._vectors: Optional[np.memmap] = None
+        self._capacity = 0
+        self._dims = 0
+        self._count = 0
+        self._seq = 0
+        self._rows_by_doc: Dict[str, Set[int]] = defaultdict(set)
+        self._doc_of_row: Dict[int, str] = {}
+        self.bm25 = BM25Index()
+        self.ann = IVFIndex(centroids_path=os.path.join(self.index_dir, 'ivf_centroids.npy'))
+        self.ann_enabled = os.getenv("ANN_INDEX", "0") == "1"
+        self._ann_building = False
+        self._changed_since_build: List[int] = []
+
+        self.storage = os.getenv("VECTOR_STORAGE", "float32")
+        self.compact_dims = int(os.getenv("VECTOR_COMPACT_DIMS", "0"))
+        self.rerank_factor = int(os.getenv("VECTOR_RERANK_FACTOR", DEFAULT_RERANK_FACTOR))
+        self._compact: Optional[CompactVectors] = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id TEXT PRIMARY KEY,
+                    row INTEGER NOT NULL UNIQUE,
+                    doc_id TEXT,
+                    fields TEXT NOT NULL,
+                    seq INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_seq ON documents (seq)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._refresh()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _meta(conn) -> Dict[str, int]:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def _map(self, capacity: int, dims: int):
+        """(Re)open the vector files when another writer has grown them"""
+        if capacity and (capacity != self._capacity or dims != self._dims):
+            self._vectors = np.memmap(self.vector_path, dtype=np.float32, mode='r+', shape=(capacity, dims))
+            self._capacity, self._dims = capacity, dims
+            compact_dims = min(self.compact_dims or dims, dims)
+            if self.storage != "float32" or compact_dims < dims:
+                if self._compact is None or self._compact.dims != compact_dims:
+                    self._compact = CompactVectors(
+                        os.path.join(self.index_dir, 'vectors'), self.storage, compact_dims)
+                self._compact.map(capacity)
+
+    @property
+    def _scan_matrix(self):
+        """The matrix scans and the IVF index run over"""
+        return self._compact if self._compact is not None else self._vectors
+
+    def _backfill_compact(self, conn, meta: Dict[str, int]):
+        """Fill the reduced copy for rows written before this storage setting was chosen"""
+        key = f"compact:{self._compact.name}"
+        filled, rows = meta.get(key, 0), meta.get("rows", 0)
+        if filled >= rows:
+            return
+        for start in range(filled, rows, 4096):
+            end = min(start + 4096, rows)
+            self._compact.write(slice(start, end), self._vectors[start:end])
+        self._compact.flush()
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, rows))
+        print(f"Built {self._compact.name} vectors for {rows - filled} rows")
+
+    def _grow(self, rows_needed: int, dims: int) -> int:
+        capacity = max(self._capacity, 1024)
+        while capacity < rows_needed:
+            capacity *= 2
+        if capacity != self._capacity or dims != self._dims:
+            with open(self.vector_path, 'ab') as f:
+                f.truncate(capacity * dims * 4)
+            self._map(capacity, dims)
+        return capacity
+
+    def _refresh(self):
+        """Load rows written since the last refresh, by this or any other process"""
+        with self._lock, self._connect() as conn:
+            meta = self._meta(conn)
+            if meta.get("seq", 0) == self._seq:
+                return
+            self._map(meta.get("capacity", 0), meta.get("dims", 0))
+            if self._compact is not None and meta.get(f"compact:{self._compact.name}", 0) < meta.get("rows", 0):
+                conn.execute("BEGIN IMMEDIATE")
+                self._backfill_compact(conn, self._meta(conn))
+            self._count = meta.get("rows", 0)
+            changed = []
+            for row, doc_id, fields, seq in conn.execute(
+                "SELECT row, doc_id, fields, seq FROM documents WHERE seq > ? ORDER BY seq", (self._seq,)
+            ):
+                previous = self._doc_of_row.get(row)
+                if previous is not None:
+                    self._rows_by_doc[previous].discard(row)
+                self._doc_of_row[row] = doc_id
+                self._rows_by_doc[doc_id].add(row)
+                self.bm25.add(row, json.loads(fields).get("content") or "")
+                changed.append(row)
+            self._seq = meta["seq"]
+            self.ann.add(self._scan_matrix, changed)
+            if self._ann_building:
+                self._changed_since_build.extend(changed)
+            self._maybe_build_ann()
+
+    def _maybe_build_ann(self):
+        """Build or retrain the IVF index off the request path"""
+        if not self.ann_enabled or self._ann_building or not self.ann.needs_training(self._count):
+            return
+        self._ann_building = True
+        self._changed_since_build = []
+        vectors, count = self._scan_matrix, self._count
+
+        def build():
+            try:
+                index = IVFIndex(centroids_path=self.ann.centroids_path, nlist=self.ann.nlist,
+                                 nprobe=self.ann.nprobe, min_rows=self.ann.min_rows)
+                index.build(vectors, count)
+                with self._lock:
+                    # Rows written or rewritten while the index was being built
+                    index.add(self._scan_matrix, self._changed_since_build)
+                    self.ann = index
+            except Exception as e:
+                print(f"IVF index build failed: {str(e)}")
+            finally:
+                self._ann_building = False
+
+        threading.Thread(target=build, name="ivf-build", daemon=True).start()
+
+    def upload(self, documents: List[Dict]) -> List[str]:
+        if not documents:
+            return []
+        failed = []
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            meta = self._meta(conn)
+            # The first upload fixes the dimensionality of the index
+            dims = meta.get("dims") or next(
+                (len(d[VECTOR_FIELD]) for d in documents if d.get(VECTOR_FIELD)), 0)
+            rows = meta.get("rows", 0)
+            seq = meta.get("seq", 0)
+            self._map(meta.get("capacity", 0), dims)
+
+            pending = []
+            for document in documents:
+                vector = document.get(VECTOR_FIELD)
+                if not vector or len(vector) != dims:
+                    failed.append(document["id"])
+                    continue
+                existing = conn.execute("SELECT row FROM documents WHERE id = ?", (document["id"],)).fetchone()
+                if existing:
+                    row = existing[0]
+                else:
+                    row, rows = rows, rows + 1
+                pending.append((row, document))
+
+            capacity = self._grow(rows, dims)
+            if self._compact is not None:
+                self._backfill_compact(conn, meta)
+            for row, document in pending:
+                vector = np.asarray(document[VECTOR_FIELD], dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                self._vectors[row] = vector / norm if norm else vector
+                if self._compact is not None:
+                    self._compact.write(row, self._vectors[row])
+            # Vectors reach the file before the rows that point at them commit
+            self._vectors.flush()
+            if self._compact is not None:
+                self._compact.flush()
+                meta_rows = [(f"compact:{self._compact.name}", rows)]
+            else:
+                meta_rows = []
+
+            for row, document in pending:
+                seq += 1
+                fields = {k: v for k, v in document.items() if k != VECTOR_FIELD}
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (id, row, doc_id, fields, seq) VALUES (?, ?, ?, ?, ?)",
+                    (document["id"], row, document.get("doc_id"), json.dumps(fields), seq)
+                )
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("dims", dims), ("rows", rows), ("capacity", capacity), ("seq", seq)] + meta_rows
+            )
+        self._refresh()
+        return failed
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT fields FROM documents WHERE id = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _best(scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+            best = best[np.argsort(-scores[best])]
+        else:
+            best = np.argsort(-scores)
+        return candidates[best]
+
+    def _vector_top(self, vector: List[float], rows: Optional[np.ndarray], k: int,
+                    nprobe: Optional[int] = None) -> List[int]:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        compact = self._compact
+        scan_query = compact.prepare_query(query) if compact is not None else query
+        # Reduced vectors only shortlist; full precision decides the order
+        n = k * self.rerank_factor if compact is not None else k
+        if rows is None and self.ann.trained:
+            candidates = np.array(self.ann.search(self._scan_matrix, scan_query, n, nprobe), dtype=np.int64)
+        else:
+            if rows is None:
+                rows = np.arange(self._count)
+            scores = compact.scores(rows, scan_query) if compact is not None else self._vectors[rows] @ query
+            candidates = self._best(scores, rows, n)
+        if compact is None or not len(candidates):
+            return candidates.tolist()
+
+        candidates = np.sort(candidates)
+        return self._best(self._vectors[candidates] @ query, candidates, k).tolist()
+
+    def search(self, search_text: str, vector: List[float], doc_id: Optional[str] = None,
+               top: int = 3, select: Optional[List[str]] = None,
+               nprobe: Optional[int] = None) -> List[Dict]:
+        """Hybrid search; nprobe trades recall for latency on unfiltered queries"""
+        self._refresh()
+        k = max(top, MIN_CANDIDATES)
+        with self._lock:
+            if not self._count:
+                return []
+            candidates = None
+            rows = None
+            if doc_id is not None:
+                candidates = set(self._rows_by_doc.get(doc_id, ()))
+                if not candidates:
+                    return []
+                rows = np.fromiter(sorted(candidates), dtype=np.int64, count=len(candidates))
+            keyword_ranking = self.bm25.top(search_text, k, candidates) if search_text else []
+        vector_ranking = self._vector_top(vector, rows, k, nprobe) if vector is not None else []
+
+        fused = reciprocal_rank_fusion([vector_ranking, keyword_ranking])[:top]
+        if not fused:
+            return []
+        with self._connect() as conn:
+            stored = dict(conn.execute(
+                f"SELECT row, fields FROM documents WHERE row IN ({','.join('?' * len(fused))})",
+                [row for row, _ in fused]
+            ).fetchall())
+
+        hits = []
+        for row, score in fused:
+            fields = json.loads(stored[row])
+            if select:
+                fields = {name: fields.get(name) for name in select}
+            fields["@search.score"] = score
+            hits.append(fields)
+        return hits
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "documents": self._count,
+                "papers": sum(1 for rows in self._rows_by_doc.values() if rows),
+                "dims": self._dims,
+                "vector_bytes": self._count * self._dims * 4,
+                "storage": self._compact.name if self._compact is not None else f"float32-{self._dims}",
+                "scan_bytes": self._count * (self._compact.bytes_per_row if self._compact is not None
+                                             else self._dims * 4),
+                "terms": len(self.bm25.postings),
+                "ann_lists": len(self.ann.centroids) if self.ann.trained else 0
+            }
+
+
+def benchmark(papers: int = 500, chunks_per_paper: int = 20, dims: int = 3072, queries: int = 200):
+    """Load-test upload and filtered/unfiltered hybrid search on synthetic data (ANN_INDEX=1 for IVF)"""
+    import random
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    words = [f"term{i}" for i in range(5000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(tmp)
+        start = time.perf_counter()
+        for p in range(papers):
+            vectors = rng.standard_normal((chunks_per_paper, dims), dtype=np.float32)
+            store.upload([{
+                "id": f"paper{p}-chunk-{c}",
+                "doc_id": f"paper{p}",
+                "chunk_index": c,
+                "content": " ".join(random.choices(words, k=400)),
+                VECTOR_FIELD: vectors[c].tolist()
+            } for c in range(chunks_per_paper)])
+        elapsed = time.perf_counter() - start
+        total = papers * chunks_per_paper
+        print(f"Indexed {total} chunks ({dims}-d) in {elapsed:.1f}s ({total / elapsed:.0f} chunks/s)")
+
+        query_vectors = rng.standard_normal((queries, dims), dtype=np.float32)
+        for label, doc_id in (("filtered", "paper7"), ("unfiltered", None)):
+            start = time.perf_counter()
+            for q in range(queries):
+                store.search(" ".join(random.choices(words, k=8)), query_vectors[q].tolist(), doc_id=doc_id, top=3)
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {elapsed / queries * 1000:.2f} ms/query")
+
+        reopened = LocalVectorStore(tmp)
+        print(f"Stats after reopen: {reopened.stats()}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,156 @@
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+STORAGE_TYPES = ("float32", "int8")
+SCORE_BLOCK_ROWS = 1024
+
+
+def truncate(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """
+    Matryoshka truncation: keep the leading dims and re-normalize.
+
+    text-embedding-3 models are trained so that prefixes of the vector
+    are themselves usable embeddings.
+    """
+    head = np.asarray(vectors[..., :dims], dtype=np.float32)
+    norms = np.linalg.norm(head, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return head / norms
+
+
+def quantize_int8(vectors: np.ndarray):
+    """Symmetric per-vector int8 quantization; returns (codes, scales)"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class CompactVectors:
+    """
+    Memory-mapped reduced copy of the vector matrix used for scanning.
+
+    Rows are Matryoshka-truncated to dims and stored as float32 or as
+    int8 codes with a per-row float32 scale (about 4x smaller). Indexing
+    returns dequantized float32 rows, so code written against a plain
+    matrix (the IVF index) works unchanged; scores() widens int8 codes
+    in small blocks instead of dequantizing the whole selection.
+    """
+
+    def __init__(self, base_path: str, storage: str, dims: int):
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown vector storage: {storage}")
+        self.storage = storage
+        self.dims = dims
+        self.name = f"{storage}-{dims}"
+        self.codes_path = f"{base_path}.{self.name}"
+        self.scales_path = f"{base_path}.{self.name}.scale"
+        self.capacity = 0
+        self._codes: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+
+    @property
+    def bytes_per_row(self) -> int:
+        return self.dims * (1 if self.storage == "int8" else 4) + (4 if self.storage == "int8" else 0)
+
+    def map(self, capacity: int):
+        if capacity == self.capacity:
+            return
+        dtype = np.int8 if self.storage == "int8" else np.float32
+        for path, size in ((self.codes_path, capacity * self.dims * np.dtype(dtype).itemsize),
+                           (self.scales_path, capacity * 4)):
+            if path == self.scales_path and self.storage != "int8":
+                continue
+            with open(path, 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+        self._codes = np.memmap(self.codes_path, dtype=dtype, mode='r+', shape=(capacity, self.dims))
+        if self.storage == "int8":
+            self._scales = np.memmap(self.scales_path, dtype=np.float32, mode='r+', shape=(capacity,))
+        self.capacity = capacity
+
+    def write(self, rows, vectors: np.ndarray):
+        reduced = truncate(vectors, self.dims)
+        if self.storage == "int8":
+            codes, scales = quantize_int8(reduced)
+            if reduced.ndim == 1:
+                codes, scales = codes[0], scales[0]
+            self._codes[rows] = codes
+            self._scales[rows] = scales
+        else:
+            self._codes[rows] = reduced
+
+    def flush(self):
+        self._codes.flush()
+        if self._scales is not None:
+            self._scales.flush()
+
+    def prepare_query(self, query: np.ndarray) -> np.ndarray:
+        return truncate(query, self.dims)
+
+    def scores(self, rows, query: np.ndarray) -> np.ndarray:
+        """Approximate cosine of each row with a prepared query"""
+        if self.storage != "int8":
+            return self._codes[rows] @ query
+        codes, scales = self._codes[rows], self._scales[rows]
+        # NumPy has no BLAS path for int8; widening small blocks keeps the copy in cache
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS]
+            out[start:start + SCORE_BLOCK_ROWS] = block.astype(np.float32) @ query
+        return out * scales
+
+    def __getitem__(self, rows) -> np.ndarray:
+        if self.storage == "int8":
+            return self._codes[rows].astype(np.float32) * self._scales[rows][..., None]
+        return self._codes[rows]
+
+    @property
+    def shape(self):
+        return (self.capacity, self.dims)
+
+
+def benchmark(rows: int = 50000, dims: int = 3072, queries: int = 100, k: int = 10, rerank: int = 4):
+    """Memory and recall@k of reduced vectors, alone and with full-precision re-rank"""
+    import tempfile
+    from ann_index import exact_search, synthetic_embeddings
+
+    vectors, query_vectors = synthetic_embeddings([rows, queries], dims, topics=200)
+    truth = [exact_search(vectors, q, k) for q in query_vectors]
+    full_bytes = dims * 4
+    print(f"{rows} x {dims} float32: {full_bytes} bytes/vector, {rows * full_bytes / 1024 ** 2:.0f} MB")
+    print("Synthetic vectors are not Matryoshka-trained, so truncated recall here is a lower bound")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage, reduced_dims in (("float32", 1024), ("float32", 512), ("float32", 256),
+                                      ("int8", dims), ("int8", 1024), ("int8", 512), ("int8", 256)):
+            compact = CompactVectors(os.path.join(tmp, "vectors"), storage, reduced_dims)
+            compact.map(rows)
+            compact.write(slice(0, rows), vectors)
+
+            coarse_hits, reranked_hits, elapsed = 0, 0, 0.0
+            for q, expected in zip(query_vectors, truth):
+                start = time.perf_counter()
+                scores = compact.scores(slice(0, rows), compact.prepare_query(q))
+                candidates = np.argpartition(-scores, k * rerank)[:k * rerank]
+                candidates.sort()
+                exact = vectors[candidates] @ q
+                reranked = candidates[np.argsort(-exact)[:k]]
+                elapsed += time.perf_counter() - start
+                coarse = np.argpartition(-scores, k)[:k]
+                coarse_hits += len(set(coarse.tolist()) & set(expected))
+                reranked_hits += len(set(reranked.tolist()) & set(expected))
+
+            saving = 1 - compact.bytes_per_row / full_bytes
+            print(f"{storage}@{reduced_dims}: {compact.bytes_per_row} bytes/vector ({saving:.0%} smaller), "
+                  f"recall@{k} {coarse_hits / (queries * k):.3f} coarse, "
+                  f"{reranked_hits / (queries * k):.3f} re-ranked x{rerank}, "
+                  f"{elapsed / queries * 1000:.2f} ms/query")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+QUESTION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.db')
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_VARIANTS = 3
+
+
+def description_hash(description: str) -> str:
+    """Hash a description so trivially different spellings share an entry"""
+    normalized = re.sub(r"\s+", " ", (description or "").strip().lower())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class QuestionCache:
+    """
+    Local store of generated practice-question sets.
+
+    Sets are keyed by (doc_id, difficulty, question_type, num_questions,
+    description hash). Each key holds a pool of up to `variants`
+    independently generated sets; lookups hand out the least served
+    fresh set, so repeat visitors rotate through different questions.
+    Sets older than ttl seconds are never served and are purged on the
+    next write.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl: Optional[int] = None,
+                 variants: Optional[int] = None):
+        self.db_path = db_path or os.getenv("QUESTION_CACHE_PATH", QUESTION_CACHE_PATH)
+        self.ttl = ttl or int(os.getenv("QUESTION_CACHE_TTL", DEFAULT_TTL))
+        self.variants = variants or int(os.getenv("QUESTION_CACHE_VARIANTS", DEFAULT_VARIANTS))
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS question_sets (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cache_key TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    served INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS question_sets_key ON question_sets (cache_key, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS question_sets_doc ON question_sets (doc_id, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(doc_id: str, difficulty: str, question_type: str,
+                 num_questions, description: str) -> str:
+        # num_questions comes straight from the request and only reaches the prompt as text
+        parts = [doc_id, str(difficulty).lower(), str(question_type).lower(),
+                 str(num_questions), description_hash(description)]
+        return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.ttl
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """Serve the least served fresh variant for key, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, data FROM question_sets WHERE cache_key = ? AND created_at > ? "
+                "ORDER BY served, created_at DESC LIMIT 1",
+                (cache_key, self._fresh_after())
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE question_sets SET served = served + 1 WHERE id = ?", (row['id'],))
+        return json.loads(row['data'])
+
+    def latest_for_doc(self, doc_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM question_sets WHERE doc_id = ? AND created_at > ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (doc_id, self._fresh_after())
+            ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def count(self, cache_key: str) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM question_sets WHERE cache_key = ? AND created_at > ?",
+                (cache_key, self._fresh_after())
+            ).fetchone()[0]
+
+    def put(self, cache_key: str, doc_id: str, params: Dict, data: Dict, served: int = 0):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM question_sets WHERE created_at <= ?", (self._fresh_after(),))
+            conn.execute(
+                "INSERT INTO question_sets (cache_key, doc_id, params, data, created_at, served) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, doc_id, json.dumps(params), json.dumps(data), time.time(), served)
+            )
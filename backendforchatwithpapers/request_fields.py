@@ -0,0 +1,9 @@
+FALSE_VALUES = ('false', '0', 'no', 'off')
+
+
+def flag(data: dict, name: str, default: bool = True) -> bool:
+    """Boolean request field; clients send "false", 0 or "no" as often as false"""
+    value = data.get(name, default)
+    if value is None:
+        return default
+    return str(value).strip().lower() not in FALSE_VALUES
@@ -1,12 +1,18 @@
 import os
 import hashlib
 from urllib.parse import urlparse
-from typing import Optional, List
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional, List
 from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
 from azure.ai.formrecognizer import DocumentAnalysisClient
 from openai import AzureOpenAI
 from dotenv import load_dotenv
+from embeddings import BatchEmbedder
+from vector_store import get_vector_backend
+from embedding_store import EmbeddingStore
+from text_store import BOILERPLATE_ROLES, ExtractedTextStore
+from context_builder import ContextBuilder
+from chunker import iter_chunks
 
 # Load environment variables
 load_dotenv()
@@ -15,10 +21,7 @@ class ResearchPaperAssistant:
     def __init__(self):
         """Initialize Azure services with optimized configuration"""
         # Service clients initialization
-        self.search_client = SearchClient(
-            endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
-            index_name="paper-videos",
-            credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_KEY")))
+        self.index = get_vector_backend()
         
         self.document_analysis_client = DocumentAnalysisClient(
             endpoint=os.getenv("AZURE_DOC_INTEL_ENDPOINT"),
@@ -35,8 +38,18 @@ class ResearchPaperAssistant:
         self.CHUNK_OVERLAP = 200        # characters overlap between chunks
         self.EMBEDDING_MODEL = "text-embedding-3-large"
         self.CHAT_MODEL = "gpt-4"   # Ensure correct deployment name
-        self.POLLING_INTERVAL = 30      # seconds for Document Intelligence
+        self.POLLING_INTERVAL = 2       # seconds for Document Intelligence
+        self.DOC_INTEL_MODEL = os.getenv("DOC_INTEL_MODEL", "prebuilt-layout")
+        self.UPLOAD_BATCH_SIZE = 100    # chunks embedded and uploaded together
         self.MAX_ANSWER_TOKENS = 300    # for concise answers
+        self.RETRIEVAL_TOP = 6          # passages retrieved per question, packed by score
+        self.ANSWER_CONTEXT_TOKENS = int(os.getenv("ANSWER_CONTEXT_TOKENS", "2000"))
+        self.context = ContextBuilder(self.CHAT_MODEL)
+
+        self.embedder = BatchEmbedder(
+            self.openai_client, self.EMBEDDING_MODEL, max_chars=self.MAX_CONTENT_LENGTH,
+            store=EmbeddingStore())
+        self.text_store = ExtractedTextStore()
 
     def _validate_pdf_url(self, url: str) -> bool:
         """Validate PDF URL format and extension"""
@@ -51,44 +64,20 @@ class ResearchPaperAssistant:
         """Generate consistent document ID from URL and title"""
         return hashlib.sha256(f"{pdf_url}-{title}".encode()).hexdigest()
 
-    def _chunk_content(self, content: str) -> List[str]:
-        """
-        Efficient content chunking with strict length control
-        """
-        # Split into sentences or smaller chunks
-        sentences = [s.strip() for s in content.replace('\n', ' ').split('.') if s.strip()]
-        chunks = []
-        current_chunk = []
-        current_length = 0
-
-        for sentence in sentences:
-            sentence_length = len(sentence)
-            if current_length + sentence_length > self.MAX_CONTENT_LENGTH:
-                chunks.append(". ".join(current_chunk) + ".")
-                # Reset with overlap
-                current_chunk = current_chunk[-1:] if current_chunk else []
-                current_length = len(current_chunk[0]) if current_chunk else 0
-            
-            current_chunk.append(sentence)
-            current_length += sentence_length + 2  # +2 for ". "
-
-        if current_chunk:
-            chunks.append(". ".join(current_chunk) + ".")
-
-        return chunks[:3]  # Limit to first 3 chunks
+    def _chunk_content(self, paragraphs: Iterable[Dict]) -> Iterator[Dict]:
+        """Stream overlapping, section-aware chunks of the extracted paragraphs"""
+        return iter_chunks(paragraphs, max_chars=self.MAX_CONTENT_LENGTH, overlap=self.CHUNK_OVERLAP)
 
     def _get_text_embedding(self, text: str) -> Optional[List[float]]:
         """Safe embedding generation with strict length handling"""
-        try:
-            # Ensure text is well under token limit
-            truncated_text = text[:self.MAX_CONTENT_LENGTH]
-            response = self.openai_client.embeddings.create(
-                input=truncated_text,
-                model=self.EMBEDDING_MODEL)
-            return response.data[0].embedding
-        except Exception as e:
-            print(f"Embedding generation failed: {str(e)}")
-            return None
+        return self.embedder.embed_one(text)
+
+    def _analyze_pdf(self, pdf_url: str):
+        poller = self.document_analysis_client.begin_analyze_document_from_url(
+            self.DOC_INTEL_MODEL,
+            pdf_url,
+            polling_interval=self.POLLING_INTERVAL)
+        return poller.result()
 
     def process_paper(self, pdf_url: str, title: str) -> Optional[str]:
         """
@@ -101,49 +90,59 @@ class ResearchPaperAssistant:
         doc_id = self._generate_document_id(pdf_url, title)
 
         # Check for existing document to avoid reprocessing
-        try:
-            existing_doc = self.search_client.get_document(key=doc_id)
+        existing_doc = self.index.get(doc_id)
+        # Documents indexed before chunking have no doc_id and get re-indexed
+        if existing_doc and existing_doc.get("doc_id"):
             print(f"Document already indexed: {existing_doc['title']}")
             return doc_id
-        except Exception:
-            pass  # Document doesn't exist, proceed with processing
 
         try:
-            # Step 1: Extract text from PDF
-            poller = self.document_analysis_client.begin_analyze_document_from_url(
-                "prebuilt-read",
-                pdf_url,
-                polling_interval=self.POLLING_INTERVAL)
-            result = poller.result()
-            full_text = " ".join(p.content for p in result.paragraphs)
+            # Step 1: Extract text from PDF (stored, so only a cold miss runs OCR)
+            document = self.text_store.get_or_extract(pdf_url, self._analyze_pdf)
 
-            if not full_text.strip():
+            if not document.text.strip():
                 print("No text content extracted from PDF")
                 return None
 
-            # Step 2: Chunk content (using first chunk for embedding)
-            chunks = self._chunk_content(full_text)
-            if not chunks:
-                print("Failed to chunk document content")
-                return None
+            # Steps 2-4: chunk, embed and index the paper a batch at a time
+            chunks = self._chunk_content(document.paragraphs(BOILERPLATE_ROLES))
+            first = None
+            count = 0
+            while True:
+                batch = list(islice(chunks, self.UPLOAD_BATCH_SIZE))
+                if not batch:
+                    break
+                embeddings = self.embedder.embed([chunk["content"] for chunk in batch])
+                if not all(embeddings):
+                    print("Failed to generate document embedding")
+                    return None
 
-            # Step 3: Generate embedding from first chunk
-            embedding = self._get_text_embedding(chunks[0])
-            if not embedding:
-                print("Failed to generate document embedding")
-                return None
+                documents = [{
+                    "id": doc_id if count + i == 0 else f"{doc_id}-chunk-{count + i}",
+                    "doc_id": doc_id,
+                    "chunk_index": count + i,
+                    "chunk_offset": chunk["offset"],
+                    "title": title,
+                    "content": chunk["content"],
+                    "content_vector": embedding,
+                    "url": pdf_url
+                } for i, (chunk, embedding) in enumerate(zip(batch, embeddings))]
+                # The document keyed by doc_id goes last, once every other chunk is in
+                if first is None:
+                    first = documents.pop(0)
+                count += len(batch)
 
-            # Step 4: Prepare document for indexing
-            document = {
-                "id": doc_id,
-                "title": title,
-                "content": chunks[0][:self.MAX_CONTENT_LENGTH],
-                "content_vector": embedding,
-                "url": pdf_url  # No full_text_length or chunk_count
-            }
+                failed = self.index.upload(documents) if documents else []
+                if failed:
+                    print(f"Failed to index {len(failed)} chunks")
+                    return None
 
-            # Step 5: Index document
-            self.search_client.upload_documents(documents=[document])
+            if first is None:
+                print("Failed to chunk document content")
+                return None
+            if self.index.upload([first]):
+                print("Failed to index the first chunk")
+                return None
             print(f"Successfully indexed paper: {title}")
             return doc_id
 
@@ -157,7 +156,10 @@ class ResearchPaperAssistant:
         """
         try:
             # Verify document exists
-            document = self.search_client.get_document(key=doc_id)
+            document = self.index.get(doc_id)
+            if document is None:
+                print(f"Document not indexed: {doc_id}")
+                return None
 
             # Generate question embedding
             question_embedding = self._get_text_embedding(question)
@@ -166,23 +168,25 @@ class ResearchPaperAssistant:
                 return None
 
             # Hybrid search (combining text and vector search)
-            search_results = self.search_client.search(
-                search_text=question,
-                vector_queries=[{
-                    "fields": "content_vector",
-                    "kind": "vector",
-                    "vector": question_embedding,
-                    "k": 2  # Reduced number of results
-                }],
-                select=["content", "title"],
-                top=2  # Reduced number of top results
+            search_results = self.index.search(
+                question,
+                question_embedding,
+                doc_id=doc_id,
+                top=self.RETRIEVAL_TOP,
+                select=["content", "title"]
             )
 
-            # Build focused context from search results
-            context_parts = []
-            for i, hit in enumerate(search_results):
-                excerpt = hit['content'][:500]  # Reduced excerpt length
-                context_parts.append(f"[Passage {i+1}]: {excerpt}")
+            # Search hits carry their rank as "@search.score"; pack ranks on "score"
+            hits = [{"content": result["content"], "score": result.get("@search.score")}
+                    for result in search_results]
+
+            # Build focused context from the best passages that fit the budget
+            budget = self.context.budget(self.ANSWER_CONTEXT_TOKENS, self.MAX_ANSWER_TOKENS,
+                                         document['title'], question)
+            context_parts = [
+                f"[Passage {i+1}]: {hit['content']}"
+                for i, hit in enumerate(self.context.pack(hits, budget))
+            ]
             
             context = "\n".join(context_parts) if context_parts else "No relevant passages found"
 
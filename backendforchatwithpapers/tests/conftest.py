@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+# Modules import each other by bare name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+class FakeIndex:
+    """In-memory stand-in for the vector backend, keyed by document id"""
+
+    def __init__(self):
+        self.documents = {}
+        self.uploads = 0
+
+    def get(self, key):
+        return self.documents.get(key)
+
+    def upload(self, documents):
+        self.uploads += 1
+        for document in documents:
+            self.documents[document["id"]] = document
+        return []
+
+    def search(self, search_text, vector, doc_id=None, top=3, select=None):
+        hits = [dict(d) for d in self.documents.values() if doc_id is None or d.get("doc_id") == doc_id]
+        return sorted(hits, key=lambda d: d.get("chunk_index", 0))[:top]
+
+
+@pytest.fixture
+def fake_index():
+    """The FakeIndex class; test modules cannot import conftest by name next to the video tests"""
+    return FakeIndex
+
+
+@pytest.fixture
+def chat(tmp_path, monkeypatch):
+    """ChatWithPaper with its stores under tmp_path and no Azure clients"""
+    pytest.importorskip("openai")
+    pytest.importorskip("azure.ai.formrecognizer")
+    import chat_with_paper
+
+    for name, filename in (("ANSWER_CACHE_PATH", "answers.db"), ("EMBEDDING_STORE_PATH", "embeddings.db"),
+                           ("INGESTION_STORE_PATH", "ingestion.db"), ("QUESTION_CACHE_PATH", "questions.db"),
+                           ("TEXT_STORE_PATH", "text.db")):
+        monkeypatch.setenv(name, str(tmp_path / filename))
+    monkeypatch.setenv("INDEX_LOCK_DIR", str(tmp_path / "locks"))
+    monkeypatch.setattr(chat_with_paper, "get_vector_backend", FakeIndex)
+    monkeypatch.setattr(chat_with_paper, "DocumentAnalysisClient", lambda **kwargs: None)
+    monkeypatch.setattr(chat_with_paper, "AzureKeyCredential", lambda key: None)
+    monkeypatch.setattr(chat_with_paper, "AzureOpenAI", lambda **kwargs: None)
+    service = chat_with_paper.ChatWithPaper()
+    yield service
+    service._background.shutdown(wait=True)
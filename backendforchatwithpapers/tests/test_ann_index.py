@@ -0,0 +1,35 @@
+import numpy as np
+
+from ann_index import IVFIndex, exact_search, synthetic_embeddings
+
+
+def test_train_clamps_nlist_to_row_count():
+    vectors, = synthetic_embeddings([10], dims=32, topics=3)
+    index = IVFIndex(min_rows=1)
+    index.train(vectors, len(vectors))
+    assert len(index.centroids) == 10
+    assert sorted(row for cell in index._lists for row in cell) == list(range(10))
+
+
+def test_explicit_nlist_above_row_count():
+    vectors, = synthetic_embeddings([40], dims=32, topics=3)
+    index = IVFIndex(nlist=64, min_rows=1)
+    index.train(vectors, len(vectors))
+    assert len(index.centroids) == 40
+
+
+def test_probing_every_list_is_exact():
+    vectors, queries = synthetic_embeddings([2000, 5], dims=64, topics=20)
+    index = IVFIndex(nlist=32, min_rows=1)
+    index.train(vectors, len(vectors))
+    for query in queries:
+        assert index.search(vectors, query, 10, nprobe=32) == exact_search(vectors, query, 10)
+
+
+def test_add_assigns_new_rows():
+    vectors, = synthetic_embeddings([300], dims=32, topics=5)
+    index = IVFIndex(nlist=8, min_rows=1)
+    index.train(vectors, 200)
+    index.add(vectors, range(200, 300))
+    assert sorted(row for cell in index._lists for row in cell) == list(range(300))
+    assert index.search(vectors, vectors[250], 1, nprobe=8) == [250]
@@ -0,0 +1,111 @@
+import importlib.util
+import time
+
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache, normalize_question
+
+needs_numpy = pytest.mark.skipif(importlib.util.find_spec("numpy") is None, reason="numpy not installed")
+
+
+def _vector(*components, dims=8):
+    return [float(c) for c in components] + [0.0] * (dims - len(components))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / "answers.db"))
+
+
+def _no_embedding():
+    pytest.fail("embedded a question with an exact match")
+
+
+def test_normalize_question():
+    assert normalize_question("  What's the MAIN result?! ") == "what s the main result"
+
+
+def test_exact_match_skips_embedding(cache):
+    cache.put("doc", "What is the main result?", _vector(1), {"answer": "A"})
+    hit = cache.lookup("doc", "what is the main result", _no_embedding)
+    assert (hit["answer"], hit["match"]) == ("A", "exact")
+
+
+@needs_numpy
+def test_semantic_match_within_threshold(cache):
+    cache.put("doc", "What is the main result?", _vector(1, 0), {"answer": "A"})
+    cache.put("doc", "How was it trained?", _vector(0, 1), {"answer": "B"})
+
+    hit = cache.lookup("doc", "Which result matters most?", lambda: _vector(0.99, 0.1))
+    assert (hit["answer"], hit["match"]) == ("A", "semantic")
+    assert hit["similarity"] >= cache.threshold
+    assert cache.lookup("doc", "Who wrote it?", lambda: _vector(0.7, 0.7)) is None
+    assert cache.lookup("other", "Which result matters most?", lambda: _vector(0.99, 0.1)) is None
+
+
+@needs_numpy
+def test_new_entries_from_another_process_are_seen(cache):
+    other = AnswerCache(cache.db_path)
+    cache.put("doc", "How was it trained?", _vector(0, 1), {"answer": "B"})
+    assert other.lookup("doc", "Which result matters most?", lambda: _vector(1, 0)) is None
+
+    cache.put("doc", "What is the main result?", _vector(1, 0), {"answer": "A"})
+    assert other.lookup("doc", "Which result matters most?", lambda: _vector(1, 0))["answer"] == "A"
+
+
+def test_semantic_lookup_without_numpy_is_a_miss(cache, monkeypatch):
+    monkeypatch.setattr(answer_cache, "_numpy", lambda: None)
+    cache.put("doc", "What is the main result?", _vector(1, 0), {"answer": "A"})
+
+    assert cache.lookup("doc", "Which result matters most?", lambda: _vector(1, 0)) is None
+    assert cache.lookup("doc", "what is the main result", _no_embedding)["answer"] == "A"
+    assert (cache.stats()["exact_hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_version_change_retires_answers(cache):
+    cache.put("doc", "What is the main result?", _vector(1), {"answer": "old"}, version=1)
+    assert cache.lookup("doc", "What is the main result?", lambda: _vector(1), version=2) is None
+
+    cache.put("doc", "How was it trained?", _vector(0, 1), {"answer": "new"}, version=2)
+    assert cache.lookup("doc", "What is the main result?", lambda: _vector(1), version=1) is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_expired_entries_do_not_match(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.db"), ttl=60)
+    cache.put("doc", "What is the main result?", _vector(1), {"answer": "A"})
+    with cache._connect() as conn:
+        conn.execute("UPDATE answers SET created_at = ?", (time.time() - 120,))
+    assert cache.lookup("doc", "What is the main result?", lambda: _vector(1)) is None
+
+
+def test_per_paper_limit_keeps_most_recently_used(tmp_path):
+    cache = AnswerCache(str(tmp_path / "answers.db"), max_per_doc=2)
+    for i in range(3):
+        cache.put("doc", f"Question {i}?", _vector(i + 1.0, 1), {"answer": str(i)})
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("doc", "Question 0?", lambda: None) is None
+
+
+def test_stats(cache):
+    cache.put("doc", "What is the main result?", _vector(1), {"answer": "A"})
+    cache.lookup("doc", "What is the main result?", _no_embedding)
+    cache.lookup("doc", "Something else entirely?", lambda: None)
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 0, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_adds_version_to_old_database(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "answers.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE answers (id INTEGER PRIMARY KEY AUTOINCREMENT, doc_id TEXT NOT NULL, "
+                 "question_hash TEXT NOT NULL, question TEXT NOT NULL, vector BLOB, data TEXT NOT NULL, "
+                 "created_at REAL NOT NULL, last_used REAL NOT NULL, UNIQUE (doc_id, question_hash))")
+    conn.commit()
+    conn.close()
+    cache = AnswerCache(path)
+    cache.put("doc", "What is the main result?", _vector(1), {"answer": "A"})
+    assert cache.lookup("doc", "What is the main result?", lambda: _vector(1))["answer"] == "A"
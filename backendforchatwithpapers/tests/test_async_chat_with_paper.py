@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("azure.search.documents.aio")
+
+PDF_URL = "https://example.org/paper.pdf"
+TITLE = "A Paper"
+VECTOR = [0.6, 0.8, 0.0]
+
+
+@pytest.fixture
+def service(chat, monkeypatch):
+    import async_chat_with_paper
+
+    monkeypatch.setattr(async_chat_with_paper, "AsyncAzureOpenAI", lambda **kwargs: None)
+    service = async_chat_with_paper.AsyncChatWithPaper(sync_service=chat)
+    service.validations = []
+    service.embedding = VECTOR
+
+    async def validate(url):
+        service.validations.append(url)
+        return False
+
+    async def embed(text):
+        return service.embedding
+
+    service._validate_pdf = validate
+    service._get_embedding = embed
+    yield service
+    asyncio.run(service.http.aclose())
+
+
+def _doc_id(service):
+    return service.sync._generate_doc_id(PDF_URL, TITLE)
+
+
+def test_exact_cached_answer_needs_no_embedding(service):
+    service.sync.answer_cache.put(_doc_id(service), "What is the main result?", VECTOR,
+                                  {"answer": "It works.", "sources": []})
+    service.embedding = None
+
+    result = asyncio.run(service.chat_with_paper(PDF_URL, TITLE, "what is the main result"))
+
+    assert (result["answer"], result["cached"]) == ("It works.", "exact")
+    assert service.validations == []
+
+
+def test_semantic_cached_answer(service):
+    service.sync.answer_cache.put(_doc_id(service), "What is the main result?", VECTOR,
+                                  {"answer": "It works.", "sources": []})
+
+    result = asyncio.run(service.chat_with_paper(PDF_URL, TITLE, "Which result matters most?"))
+
+    assert result["cached"] == "semantic"
+    assert service.validations == []
+
+
+def test_indexed_paper_skips_validation(service):
+    doc_id = _doc_id(service)
+    service.sync.index.documents[doc_id] = {"id": doc_id, "doc_id": doc_id, "chunk_index": 0}
+
+    prepared = asyncio.run(service._prepare(PDF_URL, TITLE, "What is new?"))
+
+    assert (prepared["exists"], prepared["vector"]) == (True, VECTOR)
+    assert service.validations == []
+
+
+def test_new_paper_is_validated(service):
+    result = asyncio.run(service.chat_with_paper(PDF_URL, TITLE, "What is new?"))
+
+    assert result == {"error": "Invalid PDF URL"}
+    assert service.validations == [PDF_URL]
+
+
+def _embedding_service(chat, monkeypatch, create):
+    import async_chat_with_paper
+    from types import SimpleNamespace
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    monkeypatch.setattr(async_chat_with_paper, "AsyncAzureOpenAI", lambda **kwargs: client)
+    return async_chat_with_paper.AsyncChatWithPaper(sync_service=chat)
+
+
+def test_question_embedding_shares_the_embedding_store(chat, monkeypatch):
+    from types import SimpleNamespace
+
+    calls = []
+
+    async def create(input, model):
+        calls.append((input, model))
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=VECTOR)])
+
+    service = _embedding_service(chat, monkeypatch, create)
+
+    async def embed_twice():
+        return [await service._get_embedding("What is new?") for _ in range(2)]
+
+    try:
+        vectors = asyncio.run(embed_twice())
+    finally:
+        asyncio.run(service.http.aclose())
+
+    assert [list(vector) for vector in vectors] == [pytest.approx(VECTOR)] * 2
+    # The second lookup is served by the store, which the sync path reads too
+    assert calls == [(["What is new?"], chat.embedder.model)]
+    assert list(chat.embedder.embed_one("What is new?")) == pytest.approx(VECTOR)
+
+
+def test_failed_question_embedding_is_not_stored(chat, monkeypatch):
+    async def create(input, model):
+        raise RuntimeError("rate limited")
+
+    service = _embedding_service(chat, monkeypatch, create)
+    try:
+        assert asyncio.run(service._get_embedding("What is new?")) is None
+    finally:
+        asyncio.run(service.http.aclose())
+    assert chat.embedder.store.get_many(chat.embedder.model, ["What is new?"]) == {}
@@ -0,0 +1,83 @@
+import pytest
+
+from chunker import iter_chunks, synthetic_paragraphs
+from text_store import BOILERPLATE_ROLES, StructuredDocument
+
+
+def _check(chunks, text, max_chars, overlap):
+    assert chunks
+    previous = None
+    for chunk in chunks:
+        assert chunk["content"] == text[chunk["offset"]:chunk["offset"] + len(chunk["content"])]
+        assert 0 < len(chunk["content"]) <= max_chars
+        if previous is not None:
+            # Chunks never go backwards, and together they leave nothing out
+            assert chunk["offset"] > previous["offset"]
+            assert chunk["offset"] <= previous["offset"] + len(previous["content"]) + 1
+        previous = chunk
+    assert chunks[0]["offset"] == 0
+    assert chunks[-1]["offset"] + len(chunks[-1]["content"]) == len(text)
+
+
+@pytest.mark.parametrize("max_chars,overlap", [(4000, 200), (1000, 100), (300, 0)])
+def test_chunks_are_slices_of_the_text(max_chars, overlap):
+    paragraphs = list(synthetic_paragraphs(60000, seed=max_chars))
+    text = " ".join(p["content"] for p in paragraphs)
+    _check(list(iter_chunks(paragraphs, max_chars, overlap)), text, max_chars, overlap)
+
+
+def test_long_paragraph_overlaps_on_a_word():
+    sentence = "The loss decreases to 0.42 after 10 epochs (see Fig. 3). "
+    text = (sentence * 100).strip()
+    chunks = list(iter_chunks([{"content": text}], max_chars=500, overlap=100))
+    _check(chunks, text, 500, 100)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        end = previous["offset"] + len(previous["content"])
+        assert 0 < end - chunk["offset"] <= 100
+        assert text[chunk["offset"] - 1] == " "
+        # Cut at a sentence end, never after an abbreviation like "Fig."
+        assert previous["content"].endswith("(see Fig. 3). ")
+
+
+def test_heading_starts_a_fresh_chunk():
+    paragraphs = [
+        {"content": "a" * 300, "role": None},
+        {"content": "Methods", "role": "sectionHeading"},
+        {"content": "b" * 300, "role": None},
+    ]
+    chunks = list(iter_chunks(paragraphs, max_chars=1000, overlap=100))
+    assert [c["content"][:7] for c in chunks] == ["a" * 7, "Methods"]
+    assert chunks[1]["section"] == "Methods"
+    assert chunks[1]["offset"] == 301
+
+
+def test_chunks_fill_across_skipped_paragraphs():
+    document = StructuredDocument.from_paragraphs([
+        {"content": "First body paragraph.", "page": 1},
+        {"content": "Running header", "role": "pageHeader", "page": 2},
+        {"content": "Second body paragraph.", "page": 2},
+    ])
+    chunks = list(iter_chunks(document.paragraphs(BOILERPLATE_ROLES), max_chars=1000))
+    assert [(c["offset"], c["content"], c["page"]) for c in chunks] == [
+        (0, "First body paragraph. Second body paragraph.", 1)]
+    content, end = document.excerpt(0, len(chunks[0]["content"]), BOILERPLATE_ROLES)
+    assert (content, end) == (chunks[0]["content"], len(document.text))
+    assert document.pages_for(0, end) == [1, 2]
+
+
+@pytest.mark.parametrize("max_chars,overlap", [(1000, 100), (300, 60)])
+def test_excerpt_rebuilds_chunks_across_page_furniture(max_chars, overlap):
+    paragraphs = []
+    for i, paragraph in enumerate(synthetic_paragraphs(30000, seed=overlap)):
+        if i % 4 == 0:
+            paragraphs.append({"content": f"Running header {i}", "role": "pageHeader", "page": paragraph["page"]})
+        paragraphs.append(paragraph)
+    document = StructuredDocument.from_paragraphs(paragraphs)
+    chunks = list(iter_chunks(document.paragraphs(BOILERPLATE_ROLES), max_chars, overlap))
+
+    # Headers are skipped as if the pages had none
+    body = [{"content": p["content"], "role": p["role"]} for p in paragraphs if p["role"] != "pageHeader"]
+    assert [c["content"] for c in chunks] == [c["content"] for c in iter_chunks(body, max_chars, overlap)]
+    for chunk in chunks:
+        content, _ = document.excerpt(chunk["offset"], len(chunk["content"]), BOILERPLATE_ROLES)
+        assert content == chunk["content"]
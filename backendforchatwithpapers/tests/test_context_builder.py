@@ -0,0 +1,60 @@
+from context_builder import ContextBuilder, split_text
+from embeddings import estimate_tokens
+
+
+class OverCountingCounter:
+    """Counts 10% above the estimate, like a tokenizer on text denser than English prose"""
+
+    exact = True
+
+    def count(self, text):
+        return estimate_tokens(text) * 11 // 10
+
+    def truncate(self, text, max_tokens):
+        return text if self.count(text) <= max_tokens else text[:max_tokens * 3]
+
+
+def _builder(counter=None):
+    builder = ContextBuilder("gpt-4")
+    if counter is not None:
+        builder.counter = counter
+    return builder
+
+
+def _paper(chars):
+    return " ".join("word" for _ in range(chars // 5))
+
+
+def test_pack_text_returns_whole_paper_that_fits():
+    text = _paper(4000)
+    assert _builder().pack_text(text, 5000) is text
+
+
+def test_pack_text_spreads_excerpts_over_a_long_paper():
+    text = _paper(100_000)
+    packed = _builder().pack_text(text, 3000)
+    assert "[...]" in packed
+    assert estimate_tokens(packed) <= 3000 + 100
+
+
+def test_pack_text_stays_in_budget_when_counts_exceed_the_estimate():
+    counter = OverCountingCounter()
+    text = _paper(7500)
+    # The estimate says every piece fits, the exact counts do not
+    budget = sum(estimate_tokens(piece) + 3 for piece in split_text(text)) + 10
+    packed = _builder(counter).pack_text(text, budget)
+    assert packed != text
+    assert counter.count(packed) <= budget
+
+
+def test_pack_keeps_best_passages_within_budget():
+    passages = [{"content": _paper(2000), "score": score} for score in (0.1, 0.9, 0.5)]
+    packed = _builder().pack(passages, 1000)
+    assert [p["score"] for p in packed] == [0.9, 0.5]
+    assert sum(p["tokens"] + 8 for p in packed) <= 1000
+
+
+def test_budget_leaves_room_for_prompt_and_answer():
+    builder = ContextBuilder("gpt-4", context_tokens=1000)
+    assert builder.budget(5000, 300, "x" * 400) == 1000 - 300 - (100 + 8)
+    assert builder.budget(200, 300) == 200
@@ -0,0 +1,73 @@
+import sqlite3
+import time
+
+import pytest
+
+from embedding_store import EmbeddingStore
+
+MODEL = "text-embedding-3-large"
+DIMS = 1024
+
+
+def _vector(seed):
+    return [float(seed)] * DIMS
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore(str(tmp_path / "embeddings.db"))
+
+
+def _rows(store):
+    with sqlite3.connect(store.db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def test_round_trip_as_float32(store):
+    store.put_many(MODEL, {"attention": [0.1, 0.2, 0.3]})
+    assert store.get_many(MODEL, ["attention"])["attention"] == pytest.approx([0.1, 0.2, 0.3])
+    assert store.get_many("other-model", ["attention"]) == {}
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_failed_embeddings_are_never_stored(store):
+    store.put_many(MODEL, {"ok": _vector(1), "failed": None, "empty": []})
+    assert set(store.get_many(MODEL, ["ok", "failed", "empty"])) == {"ok"}
+    assert _rows(store) == 1
+
+    store.put_many(MODEL, {"failed": None})
+    assert _rows(store) == 1
+
+
+def test_eviction_removes_least_recently_used_first(store):
+    for i in range(6):
+        store.put_many(MODEL, {f"text {i}": _vector(i)})
+        time.sleep(0.01)
+    # Reading the oldest rows makes them recently used
+    store.get_many(MODEL, ["text 0", "text 1"])
+
+    with sqlite3.connect(store.db_path) as conn:
+        store.max_bytes = EmbeddingStore._used_bytes(conn) - 1
+    assert store.evict() > 0
+
+    kept = set(store.get_many(MODEL, [f"text {i}" for i in range(6)]))
+    assert {"text 0", "text 1"} <= kept
+    assert "text 2" not in kept
+    assert len(kept) < 6
+
+
+def test_store_within_budget_is_left_alone(store):
+    store.put_many(MODEL, {f"text {i}": _vector(i) for i in range(4)})
+    assert store.evict() == 0
+    assert _rows(store) == 4
+
+
+def test_writes_keep_the_store_under_budget(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "embeddings.db"), max_bytes=64 * 1024)
+    for i in range(40):
+        store.put_many(MODEL, {f"text {i}": _vector(i)})
+
+    with sqlite3.connect(store.db_path) as conn:
+        assert EmbeddingStore._used_bytes(conn) <= store.max_bytes
+    assert 0 < _rows(store) < 40
+    assert "text 39" in store.get_many(MODEL, ["text 39"])
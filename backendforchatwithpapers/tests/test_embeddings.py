@@ -0,0 +1,79 @@
+import threading
+from types import SimpleNamespace
+
+from embedding_store import EmbeddingStore
+from embeddings import BatchEmbedder, estimate_tokens
+
+MODEL = "text-embedding-3-large"
+
+
+def _vector(text):
+    return [float(len(text)), float(sum(map(ord, text)))]
+
+
+class FakeEmbeddings:
+    """Embeddings client that answers out of order and fails batches holding a poisoned text"""
+
+    def __init__(self, poisoned=()):
+        self.poisoned = set(poisoned)
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def create(self, input, model):
+        with self._lock:
+            self.requests.append(list(input))
+        if self.poisoned & set(input):
+            raise RuntimeError("rate limited")
+        data = [SimpleNamespace(index=i, embedding=_vector(text)) for i, text in enumerate(input)]
+        return SimpleNamespace(data=data[::-1])
+
+
+def _embedder(fake, **kwargs):
+    return BatchEmbedder(SimpleNamespace(embeddings=fake), MODEL, **kwargs)
+
+
+def test_order_matches_input_across_batches():
+    fake = FakeEmbeddings()
+    texts = [f"chunk {i} " + "x" * (i * 7) for i in range(40)]
+    vectors = _embedder(fake, max_batch_tokens=60, max_workers=4).embed(texts)
+
+    assert len(fake.requests) > 1
+    assert all(sum(map(estimate_tokens, batch)) <= 60 or len(batch) == 1 for batch in fake.requests)
+    assert vectors == [_vector(text) for text in texts]
+
+
+def test_batches_respect_max_batch_size():
+    fake = FakeEmbeddings()
+    texts = [f"chunk {i}" for i in range(10)]
+    assert _embedder(fake, max_batch_size=3).embed(texts) == [_vector(t) for t in texts]
+    assert [len(batch) for batch in fake.requests] == [3, 3, 3, 1]
+
+
+def test_duplicate_inputs_are_embedded_once():
+    fake = FakeEmbeddings()
+    texts = ["Page 1 header", "body", "Page 1 header", "body", "other"]
+    vectors = _embedder(fake).embed(texts)
+
+    assert fake.requests == [["Page 1 header", "body", "other"]]
+    assert vectors == [_vector(text) for text in texts]
+
+
+def test_failed_batch_yields_none_only_at_its_positions():
+    fake = FakeEmbeddings(poisoned={"chunk 4"})
+    texts = [f"chunk {i}" for i in range(9)]
+    vectors = _embedder(fake, max_batch_size=3).embed(texts)
+
+    # chunk 4 sits in the second batch, so exactly positions 3-5 are missing
+    assert [i for i, vector in enumerate(vectors) if vector is None] == [3, 4, 5]
+    assert all(vectors[i] == _vector(texts[i]) for i in (0, 1, 2, 6, 7, 8))
+
+
+def test_store_serves_known_texts_and_skips_failures(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "embeddings.db"))
+    store.put_many(MODEL, {"known": _vector("known")})
+    fake = FakeEmbeddings(poisoned={"bad"})
+    embedder = _embedder(fake, max_batch_size=1, store=store)
+
+    assert embedder.embed(["known", "new", "bad"])[2] is None
+    assert sorted(fake.requests) == [["bad"], ["new"]]
+    assert set(store.get_many(MODEL, ["known", "new", "bad"])) == {"known", "new"}
@@ -0,0 +1,128 @@
+import pytest
+
+from ingestion_store import (EMPTY_ERROR, IngestionStore, STAGE_COMPLETE, STAGE_EMPTY,
+                             STAGE_EXTRACT, STAGE_UPLOAD)
+from text_store import StructuredDocument
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IngestionStore(str(tmp_path / "ingestion.db"))
+
+
+def _chunks(n):
+    return ({"offset": i * 10, "content": "x" * 12} for i in range(n))
+
+
+def test_stages_through_upload(store):
+    assert store.start("doc", "https://x/p.pdf", "P")["stage"] == STAGE_EXTRACT
+    assert store.set_chunks("doc", _chunks(3)) == 3
+    assert store.get("doc")["stage"] == STAGE_UPLOAD
+    assert [c["chunk_offset"] for c in store.pending_chunks("doc")] == [0, 10, 20]
+
+    store.mark_uploaded("doc", [0, 1])
+    assert store.get("doc")["stage"] == STAGE_UPLOAD
+    store.mark_uploaded("doc", [2])
+    assert store.get("doc")["stage"] == STAGE_COMPLETE
+
+
+def test_failure_keeps_stage(store):
+    store.start("doc", "https://x/p.pdf", "P")
+    store.set_chunks("doc", _chunks(2))
+    store.fail("doc", "upload timed out")
+    state = store.get("doc")
+    assert (state["stage"], state["error"]) == (STAGE_UPLOAD, "upload timed out")
+    assert store.stats()["failed"] == 1
+
+
+def test_rechunking_bumps_version(store):
+    store.start("doc", "https://x/p.pdf", "P")
+    assert store.get("doc")["version"] == 0
+    store.set_chunks("doc", _chunks(2))
+    store.set_chunks("doc", _chunks(3))
+    assert store.get("doc")["version"] == 2
+
+
+def test_adds_version_to_old_database(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "ingestion.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE papers (doc_id TEXT PRIMARY KEY, pdf_url TEXT NOT NULL, title TEXT NOT NULL, "
+                 "stage TEXT NOT NULL, chunks INTEGER, error TEXT, updated_at REAL NOT NULL)")
+    conn.execute("INSERT INTO papers VALUES ('doc', 'https://x/p.pdf', 'P', 'complete', 3, NULL, 0)")
+    conn.commit()
+    conn.close()
+    assert IngestionStore(path).get("doc")["version"] == 0
+
+
+def test_no_chunks_is_terminal(store):
+    store.start("doc", "https://x/p.pdf", "P")
+    assert store.set_chunks("doc", _chunks(0)) == 0
+    state = store.get("doc")
+    assert (state["stage"], state["chunks"], state["error"]) == (STAGE_EMPTY, 0, EMPTY_ERROR)
+    assert store.start("doc", "https://x/p.pdf", "P")["stage"] == STAGE_EMPTY
+    assert store.stats()["failed"] == 0
+
+
+def test_boilerplate_only_paper_is_not_reprocessed(chat):
+    extractions = []
+
+    def extract(pdf_url):
+        extractions.append(pdf_url)
+        return StructuredDocument.from_paragraphs([
+            {"content": "Journal of Examples", "role": "pageHeader", "page": 1},
+            {"content": "1", "role": "pageNumber", "page": 1}
+        ])
+
+    chat._extract_document = extract
+    doc_id = chat._generate_doc_id("https://x/p.pdf", "P")
+    for _ in range(3):
+        assert chat._ensure_indexed("https://x/p.pdf", "P", doc_id) == {"error": EMPTY_ERROR}
+    assert len(extractions) == 1
+    assert chat.ingestion.get(doc_id)["stage"] == STAGE_EMPTY
+    chat._resume_ingestion(doc_id)
+    assert not chat._resuming
+
+
+def test_summary_is_kept_for_one_chunking(store):
+    store.start("doc", "https://x/p.pdf", "P")
+    store.set_chunks("doc", _chunks(2))
+    store.put_summary("doc", "First chunking.", version=1)
+    assert store.get_summary("doc") == "First chunking."
+
+    store.set_chunks("doc", _chunks(3))
+    assert store.get_summary("doc") is None
+    store.put_summary("doc", "Second chunking.", version=2)
+    assert store.get_summary("doc") == "Second chunking."
+    assert store.stats()["summaries"] == 1
+
+
+def test_reset_uploads_only_touches_upload_stages(store):
+    store.start("doc", "https://x/p.pdf", "P")
+    assert not store.reset_uploads("doc")
+    store.set_chunks("doc", _chunks(2))
+    store.mark_uploaded("doc", [0, 1])
+
+    assert store.reset_uploads("doc")
+    state = store.get("doc")
+    assert (state["stage"], state["version"]) == (STAGE_UPLOAD, 1)
+    assert [c["chunk_index"] for c in store.pending_chunks("doc")] == [0, 1]
+
+
+def test_paper_missing_from_a_new_index_is_uploaded_again(chat, fake_index):
+    chat._extract_document = lambda pdf_url: StructuredDocument.from_paragraphs(
+        [{"content": "A body paragraph about the method.", "page": 1}])
+    chat._get_embeddings = lambda texts: [[1.0, 0.0, 0.0] for _ in texts]
+    chat._schedule_summary = lambda *args: None
+    doc_id = chat._generate_doc_id("https://x/p.pdf", "P")
+
+    assert chat._ensure_indexed("https://x/p.pdf", "P", doc_id)["status"] == "processed"
+    assert chat.ingestion.get(doc_id)["stage"] == STAGE_COMPLETE
+
+    # The index is recreated (or VECTOR_BACKEND switched) under a complete checkpoint
+    chat.index = fake_index()
+    assert not chat._paper_exists(doc_id)
+
+    assert chat._ensure_indexed("https://x/p.pdf", "P", doc_id)["status"] == "processed"
+    assert chat._paper_exists(doc_id)
+    assert chat.ingestion.get(doc_id)["stage"] == STAGE_COMPLETE
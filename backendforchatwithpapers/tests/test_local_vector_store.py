@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("azure.search.documents")
+
+from local_vector_store import VECTOR_FIELD, LocalVectorStore
+
+
+def _documents(doc_id, vectors, start=0):
+    return [{
+        "id": doc_id if i == 0 else f"{doc_id}-chunk-{i}",
+        "doc_id": doc_id,
+        "chunk_index": i,
+        "content": f"chunk {i} of {doc_id}",
+        VECTOR_FIELD: vector.tolist()
+    } for i, vector in enumerate(vectors, start)]
+
+
+def _wait_for_ann(store, timeout=10.0):
+    deadline = time.time() + timeout
+    while store._ann_building or not store.ann.trained:
+        if time.time() > deadline:
+            pytest.fail("IVF index was not built")
+        time.sleep(0.02)
+
+
+def test_ann_index_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv("ANN_INDEX", raising=False)
+    monkeypatch.setenv("ANN_MIN_ROWS", "8")
+    store = LocalVectorStore(str(tmp_path))
+    store.upload(_documents("paper", np.random.default_rng(0).standard_normal((20, 16))))
+    assert not store._ann_building
+    assert store.stats()["ann_lists"] == 0
+
+
+def test_ann_index_serves_unfiltered_queries(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANN_INDEX", "1")
+    monkeypatch.setenv("ANN_MIN_ROWS", "8")
+    vectors = np.random.default_rng(0).standard_normal((20, 16))
+    store = LocalVectorStore(str(tmp_path))
+    store.upload(_documents("paper", vectors))
+    _wait_for_ann(store)
+
+    assert store.stats()["ann_lists"] == 16
+    hits = store.search("", vectors[7].tolist(), top=1, nprobe=20)
+    assert hits[0]["chunk_index"] == 7
+
+
+def test_uploads_survive_reopening(tmp_path):
+    vectors = np.random.default_rng(1).standard_normal((12, 16))
+    store = LocalVectorStore(str(tmp_path))
+    assert store.upload(_documents("a", vectors[:6]) + _documents("b", vectors[6:])) == []
+
+    reopened = LocalVectorStore(str(tmp_path))
+    assert reopened.stats()["documents"] == 12
+    assert reopened.get("b-chunk-2")["content"] == "chunk 2 of b"
+    hits = reopened.search("", vectors[8].tolist(), doc_id="b", top=2)
+    assert (hits[0]["doc_id"], hits[0]["chunk_index"]) == ("b", 2)
+    assert all(hit["doc_id"] == "b" for hit in hits)
+
+
+def test_other_instances_see_new_uploads(tmp_path):
+    vectors = np.random.default_rng(2).standard_normal((6, 16))
+    writer = LocalVectorStore(str(tmp_path))
+    reader = LocalVectorStore(str(tmp_path))
+    writer.upload(_documents("a", vectors[:3]))
+    assert reader.search("", vectors[0].tolist(), doc_id="a")[0]["chunk_index"] == 0
+
+    # Re-uploading an id replaces the row instead of adding one
+    writer.upload(_documents("a", vectors[3:]))
+    assert reader.stats()["documents"] == 3
+    assert reader.search("", vectors[4].tolist(), doc_id="a", top=1)[0]["chunk_index"] == 1
+
+
+def test_keyword_search_and_bad_vectors(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    documents = _documents("a", np.eye(4, 16))
+    documents[3][VECTOR_FIELD] = [1.0, 0.0]
+    assert store.upload(documents) == ["a-chunk-3"]
+    hits = store.search("chunk 2", None, doc_id="a", top=1)
+    assert hits[0]["chunk_index"] == 2
+    assert store.search("chunk", None, doc_id="missing") == []
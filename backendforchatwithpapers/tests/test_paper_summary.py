@@ -0,0 +1,87 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+PDF_URL = "https://example.org/paper.pdf"
+TITLE = "A Paper"
+
+
+class FakeCompletions:
+    """Summary completions that can be held open until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.release.wait(5)
+        content = f"Summary {self.calls}."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def completions(chat, monkeypatch):
+    completions = FakeCompletions()
+    chat.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(chat, "_extract_text", lambda pdf_url: "Attention is all you need.")
+    doc_id = chat._generate_doc_id(PDF_URL, TITLE)
+    chat.index.documents[doc_id] = {"id": doc_id, "doc_id": doc_id, "chunk_index": 0}
+    return completions
+
+
+def _doc_id(chat):
+    return chat._generate_doc_id(PDF_URL, TITLE)
+
+
+def _no_call(*args, **kwargs):
+    pytest.fail("did more than read the stored summary")
+
+
+def test_stored_summary_is_a_single_read(chat, completions, monkeypatch):
+    chat.ingestion.put_summary(_doc_id(chat), "Stored.")
+    for name in ("_paper_exists", "_validate_pdf", "_extract_text", "_build_summary"):
+        monkeypatch.setattr(chat, name, _no_call)
+
+    assert chat.get_paper_summary(PDF_URL, TITLE) == {"summary": "Stored.", "doc_id": _doc_id(chat),
+                                                      "title": TITLE}
+    assert completions.calls == 0
+
+
+def test_built_summary_is_stored(chat, completions):
+    assert chat.get_paper_summary(PDF_URL, TITLE)["summary"] == "Summary 1."
+    assert chat.get_paper_summary(PDF_URL, TITLE)["summary"] == "Summary 1."
+    assert completions.calls == 1
+    assert chat.ingestion.get_summary(_doc_id(chat)) == "Summary 1."
+
+
+def test_concurrent_requests_share_one_build(chat, completions):
+    completions.release.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(chat.get_paper_summary(PDF_URL, TITLE)))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    completions.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert completions.calls == 1
+    assert [result["summary"] for result in results] == ["Summary 1."] * 6
+
+
+def test_rechunked_paper_gets_a_new_summary(chat, completions):
+    doc_id = _doc_id(chat)
+    chat.ingestion.start(doc_id, PDF_URL, TITLE)
+    chat.ingestion.set_chunks(doc_id, [{"offset": 0, "content": "Attention"}])
+    assert chat.get_paper_summary(PDF_URL, TITLE)["summary"] == "Summary 1."
+
+    # Re-ingesting bumps the version, which retires the summary of the old chunking
+    chat.ingestion.set_chunks(doc_id, [{"offset": 0, "content": "Attention is all"}])
+    assert chat.get_paper_summary(PDF_URL, TITLE)["summary"] == "Summary 2."
+    assert chat.get_paper_summary(PDF_URL, TITLE)["summary"] == "Summary 2."
+    assert completions.calls == 2
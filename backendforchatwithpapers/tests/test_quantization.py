@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from quantization import CompactVectors, quantize_int8, truncate
+
+
+def _unit_rows(n, dims, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dims)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_int8_error_is_within_half_a_step():
+    vectors = _unit_rows(50, 64)
+    codes, scales = quantize_int8(vectors)
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    assert np.abs(codes).max() == 127
+    error = np.abs(codes * scales[:, None] - vectors)
+    assert np.all(error <= scales[:, None] / 2 + 1e-7)
+
+
+def test_zero_vector_quantizes_to_zero():
+    codes, scales = quantize_int8(np.zeros(8))
+    assert not codes.any()
+    assert scales[0] == 1
+
+
+def test_truncate_renormalizes():
+    reduced = truncate(_unit_rows(5, 64), 16)
+    assert reduced.shape == (5, 16)
+    assert np.allclose(np.linalg.norm(reduced, axis=1), 1)
+
+
+@pytest.mark.parametrize("storage", ["float32", "int8"])
+def test_compact_scores_match_full_precision(tmp_path, storage):
+    vectors = _unit_rows(40, 32)
+    compact = CompactVectors(str(tmp_path / "vectors"), storage, 32)
+    compact.map(40)
+    compact.write(slice(0, 39), vectors[:39])
+    compact.write(39, vectors[39])  # single-row writes take the 1-d path
+
+    query = compact.prepare_query(vectors[3])
+    scores = compact.scores(np.arange(40), query)
+    exact = vectors @ vectors[3]
+    # Each code is off by at most half a step of max|v| / 127, and |query| = 1
+    bound = 0 if storage == "float32" else np.sqrt(32) * np.abs(vectors).max(axis=1) / 254
+    assert np.all(np.abs(scores - exact) <= bound + 1e-5)
+    assert np.allclose(compact[39], vectors[39], atol=np.abs(vectors[39]).max() / 254 + 1e-7)
+    assert int(np.argmax(scores)) == 3
+
+
+def test_compact_rows_survive_remapping(tmp_path):
+    vectors = _unit_rows(10, 16)
+    compact = CompactVectors(str(tmp_path / "vectors"), "int8", 16)
+    compact.map(10)
+    compact.write(slice(0, 10), vectors)
+    compact.flush()
+
+    reopened = CompactVectors(str(tmp_path / "vectors"), "int8", 16)
+    reopened.map(20)
+    assert reopened.shape == (20, 16)
+    assert np.array_equal(reopened[np.arange(10)], compact[np.arange(10)])
+
+
+def test_unknown_storage():
+    with pytest.raises(ValueError):
+        CompactVectors("unused", "int4", 16)
@@ -0,0 +1,115 @@
+import json
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from question_cache import QuestionCache
+
+PDF_URL = "https://arxiv.org/pdf/1706.03762"
+TITLE = "Attention Is All You Need"
+
+
+def test_make_key_accepts_any_request_value():
+    keys = {QuestionCache.make_key("doc", "medium", "mixed", n, "") for n in (5, "five", None)}
+    assert len(keys) == 3
+
+
+def test_make_key_ignores_case_of_options():
+    assert (QuestionCache.make_key("doc", "Medium", "MIXED", 5, "")
+            == QuestionCache.make_key("doc", "medium", "mixed", 5, ""))
+
+
+class FakeCompletions:
+    """Stands in for the chat completion client, numbering each generated set"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        content = json.dumps({"questions": [{"question": f"set {self.calls}"}]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _no_network(*args, **kwargs):
+    pytest.fail("made a network call for a cached question set")
+
+
+@pytest.fixture
+def questions(chat, monkeypatch):
+    completions = FakeCompletions()
+    chat.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(chat, "_extract_text", lambda pdf_url: "Attention is all you need.")
+    monkeypatch.setattr(chat, "_validate_pdf", lambda url: True)
+    return completions
+
+
+def _generate(chat):
+    return chat.generate_practice_questions(PDF_URL, TITLE, num_questions=1)
+
+
+def _key(chat):
+    doc_id = chat._generate_doc_id(PDF_URL, TITLE)
+    return chat.question_cache.make_key(doc_id, "medium", "mixed", 1, "")
+
+
+def _settle(chat):
+    """Wait for the background top-ups to finish"""
+    chat._background.shutdown(wait=True)
+
+
+def test_cached_set_is_served_before_any_generation(chat, questions, monkeypatch):
+    _generate(chat)
+    _settle(chat)
+    calls = questions.calls
+    for name in ("_validate_pdf", "_paper_exists", "_extract_text", "_generate_questions"):
+        monkeypatch.setattr(chat, name, _no_network)
+
+    served = _generate(chat)
+    assert served["metadata"]["cached"] is True
+    assert questions.calls == calls
+
+
+def test_top_up_stops_at_variants(chat, questions):
+    chat.question_cache = QuestionCache(chat.question_cache.db_path, variants=2)
+    first = _generate(chat)
+    _settle(chat)
+    assert first["questions"] == [{"question": "set 1"}]
+    assert questions.calls == 2
+    assert chat.question_cache.count(_key(chat)) == 2
+
+    # A full pool is served without scheduling more generations
+    _generate(chat)
+    _generate(chat)
+    assert questions.calls == 2
+
+
+def test_variants_rotate_by_served_count(chat, questions):
+    _generate(chat)
+    _settle(chat)
+    assert questions.calls == chat.question_cache.variants == 3
+
+    # The generated set was served once, so the two top-ups come next, then each set once more
+    served = [_generate(chat)["questions"][0]["question"] for _ in range(5)]
+    assert set(served[:2]) == {"set 2", "set 3"}
+    assert set(served[2:5]) == {"set 1", "set 2", "set 3"}
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = QuestionCache(str(tmp_path / "questions.db"), ttl=60)
+    key = QuestionCache.make_key("doc", "medium", "mixed", 5, "")
+    cache.put(key, "doc", {}, {"questions": ["old"]})
+    with sqlite3.connect(cache.db_path) as conn:
+        conn.execute("UPDATE question_sets SET created_at = ?", (time.time() - 61,))
+
+    assert cache.get(key) is None
+    assert cache.count(key) == 0
+    assert cache.latest_for_doc("doc") is None
+
+    # Expired sets are purged on the next write
+    cache.put(key, "doc", {}, {"questions": ["new"]})
+    assert cache.get(key) == {"questions": ["new"]}
+    with sqlite3.connect(cache.db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM question_sets").fetchone()[0] == 1
@@ -0,0 +1,18 @@
+import pytest
+
+from request_fields import flag
+
+
+@pytest.mark.parametrize("value", [False, "false", "False", "0", 0, "no", "off"])
+def test_false_spellings(value):
+    assert flag({"use_cache": value}, "use_cache") is False
+
+
+@pytest.mark.parametrize("value", [True, "true", "1", 1, "yes"])
+def test_true_spellings(value):
+    assert flag({"use_cache": value}, "use_cache") is True
+
+
+def test_missing_or_null_uses_default():
+    assert flag({}, "use_cache") is True
+    assert flag({"use_cache": None}, "use_cache", default=False) is False
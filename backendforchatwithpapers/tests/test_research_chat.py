@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def assistant(tmp_path, monkeypatch, fake_index):
+    pytest.importorskip("openai")
+    pytest.importorskip("azure.ai.formrecognizer")
+    pytest.importorskip("dotenv")
+    import research_chat
+
+    monkeypatch.setenv("EMBEDDING_STORE_PATH", str(tmp_path / "embeddings.db"))
+    monkeypatch.setenv("TEXT_STORE_PATH", str(tmp_path / "text.db"))
+    monkeypatch.setattr(research_chat, "get_vector_backend", fake_index)
+    monkeypatch.setattr(research_chat, "DocumentAnalysisClient", lambda **kwargs: None)
+    monkeypatch.setattr(research_chat, "AzureKeyCredential", lambda key: None)
+    monkeypatch.setattr(research_chat, "AzureOpenAI", lambda **kwargs: None)
+    return research_chat.ResearchPaperAssistant()
+
+
+def test_passages_are_packed_by_search_score(assistant, monkeypatch):
+    prompts = []
+
+    def create(messages, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Answer."))])
+
+    assistant.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(assistant, "_get_text_embedding", lambda text: [1.0, 0.0])
+    # FakeIndex returns hits in chunk order, so only the score can put chunk 1 first
+    assistant.index.documents = {
+        "doc": {"id": "doc", "doc_id": "doc", "title": "A Paper", "chunk_index": 0,
+                "content": "Related work.", "@search.score": 0.2},
+        "doc_1": {"id": "doc_1", "doc_id": "doc", "title": "A Paper", "chunk_index": 1,
+                  "content": "The main result.", "@search.score": 3.1},
+    }
+
+    assert assistant.ask_question("What is the main result?", "doc") == "Answer."
+    assert "[Passage 1]: The main result.\n[Passage 2]: Related work." in prompts[0]
@@ -0,0 +1,102 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import single_flight
+from single_flight import SingleFlight, file_lock
+
+
+def _in_flight(flight, key, fn, callers):
+    """Run callers concurrent do() calls, the others arriving while the first is still running"""
+    started, release = threading.Event(), threading.Event()
+    results, errors = [], []
+
+    def leader_fn():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    def call(target):
+        try:
+            results.append(flight.do(key, target))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call, args=(leader_fn,))]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=call, args=(lambda: pytest.fail("ran a coalesced call"),))
+                for _ in range(callers - 1)]
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_concurrent_calls_for_a_key_run_once():
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"summary": "shared"}
+
+    results, errors = _in_flight(SingleFlight(), "doc", build, callers=8)
+    assert calls == [1]
+    assert errors == []
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    inner = []
+    assert flight.do("a", lambda: inner.append(flight.do("b", lambda: "b")) or "a") == "a"
+    assert inner == ["b"]
+
+
+def test_exception_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("completion failed")
+
+    results, errors = _in_flight(flight, "doc", fail, callers=5)
+    assert results == []
+    assert len(errors) == 5
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+    # The failure is forgotten once the call finishes, so the next caller retries
+    assert flight.do("doc", lambda: "rebuilt") == "rebuilt"
+
+
+def _hold_lock(path, log_path, name):
+    with file_lock(path):
+        with open(log_path, "a") as log:
+            log.write(f"{name} start\n")
+        time.sleep(0.2)
+        with open(log_path, "a") as log:
+            log.write(f"{name} end\n")
+
+
+@pytest.mark.skipif(single_flight.fcntl is None, reason="file locks need fcntl")
+def test_file_lock_serialises_processes(tmp_path):
+    path, log_path = str(tmp_path / "locks" / "doc.lock"), tmp_path / "log.txt"
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_hold_lock, args=(path, str(log_path), name)) for name in "ab"]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+
+    lines = log_path.read_text().splitlines()
+    assert len(lines) == 4
+    # Whichever process got the lock first finished before the other started
+    assert lines[0].split()[0] == lines[1].split()[0]
+    assert lines[2].split()[0] == lines[3].split()[0]
+    assert [line.split()[1] for line in lines] == ["start", "end", "start", "end"]
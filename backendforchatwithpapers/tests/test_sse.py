@@ -0,0 +1,181 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from sse import format_sse
+
+PDF_URL = "https://example.org/paper.pdf"
+TITLE = "A Paper"
+VECTOR = [0.6, 0.8, 0.0]
+BODY = {"pdf_url": PDF_URL, "title": TITLE, "question": "What is new?", "use_cache": False}
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _completion(fail_after=None):
+    """Streamed completion deltas, with a content-filter chunk first; optionally dies mid-stream"""
+    yield SimpleNamespace(choices=[])
+    for i, text in enumerate(["Atten", "tion ", "works."]):
+        if i == fail_after:
+            raise ConnectionError("stream reset")
+        yield _chunk(text)
+
+
+def _parse(body):
+    """The (event, data) pairs of a Server-Sent Events body"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def _index_paper(chat):
+    doc_id = chat._generate_doc_id(PDF_URL, TITLE)
+    chat.index.documents[doc_id] = {
+        "id": doc_id, "doc_id": doc_id, "chunk_index": 0, "chunk_offset": 0,
+        "content": "Attention is all you need.", "@search.score": 2.5
+    }
+    return doc_id
+
+
+def test_format_sse():
+    assert format_sse("token", {"text": "hi"}) == 'event: token\ndata: {"text": "hi"}\n\n'
+
+
+@pytest.fixture
+def flask_client(chat, monkeypatch, tmp_path):
+    pytest.importorskip("flask")
+    pytest.importorskip("flask_cors")
+    # app.py logs to api.log in the working directory
+    monkeypatch.chdir(tmp_path)
+    import app
+
+    monkeypatch.setattr(app, "chat_service", chat)
+    monkeypatch.setattr(chat, "_get_embedding", lambda text: VECTOR)
+    chat.completion = _completion
+    chat.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **kwargs: chat.completion())))
+    _index_paper(chat)
+    return app.app.test_client()
+
+
+def test_flask_stream_sends_sources_then_tokens_then_done(flask_client, chat):
+    response = flask_client.post("/api/chat/stream", json=BODY)
+    assert response.mimetype == "text/event-stream"
+
+    events = _parse(response.get_data(as_text=True))
+    assert [event for event, _ in events] == ["sources", "token", "token", "token", "done"]
+    sources = events[0][1]
+    assert (sources["doc_id"], sources["sources"][0]["score"]) == (chat._generate_doc_id(PDF_URL, TITLE), 2.5)
+    assert "".join(data["text"] for event, data in events if event == "token") == "Attention works."
+    assert events[-1][1]["answer"] == "Attention works."
+
+
+def test_flask_stream_ends_with_error_when_completion_fails(flask_client, chat):
+    chat.completion = lambda: _completion(fail_after=1)
+    events = _parse(flask_client.post("/api/chat/stream", json=BODY).get_data(as_text=True))
+
+    assert [event for event, _ in events] == ["sources", "token", "error"]
+    assert "stream reset" in events[-1][1]["error"]
+
+
+def test_flask_stream_reports_service_crash_as_error_event(flask_client, chat, monkeypatch):
+    def crash(**kwargs):
+        yield {"event": "token", "data": {"text": "Atten"}}
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(chat, "stream_chat_with_paper", crash)
+    events = _parse(flask_client.post("/api/chat/stream", json=BODY).get_data(as_text=True))
+    assert events == [("token", {"text": "Atten"}), ("error", {"error": "Internal server error"})]
+
+
+def test_flask_stream_reads_use_cache_strings(flask_client, chat, monkeypatch):
+    seen = []
+
+    def record(**kwargs):
+        seen.append(kwargs["use_cache"])
+        yield {"event": "token", "data": {"text": "ok"}}
+
+    monkeypatch.setattr(chat, "stream_chat_with_paper", record)
+    for value in ("false", "true"):
+        flask_client.post("/api/chat/stream", json={**BODY, "use_cache": value}).get_data()
+    assert seen == [False, True]
+
+
+def test_flask_stream_rejects_missing_fields(flask_client):
+    response = flask_client.post("/api/chat/stream", json={"pdf_url": PDF_URL})
+    assert response.status_code == 400
+
+
+class AsyncStream:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def quart_client(chat, monkeypatch, tmp_path):
+    pytest.importorskip("quart")
+    pytest.importorskip("quart_cors")
+    pytest.importorskip("httpx")
+    pytest.importorskip("azure.search.documents.aio")
+    monkeypatch.chdir(tmp_path)
+    import asgi_app
+    import async_chat_with_paper
+
+    monkeypatch.setattr(async_chat_with_paper, "AsyncAzureOpenAI", lambda **kwargs: None)
+    service = async_chat_with_paper.AsyncChatWithPaper(sync_service=chat)
+
+    async def embed(text):
+        return VECTOR
+
+    async def create(**kwargs):
+        return AsyncStream(service.completion())
+
+    service._get_embedding = embed
+    service.completion = _completion
+    service.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    _index_paper(chat)
+    monkeypatch.setattr(asgi_app, "chat_service", service)
+    yield service, asgi_app.app.test_client()
+    asyncio.run(service.http.aclose())
+
+
+def _quart_events(client):
+    async def post():
+        response = await client.post("/api/chat/stream", json=BODY)
+        assert response.mimetype == "text/event-stream"
+        return await response.get_data(as_text=True)
+
+    return _parse(asyncio.run(post()))
+
+
+def test_quart_stream_sends_sources_then_tokens_then_done(quart_client):
+    _, client = quart_client
+    events = _quart_events(client)
+
+    assert [event for event, _ in events] == ["sources", "token", "token", "token", "done"]
+    assert events[0][1]["sources"][0]["score"] == 2.5
+    assert events[-1][1]["answer"] == "Attention works."
+
+
+def test_quart_stream_ends_with_error_when_completion_fails(quart_client):
+    service, client = quart_client
+    service.completion = lambda: _completion(fail_after=2)
+    events = _quart_events(client)
+
+    assert [event for event, _ in events] == ["sources", "token", "token", "error"]
+    assert "stream reset" in events[-1][1]["error"]
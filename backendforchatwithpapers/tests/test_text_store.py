@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+from text_store import ExtractedTextStore
+
+PDF_URL = "https://example.org/scanned.pdf"
+
+
+def _result(*contents):
+    paragraphs = [SimpleNamespace(content=content, bounding_regions=[], role=None, spans=[])
+                  for content in contents]
+    return SimpleNamespace(paragraphs=paragraphs, pages=[], tables=[])
+
+
+def test_document_is_analyzed_once(tmp_path):
+    store = ExtractedTextStore(str(tmp_path / "text.db"))
+    calls = []
+
+    def analyze(url):
+        calls.append(url)
+        return _result("Abstract.", "Body.")
+
+    assert store.get_or_extract(PDF_URL, analyze).text == "Abstract. Body."
+    assert ExtractedTextStore(store.db_path).get_or_extract(PDF_URL, analyze).text == "Abstract. Body."
+    assert calls == [PDF_URL]
+
+
+def test_empty_extraction_is_stored(tmp_path):
+    store = ExtractedTextStore(str(tmp_path / "text.db"))
+    calls = []
+
+    def analyze(url):
+        calls.append(url)
+        return _result()
+
+    assert len(store.get_or_extract(PDF_URL, analyze)) == 0
+    document = ExtractedTextStore(store.db_path).get_or_extract(PDF_URL, analyze)
+    assert (len(document), document.text) == (0, "")
+    assert calls == [PDF_URL]
@@ -0,0 +1,71 @@
+import pytest
+
+import ttl_cache
+from ttl_cache import TTLCache
+
+BAD_URL = "https://example.org/not-a-paper.pdf"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(ttl=60, negative_ttl=5)
+    cache.set("good", True)
+    cache.set("bad", False)
+
+    clock.now += 6
+    assert cache.get("good") == (True, True)
+    assert cache.get("bad") == (False, None)
+    clock.now += 60
+    assert cache.get("good") == (False, None)
+
+
+def test_least_recently_used_entry_is_dropped(clock):
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert [cache.get(key)[0] for key in "abc"] == [True, False, True]
+
+
+@pytest.fixture
+def negative_ttl(monkeypatch):
+    monkeypatch.setenv("PDF_VALIDATION_NEGATIVE_TTL", "30")
+
+
+def test_rejected_url_is_rechecked_after_negative_ttl(negative_ttl, chat, clock, monkeypatch):
+    checks = []
+    monkeypatch.setattr(chat, "_check_pdf", lambda url: checks.append(url) or False)
+    assert chat.validation_cache.negative_ttl == 30
+
+    assert chat._validate_pdf(BAD_URL) is False
+    clock.now += 29
+    assert chat._validate_pdf(BAD_URL) is False
+    assert len(checks) == 1
+
+    clock.now += 2
+    assert chat._validate_pdf(BAD_URL) is False
+    assert len(checks) == 2
+
+
+def test_validation_errors_are_not_cached(chat, monkeypatch):
+    def unreachable(url):
+        raise TimeoutError("host timed out")
+
+    monkeypatch.setattr(chat, "_check_pdf", unreachable)
+    assert chat._validate_pdf(BAD_URL) is False
+    assert chat.validation_cache.get(BAD_URL) == (False, None)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from single_flight import SingleFlight
+
+TEXT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extracted_text.db')
+
+
+# Paragraph roles Document Intelligence's layout model reports, plus "table"
+# for paragraphs inside a table. Index 0 is body text.
+ROLES = (None, "title", "sectionHeading", "footnote", "pageHeader", "pageFooter", "pageNumber", "table")
+HEADING_ROLES = {"title", "sectionHeading"}
+# Running page furniture, left out of chunks
+BOILERPLATE_ROLES = {"pageHeader", "pageFooter", "pageNumber"}
+
+
+class StructuredDocument:
+    """
+    Extracted paper text with its paragraph structure, array-backed.
+
+    text is the paragraphs joined with single spaces (what
+    document_text() has always returned, so stored chunk offsets stay
+    valid). Paragraph i is text[starts[i]:ends[i]], with a role code
+    (index into ROLES) and a page number (0 if unknown) in parallel
+    typed arrays: a few bytes per paragraph instead of a dict each.
+    Offsets map back to pages and sections by binary search.
+    """
+
+    def __init__(self, text: str, starts: array, ends: array, roles: array, pages: array,
+                 page_layout: Optional[List[Dict]] = None, tables: Optional[List[Dict]] = None):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.roles = roles
+        self.pages = pages
+        self.page_layout = page_layout or []
+        self.tables = tables or []
+        self._headings: Optional[List[int]] = None
+
+    @classmethod
+    def from_paragraphs(cls, paragraphs: Iterable[Dict], page_layout: Optional[List[Dict]] = None,
+                        tables: Optional[List[Dict]] = None) -> "StructuredDocument":
+        """Build from {"content", "role", "page"} dicts"""
+        role_codes = {role: code for code, role in enumerate(ROLES)}
+        parts = []
+        starts, ends = array('l'), array('l')
+        roles, pages = array('b'), array('h')
+        position = 0
+        for paragraph in paragraphs:
+            if parts:
+                position += 1
+            content = paragraph["content"]
+            parts.append(content)
+            starts.append(position)
+            position += len(content)
+            ends.append(position)
+            roles.append(role_codes.get(paragraph.get("role"), 0))
+            pages.append(paragraph.get("page") or 0)
+        return cls(" ".join(parts), starts, ends, roles, pages, page_layout, tables)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def role(self, i: int) -> Optional[str]:
+        return ROLES[self.roles[i]]
+
+    def paragraphs(self, skip_roles: Optional[set] = None) -> Iterator[Dict]:
+        """Paragraph dicts one at a time, for the chunker"""
+        for i in range(len(self.starts)):
+            role = ROLES[self.roles[i]]
+            if skip_roles and role in skip_roles:
+                continue
+            yield {"content": self.text[self.starts[i]:self.ends[i]], "role": role,
+                   "page": self.pages[i] or None, "offset": self.starts[i]}
+
+    def excerpt(self, offset: int, length: int, skip_roles: Optional[set] = None) -> Tuple[str, int]:
+        """
+        The `length` characters of chunk content starting at text[offset],
+        leaving out skip_roles paragraphs the way iter_chunks does, and
+        the offset in text where they end.
+        """
+        parts, size, end = [], 0, offset
+        for i in range(self._paragraph_at(offset), len(self.starts)):
+            if size >= length:
+                break
+            if skip_roles and ROLES[self.roles[i]] in skip_roles:
+                continue
+            start = max(self.starts[i], offset)
+            if start >= self.ends[i]:
+                continue
+            separator = " " if parts else ""
+            end = min(self.ends[i], start + length - size - len(separator))
+            parts.append(separator + self.text[start:end])
+            size += len(separator) + end - start
+        return "".join(parts), end
+
+    def _paragraph_at(self, offset: int) -> int:
+        return max(0, bisect_right(self.starts, offset) - 1)
+
+    def pages_for(self, offset: int, length: int) -> List[int]:
+        """Pages the span text[offset:offset + length] lies on"""
+        if not len(self.starts):
+            return []
+        first = self._paragraph_at(offset)
+        last = self._paragraph_at(max(offset, offset + length - 1))
+        return sorted({page for page in self.pages[first:last + 1] if page})
+
+    def section_at(self, offset: int) -> Optional[str]:
+        """Heading of the section that text[offset] belongs to"""
+        if self._headings is None:
+            codes = {ROLES.index(role) for role in HEADING_ROLES}
+            self._headings = [i for i, code in enumerate(self.roles) if code in codes]
+        i = self._paragraph_at(offset)
+        position = bisect_right(self._headings, i) - 1
+        if position < 0:
+            return None
+        heading = self._headings[position]
+        return self.text[self.starts[heading]:self.ends[heading]]
+
+    def to_json(self) -> Dict:
+        # Offsets follow from the lengths, which are also shorter to write out
+        return {
+            "version": 2,
+            "text": self.text,
+            "lengths": [end - start for start, end in zip(self.starts, self.ends)],
+            "roles": self.roles.tolist(),
+            "pages": self.pages.tolist(),
+            "page_layout": self.page_layout,
+            "tables": self.tables
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "StructuredDocument":
+        if "paragraphs" in data:
+            # Stored before documents kept their structure
+            return cls.from_paragraphs(data["paragraphs"], data.get("pages"))
+        starts, ends = array('l'), array('l')
+        position = 0
+        for length in data["lengths"]:
+            starts.append(position)
+            ends.append(position + length)
+            position += length + 1
+        return cls(data["text"], starts, ends, array('b', data["roles"]), array('h', data["pages"]),
+                   data.get("page_layout"), data.get("tables"))
+
+
+def _span_offset(element) -> Optional[int]:
+    spans = getattr(element, "spans", None) or []
+    return spans[0].offset if spans else None
+
+
+def document_from_result(result) -> StructuredDocument:
+    """Reduce a Document Intelligence AnalyzeResult to a StructuredDocument"""
+    # Paragraphs inside a table get the "table" role, found by their span in the result content
+    table_spans = sorted(
+        (span.offset, span.offset + span.length)
+        for table in getattr(result, "tables", None) or []
+        for span in table.spans or []
+    )
+    table_starts = [start for start, _ in table_spans]
+
+    def in_table(offset: Optional[int]) -> bool:
+        if offset is None or not table_spans:
+            return False
+        i = bisect_right(table_starts, offset) - 1
+        return i >= 0 and offset < table_spans[i][1]
+
+    def paragraphs():
+        for paragraph in result.paragraphs or []:
+            regions = paragraph.bounding_regions or []
+            role = getattr(paragraph, "role", None)
+            if role is None and in_table(_span_offset(paragraph)):
+                role = "table"
+            yield {
+                "content": paragraph.content,
+                "role": role,
+                "page": regions[0].page_number if regions else None
+            }
+
+    page_layout = [{
+        "page_number": page.page_number,
+        "width": page.width,
+        "height": page.height,
+        "unit": page.unit
+    } for page in result.pages or []]
+    tables = [{
+        "page": table.bounding_regions[0].page_number if table.bounding_regions else None,
+        "rows": table.row_count,
+        "columns": table.column_count
+    } for table in getattr(result, "tables", None) or []]
+    return StructuredDocument.from_paragraphs(paragraphs(), page_layout, tables)
+
+
+class ExtractedTextStore:
+    """
+    Persistent store of text extracted from PDFs, keyed by sha256(pdf_url).
+
+    Document Intelligence takes seconds per paper, so each PDF is
+    analyzed once and its StructuredDocument is kept in SQLite
+    (WAL, shared by every worker process). Concurrent misses for the
+    same URL within a process share one extraction. A PDF with no text
+    (scanned, or empty) is stored as an empty document, so it is not
+    analyzed again either.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("TEXT_STORE_PATH", TEXT_STORE_PATH)
+        self._extractions = SingleFlight()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    url_hash TEXT PRIMARY KEY,
+                    pdf_url TEXT NOT NULL,
+                    document TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key_for(pdf_url: str) -> str:
+        return hashlib.sha256(pdf_url.encode('utf-8')).hexdigest()
+
+    def get(self, pdf_url: str) -> Optional[StructuredDocument]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT document FROM documents WHERE url_hash = ?", (self.key_for(pdf_url),)
+            ).fetchone()
+        return StructuredDocument.from_json(json.loads(row[0])) if row else None
+
+    def put(self, pdf_url: str, document: StructuredDocument):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (url_hash, pdf_url, document, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self.key_for(pdf_url), pdf_url, json.dumps(document.to_json()), time.time())
+            )
+
+    def get_or_extract(self, pdf_url: str, analyze: Callable[[str], object]) -> StructuredDocument:
+        """Return the stored document, running analyze(pdf_url) only on a cold miss"""
+        document = self.get(pdf_url)
+        if document is not None:
+            return document
+
+        def extract():
+            # A caller that finished just before this flight started may have stored it
+            stored = self.get(pdf_url)
+            if stored is not None:
+                return stored
+            start = time.perf_counter()
+            extracted = document_from_result(analyze(pdf_url))
+            print(f"Extracted {len(extracted)} paragraphs from {pdf_url} "
+                  f"in {time.perf_counter() - start:.1f}s")
+            self.put(pdf_url, extracted)
+            return extracted
+
+        return self._extractions.do(self.key_for(pdf_url), extract)
+
+
+def document_text(document: StructuredDocument) -> str:
+    return document.text
@@ -0,0 +1,89 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents import SearchClient
+
+INDEX_NAME = "paper-videos"
+
+
+class VectorBackend(ABC):
+    """
+    Storage and hybrid search for indexed paper chunks.
+
+    Documents are flat dicts with an "id" key, a "content" text field
+    and a "content_vector" embedding; other fields are stored as given.
+    search() combines keyword and vector relevance and returns dicts of
+    the selected fields plus "@search.score", like Azure Search does.
+    """
+
+    @abstractmethod
+    def upload(self, documents: List[Dict]) -> List[str]:
+        """Insert or replace documents; returns the ids that failed"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict]:
+        """Fetch one document by id, or None if it does not exist"""
+
+    @abstractmethod
+    def search(self, search_text: str, vector: List[float], doc_id: Optional[str] = None,
+               top: int = 3, select: Optional[List[str]] = None) -> List[Dict]:
+        """Top hits for the text and vector, restricted to one paper when doc_id is given"""
+
+
+class AzureSearchBackend(VectorBackend):
+    """The hosted Azure AI Search index"""
+
+    def __init__(self, search_client: Optional[SearchClient] = None):
+        self.search_client = search_client or SearchClient(
+            endpoint=os.getenv("AZURE_SEARCH_ENDPOINT"),
+            index_name=INDEX_NAME,
+            credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_KEY")))
+
+    def upload(self, documents: List[Dict]) -> List[str]:
+        results = self.search_client.upload_documents(documents=documents)
+        return [result.key for result in results if not result.succeeded]
+
+    def get(self, key: str) -> Optional[Dict]:
+        try:
+            return self.search_client.get_document(key=key)
+        except Exception:
+            return None
+
+    def search(self, search_text: str, vector: List[float], doc_id: Optional[str] = None,
+               top: int = 3, select: Optional[List[str]] = None) -> List[Dict]:
+        results = self.search_client.search(
+            search_text=search_text,
+            vector_queries=[{
+                "fields": "content_vector",
+                "kind": "vector",
+                "vector": vector,
+                "k": top
+            }],
+            filter=f"doc_id eq '{doc_id}'" if doc_id else None,
+            select=select,
+            top=top
+        )
+        return [dict(hit) for hit in results]
+
+
+_backends: Dict[str, VectorBackend] = {}
+
+
+def get_vector_backend(name: Optional[str] = None) -> VectorBackend:
+    """
+    Process-wide backend chosen by VECTOR_BACKEND: "azure" (default) or
+    "local", an in-process index under LOCAL_INDEX_DIR.
+    """
+    name = (name or os.getenv("VECTOR_BACKEND", "azure")).lower()
+    if name not in _backends:
+        if name == "azure":
+            _backends[name] = AzureSearchBackend()
+        elif name == "local":
+            # NumPy is only needed by deployments that serve the index themselves
+            from local_vector_store import LocalVectorStore
+            _backends[name] = LocalVectorStore()
+        else:
+            raise ValueError(f"Unknown VECTOR_BACKEND: {name}")
+    return _backends[name]
@@ -1,6 +1,6 @@
 import json
 from manim import *
-from manim import config
+from manim import config, tempconfig
 from manim_voiceover import VoiceoverScene
 from code_video import CodeScene, AutoScaled, SequenceDiagram, TextBox, Connection
 from manim_voiceover.services.azure import AzureService
@@ -10,7 +10,7 @@ from manim.mobject.types.image_mobject import ImageMobject
 import tempfile
 import os
 import shutil  # For directory removal
-import requests
+from http_client import get_session
 from PIL import Image
 import io
 from xml.etree import ElementTree
@@ -18,6 +18,19 @@ import cairosvg
 import re
 import json
 import concurrent.futures
+import multiprocessing
+import subprocess
+from render_cache import RenderCache
+from speech_cache import CachedSpeechService, FakeSpeechService
+from image_cache import ImageCache
+
+DEFAULT_BACKGROUND = "./examples/resources/blackboard.jpg"
+# Zoom-out a timeline scene leaves on the camera for every scene after it
+TIMELINE_CAMERA_SCALE = 1.2
+# Voiceover synthesis; part of every cached segment's key. TTS_SERVICE=fake renders offline
+TTS_SERVICE = os.getenv("TTS_SERVICE", "azure")
+TTS_VOICE = os.getenv("TTS_VOICE", "en-US-SteffanNeural")
+TTS_STYLE = os.getenv("TTS_STYLE", "newscast")
 
 def remove_pango_markup(text):
     """Remove Pango Markup tags from a string."""
@@ -52,12 +65,18 @@ def clean_json(json_data, scene_types_to_clean=None):
     return json_data
 
 class DirectVideoGenerator(CodeScene, VoiceoverScene):
-    def __init__(self, json_content):
+    def __init__(self, json_content, segment_index=None):
         super().__init__()
         self.all_content = json_content if isinstance(json_content, dict) else json.loads(json_content)
+        # Render only this entry of scenes (a per-scene worker render); None renders them all
+        self.segment_index = segment_index
         self.headers = {
             'User-Agent': 'DocVideoMaker/1.0 (https://example.com; contact@example.com)'
         }
+        self.http = get_session()
+        self.image_cache = ImageCache()
+        # (kind, query, num_images) -> resolved local image paths, filled by prefetch_images
+        self.prefetched_images = {}
 
         
     def create_title_scene(self, title_data):
@@ -267,15 +286,59 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
             print(f"Error loading background image: {e}")
     
 
-    def get_wikipedia_images(self, article_title, num_images=2, save_dir="./downloaded_images"):
+    def collect_image_lookups(self, scenes):
+        """Every image lookup the given scenes will make, as (kind, query, num_images)"""
+        lookups = []
+        for scene in scenes:
+            scene_type = scene.get('type')
+            if scene_type == 'image_text' and scene.get('wikipedia_topic'):
+                lookups.append(('wikipedia', scene['wikipedia_topic'], scene.get('num_images', 2)))
+            elif scene_type == 'multi_image_text':
+                # All keywords are resolved up front; the scene still uses the first that has images
+                for keyword in scene.get('wikipedia_topics', []):
+                    lookups.append(('wikipedia', keyword, scene.get('num_images', 2)))
+            elif scene_type == 'timeline':
+                for event in scene.get('events', []):
+                    if event.get('image_description'):
+                        lookups.append(('wikimedia', event['image_description'], 1))
+        return list(dict.fromkeys(lookups))
+
+    def prefetch_images(self, scenes):
+        """Resolve every image the scenes need concurrently, so rendering only reads local files"""
+        lookups = self.collect_image_lookups(scenes)
+        if not lookups:
+            return
+
+        def resolve(lookup):
+            kind, query, num_images = lookup
+            try:
+                if kind == 'wikimedia':
+                    return self.get_wikimedia_image(query)
+                return self.get_wikipedia_images(query, num_images)
+            except Exception as e:
+                print(f"Error prefetching images for {query}: {e}")
+                return None if kind == 'wikimedia' else []
+
+        max_workers = min(int(os.getenv("IMAGE_PREFETCH_WORKERS", "8")), len(lookups))
+        print(f"Prefetching {len(lookups)} image lookups with {max_workers} workers")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(resolve, lookups))
+        
+        for lookup, result in zip(lookups, results):
+            self.prefetched_images[lookup] = result
+
+    def get_wikipedia_images(self, article_title, num_images=2):
             """Fetch images from Wikipedia article, including SVGs converted to PNG."""
-            import concurrent.futures
-            import os
-            import requests
-            from PIL import Image
-            import cairosvg
+            lookup = ('wikipedia', article_title, num_images)
+            if lookup in self.prefetched_images:
+                return self.prefetched_images[lookup]
 
-            os.makedirs(save_dir, exist_ok=True)
+            cached = self.image_cache.get_lookup('wikipedia', article_title, num_images)
+            if cached is not None:
+                image_paths = [self.image_cache.image_path(img_url) for img_url in cached['urls']]
+                if all(image_paths):
+                    print(f"Image cache hit for topic: {article_title}")
+                    return image_paths
 
             url = "https://en.wikipedia.org/w/api.php"
             params = {
@@ -286,12 +349,13 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
                 "imlimit": 50  # Increased limit
             }
 
-            response = requests.get(url, params=params, headers=self.headers)
+            response = self.http.get(url, params=params, headers=self.headers)
             data = response.json()
             print("Image data:", data)
 
             pages = data.get("query", {}).get("pages", {})
             page_id = list(pages.keys())[0] if pages else None
+            resolved_title = article_title
 
             if not page_id or "missing" in pages[page_id]:
                 print(f"No article found for topic: {article_title}. Searching for related articles...")
@@ -303,26 +367,31 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
                     "srsearch": article_title,
                     "srlimit": 1
                 }
-                search_response = requests.get(search_url, params=search_params, headers=self.headers)
+                search_response = self.http.get(search_url, params=search_params, headers=self.headers)
                 search_data = search_response.json()
                 print("Search response:", search_data)
 
-                if "query" in search_data and "search" in search_data["query"]:
-                    article_title = search_data["query"]["search"][0]["title"]
-                    print(f"Using related article: {article_title}")
+                if search_data.get("query", {}).get("search"):
+                    resolved_title = search_data["query"]["search"][0]["title"]
+                    print(f"Using related article: {resolved_title}")
                 else:
                     print(f"No related articles found for topic: {article_title}")
+                    # Only a real empty result is remembered, not an API error
+                    if "query" in search_data:
+                        self.image_cache.put_lookup('wikipedia', article_title, None, [], num_images)
                     return []
 
-            params["titles"] = article_title
-            response = requests.get(url, params=params, headers=self.headers)
-            data = response.json()
-            print("Updated image data:", data)
+                params["titles"] = resolved_title
+                response = self.http.get(url, params=params, headers=self.headers)
+                data = response.json()
+                print("Updated image data:", data)
+
+                pages = data.get("query", {}).get("pages", {})
+                page_id = list(pages.keys())[0] if pages else None
 
-            pages = data.get("query", {}).get("pages", {})
-            page_id = list(pages.keys())[0] if pages else None
             if not page_id or "images" not in pages[page_id]:
-                print(f"No images found for the article: {article_title}")
+                print(f"No images found for the article: {resolved_title}")
+                self.image_cache.put_lookup('wikipedia', article_title, resolved_title, [], num_images)
                 return []
 
             # Include SVGs in the filtered image titles
@@ -333,7 +402,6 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
             print("Filtered image titles:", image_titles)
 
             image_titles = image_titles[:num_images]
-            image_paths = []
 
             def download_single_image(title):
                 img_params = {
@@ -344,7 +412,7 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
                     "iiprop": "url"
                 }
 
-                img_response = requests.get(url, params=img_params, headers=self.headers)
+                img_response = self.http.get(url, params=img_params, headers=self.headers)
                 img_data = img_response.json()
                 print("Image URL data:", img_data)
 
@@ -355,57 +423,21 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
                     print("Downloading image from:", img_url)
 
                     try:
-                        img_response = requests.get(img_url, headers=self.headers)
-                        img_response.raise_for_status()
-
-                        file_name = os.path.basename(img_url)
-                        save_path = os.path.join(save_dir, file_name)
-                        with open(save_path, "wb") as img_file:
-                            img_file.write(img_response.content)
-
-                        # Convert SVG to PNG if needed
-                        if file_name.lower().endswith(".svg"):
-                            try:
-                                png_path = save_path.rsplit('.', 1)[0] + '.png'
-                                cairosvg.svg2png(url=save_path, write_to=png_path)
-                                print(f"Converted SVG to PNG: {png_path}")
-                                
-                                # Remove the original SVG file
-                                os.unlink(save_path)
-                                
-                                # Verify the PNG
-                                with Image.open(png_path) as img:
-                                    img.verify()
-                                
-                                return png_path
-                            except Exception as e:
-                                print(f"Error converting SVG to PNG: {e}")
-                                return None
-
-                        # For non-SVG images, use existing verification
-                        else:
-                            try:
-                                with Image.open(save_path) as img:
-                                    img.verify()
-                                return save_path
-                            except Exception as e:
-                                print(f"Invalid image file: {save_path}, error: {e}")
-                                os.unlink(save_path)
-                                return None
-
+                        return img_url, self.image_cache.download(img_url, self.headers)
                     except Exception as e:
                         print(f"Error downloading image: {e}")
-                        return None
+                return None, None
 
-            # Use ThreadPoolExecutor for parallel downloads
+            if not image_titles:
+                return []
+
+            # Use ThreadPoolExecutor for parallel downloads, keeping the article's image order
             with concurrent.futures.ThreadPoolExecutor(max_workers=min(5, len(image_titles))) as executor:
-                # Map the download function to image titles
-                future_to_title = {executor.submit(download_single_image, title): title for title in image_titles}
-                
-                for future in concurrent.futures.as_completed(future_to_title):
-                    result = future.result()
-                    if result:
-                        image_paths.append(result)
+                results = list(executor.map(download_single_image, image_titles))
+
+            image_urls = [img_url for img_url, path in results if path]
+            image_paths = [path for _, path in results if path]
+            self.image_cache.put_lookup('wikipedia', article_title, resolved_title, image_urls, num_images)
 
             print("Downloaded image paths:", image_paths)
             return image_paths
@@ -797,7 +829,7 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
         self.wait(0.5)
 
         # Set up camera for MovingCameraScene functionality
-        self.camera.frame.scale(1.2)
+        self.camera.frame.scale(TIMELINE_CAMERA_SCALE)
 
         for i in range(num_events):
             with self.voiceover(text=events[i][2]) as tracker:
@@ -842,11 +874,23 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
         return img_mob.scale(scale_factor * 0.9)
     
 
-    def get_wikimedia_image(self, search_term, save_dir="./downloaded_images"):
+    def get_wikimedia_image(self, search_term):
         """Fetch image from Wikimedia"""
+        lookup = ('wikimedia', search_term, 1)
+        if lookup in self.prefetched_images:
+            return self.prefetched_images[lookup]
+
         print(f"Searching Wikimedia for: {search_term}")
         
-        os.makedirs(save_dir, exist_ok=True)
+        cached = self.image_cache.get_lookup('wikimedia', search_term, 1)
+        if cached is not None:
+            if not cached['urls']:
+                print(f"No image found for: {search_term} (cached)")
+                return None
+            image_path = self.image_cache.image_path(cached['urls'][0])
+            if image_path:
+                print(f"Image cache hit for: {search_term}")
+                return image_path
 
         try:
             search_params = {
@@ -856,7 +900,7 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
                 "srsearch": search_term,
                 "srlimit": 3
             }
-            response = requests.get(
+            response = self.http.get(
                 "https://en.wikipedia.org/w/api.php",
                 params=search_params,
                 headers=self.headers
@@ -864,6 +908,7 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
             data = response.json()
             print(f"Search response: {data}")
 
+            article_title = None
             if "query" in data and data["query"]["search"]:
                 article_title = data["query"]["search"][0]["title"]
                 print(f"Found article: {article_title}")
@@ -876,7 +921,7 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
                     "prop": "images",
                     "imlimit": 10
                 }
-                img_response = requests.get(
+                img_response = self.http.get(
                     "https://en.wikipedia.org/w/api.php",
                     params=img_params,
                     headers=self.headers
@@ -915,7 +960,7 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
                             "prop": "imageinfo",
                             "iiprop": "url"
                         }
-                        img_info_response = requests.get(
+                        img_info_response = self.http.get(
                             "https://en.wikipedia.org/w/api.php",
                             params=img_info_params,
                             headers=self.headers
@@ -931,48 +976,20 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
                             print(f"Found image URL: {img_url}")
                             
                             try:
-                                img_response = requests.get(img_url, headers=self.headers)
-                                img_response.raise_for_status()
-                                
-                                if "image" not in img_response.headers.get("Content-Type", ""):
-                                    print(f"Invalid content type for URL: {img_url}")
-                                    return None
-                                
-                                file_name = os.path.basename(img_url)
-                                save_path = os.path.join(save_dir, file_name)
-                                with open(save_path, "wb") as img_file:
-                                    img_file.write(img_response.content)
-                                
-                                # Special handling for SVG files
-                                if file_name.lower().endswith(".svg"):
-                                    try:
-                                        import cairosvg
-                                        png_path = save_path.rsplit('.', 1)[0] + '.png'
-                                        cairosvg.svg2png(url=save_path, write_to=png_path)
-                                        print(f"Converted SVG to PNG: {png_path}")
-                                        
-                                        # Remove the original SVG file
-                                        os.unlink(save_path)
-                                        save_path = png_path
-                                    except Exception as svg_err:
-                                        print(f"Error converting SVG: {svg_err}")
-                                        return None
-                                
-                                try:
-                                    with Image.open(save_path) as img:
-                                        img.verify()
-                                    print(f"Image saved and validated: {save_path}")
-                                    return save_path
-                                except Exception as e:
-                                    print(f"Invalid image file: {save_path}, error: {e}")
-                                    os.unlink(save_path)
-                                    return None
-                            
+                                save_path = self.image_cache.download(img_url, self.headers, require_image_type=True)
                             except Exception as img_err:
                                 print(f"Error downloading or processing image: {img_err}")
                                 return None
+                            
+                            if save_path:
+                                print(f"Image saved and validated: {save_path}")
+                                self.image_cache.put_lookup('wikimedia', search_term, article_title, [img_url], 1)
+                            return save_path
             
             print(f"No image found for: {search_term}")
+            # Only a real empty result is remembered, not an API error
+            if "query" in data:
+                self.image_cache.put_lookup('wikimedia', search_term, article_title, [], 1)
             return None
         
         except Exception as e:
@@ -993,7 +1010,7 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
         self.wait(0.5)
         self.play(*[FadeOut(mob) for mob in self.mobjects])
 
-    def construct(self):
+    def setup_speech_service(self):
         # Commented out GTTS service
         # try:
         #     self.set_speech_service(GTTSService())
@@ -1002,68 +1019,99 @@ class DirectVideoGenerator(CodeScene, VoiceoverScene):
         #     print(f"Error setting up GTTS: {e}")
         
         try:
-            self.set_speech_service(AzureService(voice="en-US-SteffanNeural", style="newscast"))
-            print("Using Azure Text-to-Speech service")
+            if TTS_SERVICE == "fake":
+                service = FakeSpeechService(voice=TTS_VOICE, style=TTS_STYLE)
+                print("Using fake offline Text-to-Speech service")
+            else:
+                service = AzureService(voice=TTS_VOICE, style=TTS_STYLE)
+                print("Using Azure Text-to-Speech service")
+            
+            # Shared across render workers, so repeated phrases are synthesized once
+            if os.getenv("TTS_CACHE", "1") == "1":
+                service = CachedSpeechService(service)
+            self.set_speech_service(service)
         except Exception as e2:
-            print(f"Error setting up Azure TTS: {e2}")
+            print(f"Error setting up TTS: {e2}")
             print("WARNING: No speech service available!")
+
+    def render_scene(self, scene):
+        scene_type = scene['type']
+        print(f"Processing scene of type: {scene_type}")
+        
+        try:
+            if scene_type == 'title':
+                self.create_title_scene(scene)
+            elif scene_type == 'overview':
+                self.create_overview_scene(scene)
+            elif scene_type == 'code':
+                self.create_code_scene(scene)
+            elif scene_type == 'sequence':
+                self.create_sequence_diagram(scene)
+            elif scene_type == 'image_text':
+                self.create_image_text_scene(scene)
+            elif scene_type == 'multi_image_text':
+                self.create_multi_image_text_scene(scene)
+            elif scene_type == 'triangle':
+                self.create_triangle_scene(scene)
+            elif scene_type == 'timeline':
+                self.create_timeline_scene(scene)
+            elif scene_type == 'data_processing_flow':
+                self.create_data_processing_flow(scene)
+            else:
+                print(f"Warning: Unknown scene type: {scene_type}")
+        except Exception as e:
+            print(f"Error processing {scene_type} scene: {e}")
+
+    def render_transition(self, scene):
+        try:
+            with self.voiceover(scene.get('transition_text', 'Moving on.')):
+                self.clear()
+                self.wait(0.5)
+        except Exception as e:
+            print(f"Error with transition: {e}")
+        
+        self.clear()
+        self.wait(0.5)
+
+    def restore_camera_state(self, scenes):
+        """Replay the camera zoom earlier scenes would have left behind in a serial render"""
+        for scene in scenes:
+            if scene.get('type') == 'timeline':
+                self.camera.frame.scale(TIMELINE_CAMERA_SCALE)
+
+    def construct(self):
+        self.setup_speech_service()
+        
+        scenes = self.all_content['scenes']
+        if self.segment_index is None:
+            indices = range(len(scenes))
+        else:
+            indices = [self.segment_index]
+            self.restore_camera_state(scenes[:self.segment_index])
         
-        if self.all_content.get('background_music'):
+        self.prefetch_images([scenes[i] for i in indices])
+        
+        if self.all_content.get('background_music') and self.segment_index is None:
             try:
                 self.add_background_music(self.all_content['background_music'])
                 print(f"Added background music: {self.all_content['background_music']}")
             except Exception as e:
                 print(f"Error adding background music: {e}")
         
-        for scene in self.all_content['scenes']:
-            scene_type = scene['type']
-            print(f"Processing scene of type: {scene_type}")
+        for i in indices:
+            self.render_scene(scenes[i])
             
+            if i != len(scenes) - 1:
+                self.render_transition(scenes[i])
+        
+        if self.segment_index is None or self.segment_index == len(scenes) - 1:
             try:
-                if scene_type == 'title':
-                    self.create_title_scene(scene)
-                elif scene_type == 'overview':
-                    self.create_overview_scene(scene)
-                elif scene_type == 'code':
-                    self.create_code_scene(scene)
-                elif scene_type == 'sequence':
-                    self.create_sequence_diagram(scene)
-                elif scene_type == 'image_text':
-                    self.create_image_text_scene(scene)
-                elif scene_type == 'multi_image_text':
-                    self.create_multi_image_text_scene(scene)
-                elif scene_type == 'triangle':
-                    self.create_triangle_scene(scene)
-                elif scene_type == 'timeline':
-                    self.create_timeline_scene(scene)
-                elif scene_type == 'data_processing_flow':
-                    self.create_data_processing_flow(scene)
-                else:
-                    print(f"Warning: Unknown scene type: {scene_type}")
+                self.goodbye()
             except Exception as e:
-                print(f"Error processing {scene_type} scene: {e}")
-            
-            if scene != self.all_content['scenes'][-1]:
-                try:
-                    with self.voiceover(scene.get('transition_text', 'Moving on.')):
-                        self.clear()
-                        self.wait(0.5)
-                except Exception as e:
-                    print(f"Error with transition: {e}")
-                
-                self.clear()
-                self.wait(0.5)
-        
-        try:
-            self.goodbye()
-        except Exception as e:
-            print(f"Error with goodbye scene: {e}")
-
-def generate_video_from_json(json_content):
-    """Generate video from JSON with dynamic scene naming"""
-    output_name = json_content.get('output_name', 'GeneratedVideo')
-    print(f"Generating video with output_name: {output_name}")
+                print(f"Error with goodbye scene: {e}")
 
+def configure_render(output_name):
+    """Apply the render settings shared by full and per-scene renders"""
     config.output_file = ""
     config.disable_caching = True
     config.flush_cache = True
@@ -1073,22 +1121,180 @@ def generate_video_from_json(json_content):
     config.quality = "low_quality"
     config.tex_template = "custom_template.tex"
     
-    config.partial_movie_dir = os.path.join(config.video_dir, "partial_movie_files", output_name)
+    config.partial_movie_dir = partial_movie_dir(output_name)
+
+def partial_movie_dir(output_name):
+    """Directory the partial movies of one render go to, under the current video_dir"""
+    return os.path.join(config.video_dir, "partial_movie_files", output_name)
+
+def render_segment(json_content, index, segment_name, settings):
+    """Render entry `index` of the scenes as its own movie, returns the movie path (runs in a worker process)"""
+    configure_render(segment_name)
     
-    print(f"Current config output_file: {config.output_file}")
-    print(f"Using scene name: {output_name}")
+    # Spawned workers start from manim's defaults, so the job's settings (media dirs included) override them
+    with tempconfig(settings):
+        config.partial_movie_dir = partial_movie_dir(segment_name)
+        
+        SegmentScene = type(
+            segment_name,
+            (DirectVideoGenerator,),
+            {'__module__': __name__}
+        )
+        
+        scene = SegmentScene(json_content, segment_index=index)
+        scene.add_background(DEFAULT_BACKGROUND)
+        scene.render()
+        return str(scene.renderer.file_writer.movie_file_path)
+
+def concatenate_segments(segment_paths, output_path):
+    """Join rendered segments (video and audio) into one movie without re-encoding"""
+    list_path = f"{output_path}.segments.txt"
+    with open(list_path, 'w') as list_file:
+        for path in segment_paths:
+            escaped = path.replace("'", "'\\''")
+            list_file.write(f"file '{escaped}'\n")
     
-    DynamicScene = type(
-        output_name, 
-        (DirectVideoGenerator,),
-        {'__module__': __name__}
+    try:
+        subprocess.run(
+            ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+             '-i', list_path, '-c', 'copy', output_path],
+            check=True
+        )
+    finally:
+        os.remove(list_path)
+
+def video_output_dir():
+    """Directory Manim writes finished movies to under the current config"""
+    module_name = config.get_dir("input_file").stem if config["input_file"] else ""
+    return str(config.get_dir("video_dir", module_name=module_name))
+
+def render_settings():
+    """The job's render settings, handed to every segment worker and hashed into segment cache keys"""
+    return {
+        "media_dir": config.media_dir,
+        "video_dir": config.video_dir,
+        "pixel_width": config.pixel_width,
+        "pixel_height": config.pixel_height,
+        "frame_rate": config.frame_rate,
+        "format": config.format
+    }
+
+# Settings that only decide where a segment is written, not what it looks like
+RENDER_LOCATION_SETTINGS = ("media_dir", "video_dir")
+
+def segment_cache_key(json_content, index, settings):
+    """Cache key of one rendered segment: the scene, what follows it, voice and the settings it renders with"""
+    scenes = json_content['scenes']
+    is_last = index == len(scenes) - 1
+    return RenderCache.make_key(
+        scene=scenes[index],
+        transition=not is_last,
+        goodbye=is_last,
+        camera_zoom=sum(1 for scene in scenes[:index] if scene.get('type') == 'timeline'),
+        voice={"service": TTS_SERVICE, "voice": TTS_VOICE, "style": TTS_STYLE},
+        render={k: v for k, v in settings.items() if k not in RENDER_LOCATION_SETTINGS}
     )
+
+def render_segments(json_content, output_name, max_workers=None, cache=None):
+    """Render every scene in its own process and concatenate the partial movies in scene order"""
+    scenes = json_content['scenes']
+    configure_render(output_name)
+    settings = render_settings()
     
-    print(f"DynamicScene class name: {DynamicScene.__name__}")
+    segment_paths = [None] * len(scenes)
+    keys = [None] * len(scenes)
+    # Per-job files removed after the concat: fresh renders and pinned cache hits
+    job_paths = []
+    if cache is not None:
+        for i in range(len(scenes)):
+            keys[i] = segment_cache_key(json_content, i, settings)
+            # Another worker may evict the entry before the concat reads it, so pin it in this job's directory
+            segment_paths[i] = cache.checkout(keys[i], os.path.join(config.partial_movie_dir, f"cached_{i:03d}.mp4"))
+            if segment_paths[i] is not None:
+                job_paths.append(segment_paths[i])
     
-    scene = DynamicScene(json_content)
-    scene.add_background("./examples/resources/blackboard.jpg") 
-    scene.render()
+    missing = [i for i, path in enumerate(segment_paths) if path is None]
+    print(f"Reusing {len(scenes) - len(missing)} cached segment(s), rendering {len(missing)}")
+    
+    if missing:
+        max_workers = min(max_workers or os.cpu_count() or 1, len(missing))
+        print(f"Rendering {len(missing)} scenes with {max_workers} worker processes")
+        
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            futures = {
+                i: executor.submit(render_segment, json_content, i, f"{output_name}_part{i:03d}", settings)
+                for i in missing
+            }
+            for i, future in futures.items():
+                segment_paths[i] = future.result()
+                job_paths.append(segment_paths[i])
+                if cache is not None:
+                    cache.put(keys[i], segment_paths[i])
+    
+    output_path = os.path.join(video_output_dir(), f"{output_name}.mp4")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # Segments are listed in scene order so the final cut matches a serial render
+    concatenate_segments(segment_paths, output_path)
+    print(f"Concatenated {len(segment_paths)} segments into: {output_path}")
+    
+    # Cached copies stay in the cache; only the per-job files are removed
+    for path in job_paths:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Warning: Failed to remove segment {path}: {e}")
+    
+    if cache is not None:
+        print(f"Render cache stats: {cache.stats()}")
+    
+    return output_path
+
+def generate_video_from_json(json_content, parallel=None, max_workers=None, use_cache=None):
+    """Generate video from JSON with dynamic scene naming"""
+    output_name = json_content.get('output_name', 'GeneratedVideo')
+    print(f"Generating video with output_name: {output_name}")
+
+    if parallel is None:
+        parallel = os.getenv("RENDER_PARALLEL", "0") == "1"
+    if use_cache is None:
+        use_cache = os.getenv("RENDER_CACHE", "0") == "1"
+    if max_workers is None and os.getenv("RENDER_WORKERS"):
+        max_workers = int(os.getenv("RENDER_WORKERS"))
+    if not parallel:
+        max_workers = 1
+    
+    # Background music spans the whole video, so it can only be mixed in a serial render
+    if json_content.get('background_music') and (parallel or use_cache):
+        print("Background music requested, falling back to a single serial render")
+        parallel = use_cache = False
+    
+    if (parallel or use_cache) and json_content.get('scenes'):
+        render_segments(
+            json_content,
+            output_name,
+            max_workers=max_workers,
+            cache=RenderCache() if use_cache else None
+        )
+    else:
+        configure_render(output_name)
+        
+        print(f"Current config output_file: {config.output_file}")
+        print(f"Using scene name: {output_name}")
+        
+        DynamicScene = type(
+            output_name, 
+            (DirectVideoGenerator,),
+            {'__module__': __name__}
+        )
+        
+        print(f"DynamicScene class name: {DynamicScene.__name__}")
+        
+        scene = DynamicScene(json_content)
+        scene.add_background(DEFAULT_BACKGROUND) 
+        scene.render()
 
     temp_files = [
         f"{output_name}.log",
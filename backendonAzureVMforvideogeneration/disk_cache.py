@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+
+class DiskLRUCache:
+    """
+    Size-bounded, content-addressed file cache on local disk.
+
+    Every entry is one file named by its key. Writes go to a temporary
+    file that is renamed into place, so several processes can share the
+    directory without ever reading a partial entry. A hit touches the
+    file's mtime, and eviction removes the least recently used entries
+    once the directory grows past max_bytes.
+    """
+
+    suffix = '.bin'
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(**parts):
+        """Hash a normalized JSON encoding of the parts that determine an entry"""
+        normalized = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _path_for(self, key, suffix=None):
+        return os.path.join(self.cache_dir, key[:2], f"{key}{suffix or self.suffix}")
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Return the cached file path for key, or None on a miss"""
+        path = self._path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._record(False)
+            return None
+        self._record(True)
+        return path
+
+    def checkout(self, key, dest_path):
+        """
+        Pin the entry for key at dest_path and return it, or None on a miss.
+
+        dest_path is a hard link to the entry (a copy across filesystems),
+        so it stays readable after another worker evicts the entry.
+        """
+        path = self._path_for(key)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            try:
+                os.link(path, dest_path)
+            except FileNotFoundError:
+                raise
+            except OSError:
+                shutil.copyfile(path, dest_path)
+            os.utime(path)
+        except FileNotFoundError:
+            # A miss, or evicted between the link and the touch
+            if not os.path.exists(dest_path):
+                self._record(False)
+                return None
+        self._record(True)
+        return dest_path
+
+    def _atomic_write(self, path, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put(self, key, source_path):
+        """Copy a file into the cache and return its cached path"""
+        path = self._path_for(key)
+        self._atomic_write(path, lambda tmp_path: shutil.copyfile(source_path, tmp_path))
+        self.evict(keep=path)
+        return path
+
+    def _remove_entry(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            self._remove_entry(path)
+            total -= size
+            removed += 1
+        print(f"{type(self).__name__} evicted {removed} entries")
+        return removed
+
+    def stats(self):
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes
+        }
@@ -4,11 +4,12 @@ import os
 import re
 import time
 from flask import Flask, request, jsonify, send_from_directory
-from configparser import ConfigParser
+from manim import tempconfig
 from llama_index.llms.azure_openai import AzureOpenAI
 from llama_index.core.prompts import PromptTemplate
 from direct_video_generator import generate_video_from_json
 from chat_with_paper import ChatWithPaper
+from video_jobs import VideoJobQueue, STATUS_DONE
 from flask_cors import CORS
 
 app = Flask(__name__)
@@ -68,27 +69,26 @@ def generate_video_json_with_ai(topic, pdf_url=None, paper_title=None, user_desc
     print(f"\nGenerating video JSON for topic: {topic}")
 
     # Get paper context if PDF is provided
-       # Get paper context if PDF is provided
-        # Get paper context if PDF is provided
     paper_context = ""
     custom_instructions = ""
     
     if pdf_url and paper_title:
         try:
             print(f"Analyzing paper: {paper_title} from {pdf_url}")
-            # Get a summary of the paper to use as context
-            paper_response = paper_analyzer.chat_with_paper(
+            # The summary is written once per paper at ingestion, so this is usually a lookup
+            paper_response = paper_analyzer.get_paper_summary(
                 pdf_url=pdf_url,
-                title=paper_title,
-                question=f"Provide a comprehensive summary of the key points in this paper about {topic}"
+                title=paper_title
             )
-            if "answer" in paper_response:
+            if "summary" in paper_response:
                 paper_context = f"""
 === IMPORTANT PAPER CONTEXT ===
 The video should be based on this research paper titled "{paper_title}".
 Key points from the paper:
-{paper_response['answer']}
+{paper_response['summary']}
 """
+            else:
+                print(f"Warning: No paper summary: {paper_response.get('error')}")
         except Exception as e:
             print(f"Warning: Failed to analyze paper: {str(e)}")
 
@@ -414,41 +414,39 @@ JSON Structure Example:
         print(f"AI generation error: {str(e)}")
         raise ValueError(f"AI generation failed: {str(e)}")
 
-def update_manim_config(output_name):
-    """Update Manim configuration file with explicit settings"""
-    config_parser = ConfigParser()
-    config_path = 'manim.cfg'
-    
-    if os.path.exists(config_path):
-        config_parser.read(config_path)
-    else:
-        config_parser.add_section('CLI')
-    
-    # Remove output_file setting
-    if config_parser.has_option('CLI', 'output_file'):
-        config_parser.remove_option('CLI', 'output_file')
-    
-    # Set other configurations
-    config_parser.set('CLI', 'media_dir', MEDIA_ROOT)
-    config_parser.set('CLI', 'quality', 'low_quality')
-    config_parser.set('CLI', 'frame_rate', '30')
-    config_parser.set('CLI', 'video_dir', VIDEO_DIR)
-    config_parser.set('CLI', 'format', 'mp4')
-    config_parser.set('CLI', 'disable_caching', 'True')
-    config_parser.set('CLI', 'flush_cache', 'True')
-    config_parser.set('CLI', 'write_to_movie', 'True')
-    
-    with open(config_path, 'w') as configfile:
-        config_parser.write(configfile)
-    
-    print(f"Updated Manim config to disable caching and set video directory.")
+def manim_settings():
+    """
+    Manim settings for one render.
+
+    Applied with tempconfig inside the job's own process rather than
+    written to manim.cfg, which every concurrent job would share.
+    """
+    return {
+        'media_dir': MEDIA_ROOT,
+        'video_dir': VIDEO_DIR,
+        'quality': 'low_quality',
+        'frame_rate': 30,
+        'format': 'mp4',
+        'disable_caching': True,
+        'flush_cache': True,
+        'write_to_movie': True
+    }
+
+def report_progress(progress, fraction, stage):
+    """Forward a progress update to the job queue when running as a job"""
+    if progress is not None:
+        try:
+            progress(fraction, stage)
+        except Exception as e:
+            print(f"Warning: Failed to report progress: {str(e)}")
 
-def create_and_generate_video(topic, output_name, pdf_url=None, paper_title=None, user_description=None):
+def create_and_generate_video(topic, output_name, pdf_url=None, paper_title=None, user_description=None, progress=None):
     """Main video creation workflow"""
     try:
         print("\n===== STARTING VIDEO CREATION WORKFLOW =====")
 
         # Clear cache FIRST
+        report_progress(progress, 0.05, "preparing")
         clear_manim_cache(output_name)
 
         print(f"Topic: {topic}")
@@ -464,12 +462,11 @@ def create_and_generate_video(topic, output_name, pdf_url=None, paper_title=None
         print(f"MEDIA_ROOT: {MEDIA_ROOT}")
         print(f"VIDEO_DIR: {VIDEO_DIR}")
         
-        # Update manim config
-        update_manim_config(output_name)
-        
         # Generate video JSON
         print("\nGenerating video JSON...")
-        video_json = generate_video_json_with_ai(topic, pdf_url=None, paper_title=None, user_description=None)
+        report_progress(progress, 0.1, "generating_script")
+        video_json = generate_video_json_with_ai(
+            topic, pdf_url=pdf_url, paper_title=paper_title, user_description=user_description)
 
             # Force output name in JSON
         video_json['output_name'] = output_name
@@ -482,7 +479,10 @@ def create_and_generate_video(topic, output_name, pdf_url=None, paper_title=None
             
         # Generate video
         print("\nGenerating video from JSON...")
-        generate_video_from_json(video_json)
+        report_progress(progress, 0.3, "rendering")
+        with tempconfig(manim_settings()):
+            generate_video_from_json(video_json)
+        report_progress(progress, 0.9, "finalizing")
         
         # Check if video was created
         output_path = os.path.join(VIDEO_DIR, f"{output_name}.mp4")
@@ -528,7 +528,7 @@ def create_and_generate_video(topic, output_name, pdf_url=None, paper_title=None
 
 @app.route('/generate_video', methods=['POST'])
 def handle_generation():
-    """Endpoint for video generation requests"""
+    """Endpoint for video generation requests, queues a render job and returns immediately"""
     data = request.get_json()
     
     if not data or 'topic' not in data:
@@ -536,7 +536,9 @@ def handle_generation():
         
     try:
         topic = data['topic']
-        output_name = data.get('output_name', f"video_{int(time.time())}")
+        # Named after the job, so two jobs submitted in the same second never share an output file
+        job_id = job_queue.store.new_id()
+        output_name = data.get('output_name') or f"video_{job_id}"
         pdf_url = data.get('pdf_url')
         paper_title = data.get('paper_title')
         user_description = data.get('user_description')
@@ -549,8 +551,9 @@ def handle_generation():
         if user_description:
             print(f"User description: {user_description[:100]}...")
 
-        # Create and generate video
-        create_and_generate_video(
+        # Queue the video for the render workers
+        job_queue.submit(
+            job_id=job_id,
             topic=topic,
             output_name=output_name,
             pdf_url=pdf_url,
@@ -558,17 +561,16 @@ def handle_generation():
             user_description=user_description
         )
         
-        # Define video URL after successful generation
-        video_url = f"{request.host_url}media/videos/1080p60/{output_name}.mp4"
-        
-        print(f"\n✅ REQUEST SUCCESSFUL")
-        print(f"Video URL: {video_url}")
+        print(f"\n✅ REQUEST QUEUED")
+        print(f"Job ID: {job_id}")
         
         return jsonify({
-            "status": "success",
-            "video_url": video_url,
-            "message": "Video generated successfully"
-        }), 200
+            "status": "queued",
+            "job_id": job_id,
+            "status_url": f"{request.host_url}jobs/{job_id}",
+            "video_url": _video_url(output_name),
+            "message": "Video generation queued"
+        }), 202
         
     except Exception as e:
         print(f"\n❌ REQUEST FAILED: {str(e)}")
@@ -577,6 +579,32 @@ def handle_generation():
             "message": str(e)
         }), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report the state of a queued video generation job"""
+    job = job_queue.store.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+
+    response = {
+        "job_id": job['id'],
+        "status": job['status'],
+        "stage": job['stage'],
+        "progress": round(job['progress'], 2),
+        "created_at": job['created_at'],
+        "started_at": job['started_at'],
+        "finished_at": job['finished_at']
+    }
+    if job['status'] == STATUS_DONE:
+        response["video_url"] = _video_url(job['params']['output_name'])
+    if job['error']:
+        response["message"] = job['error']
+    return jsonify(response), 200
+
+def _video_url(output_name):
+    """Public URL a finished video is served from"""
+    return f"{request.host_url}media/videos/1080p60/{output_name}.mp4"
+
 @app.route('/media/videos/1080p60/<path:filename>')
 def serve_video(filename):
     """Serve generated video files"""
@@ -588,11 +616,22 @@ def health_check():
     """Health check endpoint"""
     return jsonify({"status": "healthy", "service": "video_generator"}), 200
 
+# Render jobs run in spawned worker processes
+job_queue = VideoJobQueue(create_and_generate_video)
+
+if __name__ != '__main__':
+    # Imported by a WSGI server (gunicorn, waitress, flask run): start with the app
+    job_queue.start()
+
 if __name__ == '__main__':
     print("\n🚀 Starting Video Generator Service")
     print(f"Media directory: {MEDIA_ROOT}")
     print(f"Video directory: {VIDEO_DIR}")
     os.makedirs(VIDEO_DIR, exist_ok=True)
     print("Directories created")
+    use_reloader = os.getenv("VIDEO_USE_RELOADER", "1") == "1"
+    # Under the debug reloader only the serving child process should own workers
+    if not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        job_queue.start()
     print("Server running at http://0.0.0.0:3000")
-    app.run(host='0.0.0.0', port=3000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=3000, debug=True, use_reloader=use_reloader)
\ No newline at end of file
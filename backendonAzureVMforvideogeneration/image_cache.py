@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import cairosvg
+from PIL import Image
+
+from http_client import get_session
+
+IMAGE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'image_cache')
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_TTL = 30 * 24 * 3600
+# Topics that resolved to nothing are retried sooner, articles gain images over time
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+
+
+class ImageCache:
+    """
+    Shared cache of Wikipedia image lookups and downloaded files.
+
+    A SQLite index maps (kind, topic) to the resolved article and its
+    image URLs, and each URL to a verified local PNG/JPEG. A repeat
+    topic whose images are still on disk resolves without any network
+    round-trip. Files are evicted least recently used first once the
+    directory grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, max_bytes=None, ttl=None, negative_ttl=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes or int(os.getenv("IMAGE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.ttl = ttl or int(os.getenv("IMAGE_CACHE_TTL", DEFAULT_TTL))
+        self.negative_ttl = negative_ttl or DEFAULT_NEGATIVE_TTL
+        self.db_path = os.path.join(cache_dir, 'index.db')
+        self._evict_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS lookups (
+                    kind TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    article TEXT,
+                    urls TEXT NOT NULL,
+                    requested INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (kind, query)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS images (
+                    url TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS images_last_used ON images (last_used)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_lookup(self, kind, query, num_images):
+        """Return the cached image URLs for a topic, or None if unknown, stale or too short"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM lookups WHERE kind = ? AND query = ?", (kind, query)
+            ).fetchone()
+        if row is None:
+            return None
+
+        urls = json.loads(row['urls'])
+        ttl = self.ttl if urls else self.negative_ttl
+        if time.time() - row['created_at'] > ttl:
+            return None
+        # A lookup made for fewer images than requested may have stopped early
+        if row['requested'] < num_images and len(urls) >= row['requested']:
+            return None
+        return {"article": row['article'], "urls": urls[:num_images]}
+
+    def put_lookup(self, kind, query, article, urls, requested):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO lookups (kind, query, article, urls, requested, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, query, article, json.dumps(urls), requested, time.time())
+            )
+
+    def image_path(self, url):
+        """Local path of a previously downloaded image, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT path FROM images WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            if not os.path.exists(row['path']):
+                conn.execute("DELETE FROM images WHERE url = ?", (url,))
+                return None
+            conn.execute("UPDATE images SET last_used = ? WHERE url = ?", (time.time(), url))
+        return row['path']
+
+    def _path_for_url(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:24]
+        extension = os.path.splitext(url.split('?')[0])[1].lower() or '.img'
+        return os.path.join(self.cache_dir, digest[:2], digest + extension)
+
+    def download(self, url, headers, require_image_type=False):
+        """Return a verified local copy of url, downloading and converting SVGs only on a miss"""
+        cached = self.image_path(url)
+        if cached:
+            return cached
+
+        response = get_session().get(url, headers=headers)
+        response.raise_for_status()
+
+        if require_image_type and "image" not in response.headers.get("Content-Type", ""):
+            print(f"Invalid content type for URL: {url}")
+            return None
+
+        save_path = self._path_for_url(url)
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        # Readers only ever see a complete, verified file at save_path
+        tmp_path = f"{save_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        converted_path = f"{tmp_path}.png"
+        with open(tmp_path, "wb") as img_file:
+            img_file.write(response.content)
+
+        try:
+            # Convert SVG to PNG if needed
+            if save_path.endswith(".svg"):
+                save_path = save_path.rsplit('.', 1)[0] + '.png'
+                cairosvg.svg2png(url=tmp_path, write_to=converted_path)
+                os.replace(converted_path, tmp_path)
+                print(f"Converted SVG to PNG: {save_path}")
+
+            with Image.open(tmp_path) as img:
+                img.verify()
+            os.replace(tmp_path, save_path)
+        except Exception as e:
+            print(f"Invalid image file: {url}, error: {e}")
+            return None
+        finally:
+            for path in (tmp_path, converted_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO images (url, path, bytes, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (url, save_path, os.path.getsize(save_path), now, now)
+            )
+        self.evict()
+        return save_path
+
+    def evict(self):
+        """Delete least recently used images until the cache fits in max_bytes"""
+        with self._evict_lock, self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for row in conn.execute("SELECT url, path, bytes FROM images ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                if os.path.exists(row['path']):
+                    os.unlink(row['path'])
+                conn.execute("DELETE FROM images WHERE url = ?", (row['url'],))
+                total -= row['bytes']
+                removed += 1
+        print(f"Image cache evicted {removed} image(s)")
+        return removed
@@ -0,0 +1,23 @@
+import os
+
+from disk_cache import DiskLRUCache
+
+RENDER_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'render_cache')
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+
+
+class RenderCache(DiskLRUCache):
+    """
+    Content-addressed cache of rendered scene segments.
+
+    Entries are plain .mp4 files named by the hash of everything that
+    affects the segment's pixels and audio (see segment_cache_key).
+    """
+
+    suffix = '.mp4'
+
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_bytes=None):
+        super().__init__(
+            cache_dir,
+            max_bytes or int(os.getenv("RENDER_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        )
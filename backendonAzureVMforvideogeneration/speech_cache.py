@@ -0,0 +1,200 @@
+import json
+import os
+import shutil
+import time
+import wave
+from pathlib import Path
+
+from manim_voiceover.services.base import SpeechService
+from manim_voiceover.tracker import AUDIO_OFFSET_RESOLUTION
+
+from disk_cache import DiskLRUCache
+
+SPEECH_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'speech_cache')
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+class SpeechCache(DiskLRUCache):
+    """
+    Shared cache of synthesized voiceovers keyed by (text, voice, style).
+
+    Each entry is the audio file plus a JSON sidecar holding the data the
+    speech service returned (word boundaries, SSML). The sidecar is
+    written before the audio is renamed into place, so an entry whose
+    audio exists is always complete.
+    """
+
+    suffix = '.audio'
+
+    def __init__(self, cache_dir=SPEECH_CACHE_DIR, max_bytes=None):
+        super().__init__(
+            cache_dir,
+            max_bytes or int(os.getenv("SPEECH_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        )
+
+    def get_entry(self, key):
+        """Return (audio_path, metadata) for key, or None on a miss"""
+        audio_path = self.get(key)
+        if audio_path is None:
+            return None
+        try:
+            with open(self._path_for(key, '.json')) as f:
+                return audio_path, json.load(f)
+        except (FileNotFoundError, ValueError):
+            # Evicted or half-removed by another worker between the two reads
+            return None
+
+    def put_entry(self, key, audio_source, metadata):
+        def write_metadata(tmp_path):
+            with open(tmp_path, 'w') as f:
+                json.dump(metadata, f, default=str)
+
+        self._atomic_write(self._path_for(key, '.json'), write_metadata)
+        return self.put(key, audio_source)
+
+    def _remove_entry(self, path):
+        super()._remove_entry(path)
+        super()._remove_entry(path[:-len(self.suffix)] + '.json')
+
+
+class CachedSpeechService(SpeechService):
+    """Wraps a manim_voiceover speech service with the shared SpeechCache"""
+
+    def __init__(self, service, cache=None, **kwargs):
+        self.service = service
+        self.cache = cache or SpeechCache()
+        super().__init__(
+            global_speed=service.global_speed,
+            cache_dir=service.cache_dir,
+            **kwargs
+        )
+
+    def cache_key(self, text, **kwargs):
+        return self.cache.make_key(
+            text=text,
+            voice=getattr(self.service, 'voice', None),
+            style=getattr(self.service, 'style', None),
+            service=type(self.service).__name__,
+            options=kwargs
+        )
+
+    def generate_from_text(self, text, cache_dir=None, path=None, **kwargs):
+        if cache_dir is None:
+            cache_dir = self.cache_dir
+
+        key = self.cache_key(text, **kwargs)
+        entry = self.cache.get_entry(key)
+        if entry is not None:
+            audio_path, metadata = entry
+            local_name = path or f"{key[:16]}{metadata['audio_ext']}"
+            local_path = Path(cache_dir) / local_name
+            if not local_path.exists():
+                shutil.copyfile(audio_path, local_path)
+            result = dict(metadata['result'])
+            result['original_audio'] = str(local_name)
+            return result
+
+        result = self.service.generate_from_text(text, cache_dir=cache_dir, path=path, **kwargs)
+        audio_source = Path(cache_dir) / result['original_audio']
+        try:
+            self.cache.put_entry(key, audio_source, {
+                "result": result,
+                "audio_ext": os.path.splitext(result['original_audio'])[1]
+            })
+        except Exception as e:
+            print(f"Warning: Failed to cache voiceover: {e}")
+        return result
+
+
+class FakeSpeechService(SpeechService):
+    """
+    Offline stand-in for AzureService that writes silent WAV files.
+
+    Audio length follows the word count at words_per_minute and word
+    boundaries are spaced evenly, so scenes time their animations as
+    they would with real speech. latency simulates the synthesis round
+    trip for benchmarks.
+    """
+
+    SAMPLE_RATE = 16000
+
+    def __init__(self, voice="fake", style=None, words_per_minute=150, latency=0.0, **kwargs):
+        self.voice = voice
+        self.style = style
+        self.words_per_minute = words_per_minute
+        self.latency = latency
+        super().__init__(**kwargs)
+
+    def generate_from_text(self, text, cache_dir=None, path=None, **kwargs):
+        if cache_dir is None:
+            cache_dir = self.cache_dir
+
+        input_data = {
+            "input_text": text,
+            "service": "fake",
+            "config": {"voice": self.voice, "style": self.style}
+        }
+        audio_path = path or self.get_audio_basename(input_data) + ".wav"
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        words = text.split()
+        seconds_per_word = 60.0 / self.words_per_minute
+        duration = max(len(words) * seconds_per_word, 0.5)
+
+        with wave.open(str(Path(cache_dir) / audio_path), 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.SAMPLE_RATE)
+            wav_file.writeframes(b'\x00\x00' * int(duration * self.SAMPLE_RATE))
+
+        word_boundaries = []
+        text_offset = 0
+        for i, word in enumerate(words):
+            text_offset = text.find(word, text_offset)
+            word_boundaries.append({
+                "audio_offset": int(i * seconds_per_word * AUDIO_OFFSET_RESOLUTION),
+                "duration_milliseconds": int(seconds_per_word * 1000),
+                "text_offset": text_offset,
+                "word_length": len(word),
+                "text": word,
+                "boundary_type": "Word"
+            })
+            text_offset += len(word)
+
+        return {
+            "input_text": text,
+            "input_data": input_data,
+            "word_boundaries": word_boundaries,
+            "original_audio": audio_path
+        }
+
+
+def benchmark(runs=20, latency=0.3):
+    """Time the phrases every video repeats with and without the shared cache"""
+    import tempfile
+
+    phrases = [
+        "Thank you for watching! You can generate other tutorial videos with our platform.",
+        "Moving on."
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SpeechCache(os.path.join(tmp, 'shared'))
+        for label in ("uncached", "cached"):
+            # Every render worker starts with an empty scene voiceover directory
+            scene_dir = os.path.join(tmp, label)
+            os.makedirs(scene_dir)
+            service = FakeSpeechService(latency=latency, cache_dir=scene_dir)
+            if label == "cached":
+                service = CachedSpeechService(service, cache=cache)
+            start = time.perf_counter()
+            for i in range(runs):
+                service.generate_from_text(phrases[i % len(phrases)])
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {runs} voiceovers in {elapsed:.3f}s ({elapsed / runs * 1000:.1f} ms each)")
+        print(f"Cache stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Modules import each other by bare name, and the shared HTTP session lives in the chat backend
+sys.path.insert(0, os.path.join(HERE, '..', '..', 'backendforchatwithpapers'))
+sys.path.insert(0, os.path.join(HERE, '..'))
@@ -0,0 +1,169 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("manim")
+pytest.importorskip("manim_voiceover")
+pytest.importorskip("code_video")
+
+import direct_video_generator
+from direct_video_generator import DirectVideoGenerator
+from image_cache import ImageCache
+
+MINIMAL_JSON = {
+    "output_name": "SmokeTest",
+    "scenes": [
+        {"type": "title", "main_text": "Smoke test", "voiceover": "A smoke test."},
+        {"type": "timeline", "title": "History", "events": []}
+    ]
+}
+
+RENDER_SETTINGS = {
+    "media_dir": "media",
+    "video_dir": "{media_dir}/videos",
+    "pixel_width": 854,
+    "pixel_height": 480,
+    "frame_rate": 30,
+    "format": "mp4"
+}
+
+
+@pytest.fixture(autouse=True)
+def image_cache_dir(monkeypatch, tmp_path):
+    # Scenes open an ImageCache, which would otherwise land next to the sources
+    monkeypatch.setattr(direct_video_generator, "ImageCache", lambda: ImageCache(str(tmp_path / "images")))
+
+
+def test_builds_full_render_scene():
+    scene = DirectVideoGenerator(MINIMAL_JSON)
+    assert scene.segment_index is None
+    assert scene.all_content["output_name"] == "SmokeTest"
+
+
+def test_builds_segment_scene_from_json_string():
+    scene = DirectVideoGenerator(json.dumps(MINIMAL_JSON), segment_index=1)
+    assert scene.segment_index == 1
+    assert [s["type"] for s in scene.all_content["scenes"]] == ["title", "timeline"]
+
+
+def test_restore_camera_state_replays_timeline_zoom():
+    scene = DirectVideoGenerator(MINIMAL_JSON, segment_index=1)
+    width = scene.camera.frame.width
+    scene.restore_camera_state(MINIMAL_JSON["scenes"])
+    assert scene.camera.frame.width == pytest.approx(width * direct_video_generator.TIMELINE_CAMERA_SCALE)
+
+
+def test_serial_render_uses_default_background(monkeypatch):
+    backgrounds, rendered = [], []
+    monkeypatch.setenv("RENDER_PARALLEL", "0")
+    monkeypatch.setenv("RENDER_CACHE", "0")
+    monkeypatch.setattr(direct_video_generator, "configure_render", lambda output_name: None)
+    monkeypatch.setattr(DirectVideoGenerator, "add_background", lambda self, path: backgrounds.append(path))
+    monkeypatch.setattr(DirectVideoGenerator, "render", lambda self: rendered.append(type(self).__name__))
+
+    direct_video_generator.generate_video_from_json(MINIMAL_JSON)
+
+    assert backgrounds == [direct_video_generator.DEFAULT_BACKGROUND]
+    assert rendered == ["SmokeTest"]
+
+
+def test_render_segment_uses_job_settings(monkeypatch, tmp_path):
+    settings = dict(direct_video_generator.render_settings(),
+                    media_dir=str(tmp_path / "media"), video_dir=str(tmp_path / "videos"))
+    seen = {}
+
+    class Rendered(Exception):
+        pass
+
+    def render(self):
+        seen.update(media_dir=direct_video_generator.config.media_dir,
+                    partial_movie_dir=direct_video_generator.config.partial_movie_dir)
+        raise Rendered
+
+    monkeypatch.setattr(direct_video_generator, "configure_render", lambda output_name: None)
+    monkeypatch.setattr(DirectVideoGenerator, "add_background", lambda self, path: None)
+    monkeypatch.setattr(DirectVideoGenerator, "render", render)
+
+    with pytest.raises(Rendered):
+        direct_video_generator.render_segment(MINIMAL_JSON, 0, "SmokeTest_part000", settings)
+
+    assert seen == {
+        "media_dir": str(tmp_path / "media"),
+        "partial_movie_dir": os.path.join(str(tmp_path / "videos"), "partial_movie_files", "SmokeTest_part000")
+    }
+
+
+def test_segment_cache_key_is_stable():
+    reordered = json.loads(json.dumps(MINIMAL_JSON))
+    reordered["scenes"][0] = dict(reversed(list(reordered["scenes"][0].items())))
+    assert (direct_video_generator.segment_cache_key(MINIMAL_JSON, 0, RENDER_SETTINGS)
+            == direct_video_generator.segment_cache_key(reordered, 0, RENDER_SETTINGS))
+    # The last scene is followed by the goodbye instead of a transition
+    assert (direct_video_generator.segment_cache_key(MINIMAL_JSON, 0, RENDER_SETTINGS)
+            != direct_video_generator.segment_cache_key(MINIMAL_JSON, 1, RENDER_SETTINGS))
+
+
+def test_segment_cache_key_follows_voice(monkeypatch):
+    key = direct_video_generator.segment_cache_key(MINIMAL_JSON, 0, RENDER_SETTINGS)
+    monkeypatch.setattr(direct_video_generator, "TTS_VOICE", "en-US-JennyNeural")
+    assert direct_video_generator.segment_cache_key(MINIMAL_JSON, 0, RENDER_SETTINGS) != key
+
+
+def test_segment_cache_key_follows_render_settings_but_not_location():
+    key = direct_video_generator.segment_cache_key(MINIMAL_JSON, 0, RENDER_SETTINGS)
+    moved = dict(RENDER_SETTINGS, media_dir="elsewhere", video_dir="elsewhere/videos")
+    assert direct_video_generator.segment_cache_key(MINIMAL_JSON, 0, moved) == key
+    sharper = dict(RENDER_SETTINGS, pixel_width=1920, pixel_height=1080)
+    assert direct_video_generator.segment_cache_key(MINIMAL_JSON, 0, sharper) != key
+
+
+def test_setup_speech_service_uses_configured_service(monkeypatch):
+    monkeypatch.setattr(direct_video_generator, "TTS_SERVICE", "fake")
+    monkeypatch.setenv("TTS_CACHE", "0")
+    scene = DirectVideoGenerator(MINIMAL_JSON)
+    scene.setup_speech_service()
+    service = scene.speech_service
+    assert isinstance(service, direct_video_generator.FakeSpeechService)
+    assert (service.voice, service.style) == (direct_video_generator.TTS_VOICE, direct_video_generator.TTS_STYLE)
+
+
+def test_render_cache_is_opt_in(monkeypatch):
+    monkeypatch.delenv("RENDER_PARALLEL", raising=False)
+    monkeypatch.delenv("RENDER_CACHE", raising=False)
+    monkeypatch.setattr(direct_video_generator, "configure_render", lambda output_name: None)
+    monkeypatch.setattr(direct_video_generator, "render_segments",
+                        lambda *args, **kwargs: pytest.fail("segment render without opting in"))
+    monkeypatch.setattr(DirectVideoGenerator, "add_background", lambda self, path: None)
+    monkeypatch.setattr(DirectVideoGenerator, "render", lambda self: None)
+
+    direct_video_generator.generate_video_from_json(MINIMAL_JSON)
+
+
+def test_cached_segments_are_pinned_before_concat(monkeypatch, tmp_path):
+    from render_cache import RenderCache
+
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=10 ** 6)
+    for i in range(len(MINIMAL_JSON["scenes"])):
+        source = tmp_path / f"segment{i}.mp4"
+        source.write_bytes(b"segment %d" % i)
+        cache.put(direct_video_generator.segment_cache_key(MINIMAL_JSON, i, RENDER_SETTINGS), str(source))
+
+    monkeypatch.setattr(direct_video_generator.config, "video_dir", str(tmp_path / "media"))
+    # The job's keys come from the settings its workers would render with
+    monkeypatch.setattr(direct_video_generator, "render_settings", lambda: RENDER_SETTINGS)
+    monkeypatch.setattr(direct_video_generator, "video_output_dir", lambda: str(tmp_path / "out"))
+    concatenated = []
+
+    def concatenate(paths, output_path):
+        # Another worker evicts everything while this job concatenates
+        cache.max_bytes = 0
+        cache.evict()
+        concatenated.extend(open(path, 'rb').read() for path in paths)
+
+    monkeypatch.setattr(direct_video_generator, "concatenate_segments", concatenate)
+
+    direct_video_generator.render_segments(MINIMAL_JSON, "SmokeTest", cache=cache)
+
+    assert concatenated == [b"segment 0", b"segment 1"]
+    assert not os.listdir(direct_video_generator.config.partial_movie_dir)
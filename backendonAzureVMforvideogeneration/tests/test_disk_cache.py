@@ -0,0 +1,68 @@
+import os
+import time
+
+from disk_cache import DiskLRUCache
+
+
+def _write(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def test_make_key_ignores_part_order():
+    assert (DiskLRUCache.make_key(text="hi", options={"a": 1, "b": 2})
+            == DiskLRUCache.make_key(options={"b": 2, "a": 1}, text="hi"))
+    assert DiskLRUCache.make_key(text="hi") != DiskLRUCache.make_key(text="hi!")
+
+
+def test_put_and_get(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=1000)
+    assert cache.get("ab" * 32) is None
+    path = cache.put("ab" * 32, _write(tmp_path / "a", 10))
+    assert cache.get("ab" * 32) == path
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=1000)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, _write(tmp_path / f"src{i}", 100))
+        # mtime resolution varies by filesystem, so age entries explicitly
+        os.utime(cache._path_for(key), (time.time() - 100 + i, time.time() - 100 + i))
+    cache.get(keys[0])
+
+    cache.max_bytes = 250
+    assert cache.evict() == 1
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_put_keeps_the_new_entry(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=50)
+    path = cache.put("cd" * 32, _write(tmp_path / "big", 100))
+    assert os.path.exists(path)
+
+
+def test_checkout_survives_eviction(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=1000)
+    cache.put("ef" * 32, _write(tmp_path / "src", 10))
+    pinned = cache.checkout("ef" * 32, str(tmp_path / "job" / "segment.bin"))
+
+    cache.max_bytes = 0
+    cache.evict()
+
+    assert cache.get("ef" * 32) is None
+    with open(pinned, 'rb') as f:
+        assert f.read() == b'x' * 10
+
+
+def test_checkout_miss(tmp_path):
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=1000)
+    assert cache.checkout("aa" * 32, str(tmp_path / "job" / "segment.bin")) is None
+    assert not os.path.exists(tmp_path / "job" / "segment.bin")
+    assert cache.misses == 1
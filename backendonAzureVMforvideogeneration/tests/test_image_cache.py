@@ -0,0 +1,155 @@
+import io
+import os
+import time
+
+import pytest
+
+try:
+    import cairosvg  # noqa: F401
+except (ImportError, OSError) as e:
+    # cairocffi raises OSError, not ImportError, when libcairo itself is missing
+    pytest.skip(f"cairosvg unavailable: {e}", allow_module_level=True)
+PIL_Image = pytest.importorskip("PIL.Image")
+
+import image_cache
+from image_cache import ImageCache
+
+
+def _png_bytes():
+    buffer = io.BytesIO()
+    PIL_Image.new("RGB", (4, 4), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, content, content_type="image/png"):
+        self.content = content
+        self.headers = {"Content-Type": content_type}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, content):
+        self.content = content
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append(url)
+        return FakeResponse(self.content)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageCache(str(tmp_path / "images"))
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession(_png_bytes())
+    monkeypatch.setattr(image_cache, "get_session", lambda: session)
+    return session
+
+
+def test_path_for_url_is_stable(cache, tmp_path):
+    url = "https://upload.wikimedia.org/a/b/Example.PNG?width=300"
+    path = cache._path_for_url(url)
+    assert path == ImageCache(str(tmp_path / "images"))._path_for_url(url)
+    assert path.endswith(".png")
+    assert path != cache._path_for_url("https://upload.wikimedia.org/a/b/Other.png")
+    assert cache._path_for_url("https://example.org/image").endswith(".img")
+
+
+def test_lookup_round_trip(cache):
+    cache.put_lookup("topic", "Alan Turing", "Alan_Turing", ["u1", "u2", "u3"], 3)
+    assert cache.get_lookup("topic", "Alan Turing", 2) == {"article": "Alan_Turing", "urls": ["u1", "u2"]}
+    assert cache.get_lookup("topic", "alan turing", 2) is None
+    assert cache.get_lookup("search", "Alan Turing", 2) is None
+
+
+def test_short_lookup_is_retried_for_more_images(cache):
+    cache.put_lookup("topic", "Turing", "Turing", ["u1", "u2"], 2)
+    assert cache.get_lookup("topic", "Turing", 4) is None
+    # The article had fewer images than asked for, so asking for more cannot help
+    cache.put_lookup("topic", "Turing", "Turing", ["u1"], 2)
+    assert cache.get_lookup("topic", "Turing", 4) == {"article": "Turing", "urls": ["u1"]}
+
+
+def test_empty_lookup_expires_sooner(tmp_path):
+    cache = ImageCache(str(tmp_path / "images"), ttl=1000, negative_ttl=10)
+    cache.put_lookup("topic", "Nothing", None, [], 3)
+    cache.put_lookup("topic", "Something", "Something", ["u1"], 1)
+    with cache._connect() as conn:
+        conn.execute("UPDATE lookups SET created_at = ?", (time.time() - 100,))
+    assert cache.get_lookup("topic", "Nothing", 3) is None
+    assert cache.get_lookup("topic", "Something", 1) is not None
+
+
+def test_download_once(cache, session):
+    url = "https://upload.wikimedia.org/a/b/Example.png"
+    path = cache.download(url, headers={})
+    assert path == cache._path_for_url(url)
+    assert cache.download(url, headers={}) == path
+    assert session.requests == [url]
+
+    os.unlink(path)
+    assert cache.image_path(url) is None
+    assert cache.download(url, headers={}) == path
+    assert len(session.requests) == 2
+
+
+def test_invalid_image_is_not_cached(cache, monkeypatch):
+    session = FakeSession(b"not an image")
+    monkeypatch.setattr(image_cache, "get_session", lambda: session)
+    assert cache.download("https://example.org/broken.png", headers={}) is None
+    assert cache.image_path("https://example.org/broken.png") is None
+    assert not os.path.exists(cache._path_for_url("https://example.org/broken.png"))
+
+
+def test_svg_is_converted_before_it_is_published(cache, monkeypatch):
+    session = FakeSession(b"<svg/>")
+    monkeypatch.setattr(image_cache, "get_session", lambda: session)
+    url = "https://example.org/diagram.svg"
+    png_path = cache._path_for_url(url).rsplit('.', 1)[0] + '.png'
+    seen = []
+
+    def svg2png(url, write_to):
+        seen.append(os.path.exists(png_path))
+        with open(write_to, "wb") as png_file:
+            png_file.write(_png_bytes())
+
+    monkeypatch.setattr(image_cache.cairosvg, "svg2png", svg2png)
+    assert cache.download(url, headers={}) == png_path
+    assert seen == [False]
+    assert os.listdir(os.path.dirname(png_path)) == [os.path.basename(png_path)]
+
+
+def test_failed_svg_conversion_leaves_nothing_behind(cache, monkeypatch):
+    session = FakeSession(b"<svg")
+    monkeypatch.setattr(image_cache, "get_session", lambda: session)
+
+    def svg2png(url, write_to):
+        with open(write_to, "wb") as png_file:
+            png_file.write(b"half a png")
+        raise ValueError("malformed svg")
+
+    monkeypatch.setattr(image_cache.cairosvg, "svg2png", svg2png)
+    url = "https://example.org/broken.svg"
+    assert cache.download(url, headers={}) is None
+    assert os.listdir(os.path.dirname(cache._path_for_url(url))) == []
+
+
+def test_evicts_least_recently_used(cache, session):
+    urls = [f"https://example.org/{i}.png" for i in range(3)]
+    paths = [cache.download(url, headers={}) for url in urls]
+    with cache._connect() as conn:
+        for i, url in enumerate(urls):
+            conn.execute("UPDATE images SET last_used = ? WHERE url = ?", (i, url))
+    cache.image_path(urls[0])
+
+    cache.max_bytes = 2 * os.path.getsize(paths[0])
+    assert cache.evict() == 1
+    assert not os.path.exists(paths[1])
+    assert cache.image_path(urls[0]) == paths[0]
+    assert cache.image_path(urls[2]) == paths[2]
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+pytest.importorskip("manim_voiceover")
+
+from speech_cache import CachedSpeechService, FakeSpeechService, SpeechCache
+
+
+class CountingSpeechService(FakeSpeechService):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def generate_from_text(self, text, cache_dir=None, path=None, **kwargs):
+        self.calls += 1
+        return super().generate_from_text(text, cache_dir=cache_dir, path=path, **kwargs)
+
+
+def _service(tmp_path, name, cache, **kwargs):
+    scene_dir = tmp_path / name
+    scene_dir.mkdir()
+    return CachedSpeechService(CountingSpeechService(cache_dir=str(scene_dir), **kwargs), cache=cache)
+
+
+def test_cache_key_is_stable(tmp_path):
+    cache = SpeechCache(str(tmp_path / "shared"))
+    first = _service(tmp_path, "a", cache, voice="en-US-SteffanNeural", style="newscast")
+    second = _service(tmp_path, "b", cache, voice="en-US-SteffanNeural", style="newscast")
+    assert first.cache_key("Moving on.") == second.cache_key("Moving on.")
+    assert first.cache_key("Moving on.", prosody={"rate": 1}) == second.cache_key("Moving on.", prosody={"rate": 1})
+
+
+def test_cache_key_follows_text_voice_style_and_options(tmp_path):
+    cache = SpeechCache(str(tmp_path / "shared"))
+    service = _service(tmp_path, "a", cache, voice="en-US-SteffanNeural", style="newscast")
+    key = service.cache_key("Moving on.")
+    assert service.cache_key("Moving on!") != key
+    assert service.cache_key("Moving on.", prosody={"rate": 1}) != key
+    assert _service(tmp_path, "b", cache, voice="en-US-JennyNeural", style="newscast").cache_key("Moving on.") != key
+    assert _service(tmp_path, "c", cache, voice="en-US-SteffanNeural", style="cheerful").cache_key("Moving on.") != key
+
+
+def test_second_worker_reuses_the_voiceover(tmp_path):
+    cache = SpeechCache(str(tmp_path / "shared"))
+    first = _service(tmp_path, "a", cache)
+    second = _service(tmp_path, "b", cache)
+
+    result = first.generate_from_text("Thank you for watching!")
+    cached = second.generate_from_text("Thank you for watching!")
+    assert (first.service.calls, second.service.calls) == (1, 0)
+    assert cached["word_boundaries"] == result["word_boundaries"]
+    assert os.path.exists(tmp_path / "b" / cached["original_audio"])
+
+
+def test_evicted_entry_loses_its_metadata(tmp_path):
+    cache = SpeechCache(str(tmp_path / "shared"))
+    service = _service(tmp_path, "a", cache)
+    service.generate_from_text("Moving on.")
+    key = service.cache_key("Moving on.")
+    assert cache.get_entry(key) is not None
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert cache.get_entry(key) is None
+    assert not os.path.exists(cache._path_for(key, '.json'))
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from video_jobs import (JobStore, STATUS_DONE, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING,
+                        VideoJobQueue, _run_job)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def _succeed(progress, **params):
+    progress(0.5, "rendering")
+
+
+def _crash(progress, **params):
+    raise RuntimeError("render crashed")
+
+
+def test_create_queues_job(store):
+    job_id = store.create({"topic": "attention", "output_name": "video_a"})
+    job = store.get(job_id)
+    assert job["status"] == STATUS_QUEUED
+    assert job["params"] == {"topic": "attention", "output_name": "video_a"}
+    assert job["attempts"] == 0
+
+
+def test_create_with_given_id(store):
+    job_id = store.new_id()
+    assert store.create({}, job_id=job_id) == job_id
+    assert store.get(job_id)["status"] == STATUS_QUEUED
+
+
+def test_claim_next_runs_oldest_first(store):
+    first = store.create({"n": 1})
+    time.sleep(0.01)
+    second = store.create({"n": 2})
+
+    job = store.claim_next()
+    assert job["id"] == first
+    assert (job["status"], job["attempts"]) == (STATUS_RUNNING, 1)
+    assert job["started_at"] is not None
+    assert store.claim_next()["id"] == second
+    assert store.claim_next() is None
+
+
+def test_progress_only_moves_running_jobs(store):
+    job_id = store.create({})
+    store.update_progress(job_id, 0.4, "rendering")
+    assert store.get(job_id)["progress"] == 0
+
+    store.claim_next()
+    store.update_progress(job_id, 0.4, "rendering")
+    job = store.get(job_id)
+    assert (job["progress"], job["stage"]) == (0.4, "rendering")
+
+
+def test_finish_and_fail(store):
+    done, failed = store.create({}), store.create({})
+    store.finish(done)
+    store.fail(failed, "boom")
+    assert (store.get(done)["status"], store.get(done)["progress"]) == (STATUS_DONE, 1)
+    assert (store.get(failed)["status"], store.get(failed)["error"]) == (STATUS_FAILED, "boom")
+
+
+@pytest.fixture
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_claim_next_records_owner(store):
+    store.create({})
+    job = store.claim_next()
+    assert job["owner_pid"] == os.getpid()
+    assert job["heartbeat_at"] == job["started_at"]
+
+
+def test_requeue_interrupted(store, dead_pid):
+    job_id, done = store.create({}), store.create({})
+    store.claim_next(owner_pid=dead_pid)
+    store.claim_next(owner_pid=dead_pid)
+    store.finish(done)
+
+    for attempts in (1, 2):
+        assert store.requeue_interrupted(max_attempts=3) == 1
+        job = store.get(job_id)
+        assert (job["status"], job["attempts"], job["progress"]) == (STATUS_QUEUED, attempts, 0)
+        store.claim_next(owner_pid=dead_pid)
+
+    # A job interrupted max_attempts times is failed rather than retried forever
+    assert store.requeue_interrupted(max_attempts=3) == 0
+    assert store.get(job_id)["status"] == STATUS_FAILED
+    assert store.get(done)["status"] == STATUS_DONE
+
+
+def test_requeue_leaves_jobs_of_live_owners(store):
+    # Another server process sharing the store must not steal a render in progress
+    job_id = store.create({})
+    store.claim_next()
+    assert store.requeue_interrupted() == 0
+    assert store.get(job_id)["status"] == STATUS_RUNNING
+
+
+def test_requeue_stale_heartbeat(store):
+    job_id = store.create({})
+    store.claim_next()
+    time.sleep(0.05)
+    assert store.requeue_interrupted(stale_after=0.01) == 1
+    assert store.get(job_id)["status"] == STATUS_QUEUED
+
+    store.claim_next()
+    time.sleep(0.05)
+    store.heartbeat(job_id)
+    assert store.requeue_interrupted(stale_after=0.01) == 0
+    assert store.get(job_id)["status"] == STATUS_RUNNING
+
+
+def test_older_store_gains_owner_columns(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE jobs (
+                id TEXT PRIMARY KEY, status TEXT NOT NULL, params TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0, stage TEXT, error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL,
+                started_at REAL, finished_at REAL
+            )
+        """)
+        conn.execute("INSERT INTO jobs (id, status, params, attempts, created_at) VALUES ('old', ?, '{}', 1, 0)",
+                     (STATUS_RUNNING,))
+    store = JobStore(path)
+    # A job left running before owners were recorded has no live owner to wait for
+    assert store.requeue_interrupted() == 1
+    assert store.get("old")["status"] == STATUS_QUEUED
+
+
+def test_run_job_records_outcome(store):
+    ok, crash = store.create({"topic": "a"}), store.create({"topic": "b"})
+    store.claim_next()
+    store.claim_next()
+
+    _run_job(_succeed, store.db_path, ok, {"topic": "a"})
+    _run_job(_crash, store.db_path, crash, {"topic": "b"})
+
+    assert store.get(ok)["status"] == STATUS_DONE
+    assert store.get(crash)["error"] == "render crashed"
+
+
+def test_queue_defaults_to_one_worker(store, monkeypatch):
+    monkeypatch.delenv("VIDEO_JOB_WORKERS", raising=False)
+    assert VideoJobQueue(_succeed, store=store).max_workers == 1
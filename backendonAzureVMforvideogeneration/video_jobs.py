@@ -0,0 +1,289 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+
+JOB_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'video_jobs.db')
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# A running job whose owner has not checked in for this long is treated as orphaned
+STALE_AFTER_SECONDS = int(os.getenv("VIDEO_JOB_STALE_SECONDS", "300"))
+
+
+def _pid_alive(pid):
+    """Whether a process with this pid still exists on this machine"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """Durable job store backed by a local SQLite file"""
+
+    def __init__(self, db_path=JOB_DB_PATH):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    stage TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    owner_pid INTEGER,
+                    heartbeat_at REAL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner_pid" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner_pid INTEGER")
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        # isolation_level=None lets us issue BEGIN IMMEDIATE ourselves when claiming jobs
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _row_to_job(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        return job
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex
+
+    def create(self, params, job_id=None):
+        """Persist a new queued job and return its id"""
+        job_id = job_id or self.new_id()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, params, stage, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, STATUS_QUEUED, json.dumps(params), STATUS_QUEUED, time.time())
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def claim_next(self, owner_pid=None):
+        """
+        Atomically move the oldest queued job to running and return it,
+        recording the claiming process as its owner
+        """
+        owner_pid = owner_pid or os.getpid()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (STATUS_QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, stage = ?, attempts = attempts + 1, started_at = ?, "
+                    "owner_pid = ?, heartbeat_at = ? WHERE id = ?",
+                    (STATUS_RUNNING, 'starting', now, owner_pid, now, row['id'])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row['id'])
+
+    def update_progress(self, job_id, progress, stage):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, stage = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+                (progress, stage, time.time(), job_id, STATUS_RUNNING)
+            )
+
+    def heartbeat(self, job_id):
+        """Record that the owner of a running job is still working on it"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                (time.time(), job_id, STATUS_RUNNING)
+            )
+
+    def finish(self, job_id):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, progress = 1, stage = ?, finished_at = ? WHERE id = ?",
+                (STATUS_DONE, STATUS_DONE, time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, error = ?, finished_at = ? WHERE id = ?",
+                (STATUS_FAILED, STATUS_FAILED, error, time.time(), job_id)
+            )
+
+    def requeue_interrupted(self, max_attempts=3, stale_after=None):
+        """
+        Return running jobs whose owner died or stopped sending heartbeats
+        to the queue. Jobs still owned by a live worker, in this or another
+        server process, are left alone.
+        """
+        stale_after = STALE_AFTER_SECONDS if stale_after is None else stale_after
+        cutoff = time.time() - stale_after
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, attempts, owner_pid, heartbeat_at FROM jobs WHERE status = ?",
+                    (STATUS_RUNNING,)
+                ).fetchall()
+                requeued = 0
+                for row in rows:
+                    if (row['owner_pid'] and _pid_alive(row['owner_pid'])
+                            and (row['heartbeat_at'] or 0) >= cutoff):
+                        continue
+                    if row['attempts'] >= max_attempts:
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, stage = ?, error = ? WHERE id = ?",
+                            (STATUS_FAILED, STATUS_FAILED, "Interrupted too many times", row['id'])
+                        )
+                    else:
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, stage = ?, progress = 0, owner_pid = NULL "
+                            "WHERE id = ?",
+                            (STATUS_QUEUED, STATUS_QUEUED, row['id'])
+                        )
+                        requeued += 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return requeued
+
+
+def _run_job(handler, db_path, job_id, params):
+    """Entry point of the render subprocess for a single job"""
+    store = JobStore(db_path)
+
+    def progress(fraction, stage):
+        store.update_progress(job_id, fraction, stage)
+
+    try:
+        handler(progress=progress, **params)
+        store.finish(job_id)
+    except Exception as e:
+        print(f"❌ Job {job_id} failed: {str(e)}")
+        print(traceback.format_exc())
+        store.fail(job_id, str(e))
+
+
+class VideoJobQueue:
+    """
+    Bounded pool of workers that render queued video jobs.
+
+    Each job runs in its own spawned process because Manim keeps its
+    configuration in module globals, so two renders cannot share one
+    interpreter. The queue itself lives in the JobStore, which means
+    jobs queued before a restart are picked up again by start().
+    Renders still share Manim's media and tex directories, so
+    VIDEO_JOB_WORKERS defaults to a single worker.
+    """
+
+    def __init__(self, handler, store=None, max_workers=None, poll_interval=2.0, heartbeat_interval=30.0):
+        self.handler = handler
+        self.store = store or JobStore()
+        self.max_workers = max_workers or int(os.getenv("VIDEO_JOB_WORKERS", "1"))
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._mp_context = multiprocessing.get_context('spawn')
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            requeued = self.store.requeue_interrupted()
+            if requeued:
+                print(f"Requeued {requeued} interrupted video job(s)")
+            for i in range(self.max_workers):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"video-job-worker-{i}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+            print(f"Started {self.max_workers} video job worker(s)")
+
+    def submit(self, job_id=None, **params):
+        """Queue a job and return its id without waiting for it to run"""
+        job_id = self.store.create(params, job_id=job_id)
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def _worker_loop(self):
+        while True:
+            try:
+                job = self.store.claim_next()
+            except Exception as e:
+                print(f"Error claiming video job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run(job)
+
+    def _run(self, job):
+        print(f"Running video job {job['id']}")
+        process = self._mp_context.Process(
+            target=_run_job,
+            args=(self.handler, self.store.db_path, job['id'], job['params'])
+        )
+        process.start()
+        # The render may not report progress for a long time, so vouch for it from here
+        while True:
+            process.join(self.heartbeat_interval)
+            if not process.is_alive():
+                break
+            self.store.heartbeat(job['id'])
+
+        if process.exitcode != 0:
+            current = self.store.get(job['id'])
+            if current and current['status'] == STATUS_RUNNING:
+                self.store.fail(job['id'], f"Render process exited with code {process.exitcode}")